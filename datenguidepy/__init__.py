@@ -2,6 +2,7 @@
 from datenguidepy.query_builder import Query  # noqa: F401
 from datenguidepy.query_builder import Field  # noqa: F401
 from datenguidepy.query_helper import get_regions  # noqa: F401
+from datenguidepy.query_helper import search_regions  # noqa: F401
 from datenguidepy.query_helper import get_statistics  # noqa: F401
 from datenguidepy.query_helper import get_availability_summary  # noqa: F401
 
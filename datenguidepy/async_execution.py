@@ -0,0 +1,454 @@
+from typing import Dict, Optional, List, Tuple, cast
+import asyncio
+import json
+import time
+import zlib
+
+from datenguidepy.query_execution import (
+    QueryExecutioner,
+    ExecutionResults,
+    AdaptivePaging,
+    Paginator,
+    GraphQlSchemaMetaDataProvider,
+    TypeMetaData,
+    DEFAULT_STATISTICS_META_DATA_PROVIDER,
+    Json_Dict,
+    Json_List,
+    check_http200_body_error,
+    create_query_meta,
+)
+from datenguidepy.transport import (
+    TransportConfig,
+    RetryPolicy,
+    CircuitBreaker,
+    TransferStats,
+    encode_request,
+    brotli,
+)
+from datenguidepy.rate_limit import TokenBucket, AdaptiveConcurrencyLimiter
+from datenguidepy.single_flight import AsyncSingleFlight
+from datenguidepy.cache import DiskResponseCache
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+# shared by the transports created with AsyncHttpTransport.like, so that
+# executioners in the same event loop coalesce their identical requests
+DEFAULT_ASYNC_SINGLE_FLIGHT = AsyncSingleFlight()
+
+
+class AsyncHttpTransport(object):
+    """Sends GraphQL requests from within an asyncio event loop.
+
+    This is the asyncio counterpart of HttpTransport and requires the
+    optional dependency aiohttp (pip install datenguidepy[async]).
+    The aiohttp session is created on first use inside the running
+    event loop and should be released with close once it is
+    not needed any more.
+
+    :param config: Connection settings, defaults to TransportConfig()
+    :type config: TransportConfig, optional
+    :param retry_policy: Policy for retrying failed requests,
+        defaults to RetryPolicy()
+    :type retry_policy: RetryPolicy, optional
+    :param circuit_breaker: Circuit breaker shared by all requests of the
+        transport, it keeps a circuit per endpoint. Defaults to None
+    :type circuit_breaker: CircuitBreaker, optional
+    :param rate_limiter: Token bucket limiting the request rate, it may be
+        shared with an HttpTransport used by other threads, defaults to None
+    :type rate_limiter: TokenBucket, optional
+    :param concurrency_limiter: Controller adapting the number of requests
+        in flight, defaults to None
+    :type concurrency_limiter: AdaptiveConcurrencyLimiter, optional
+    :param single_flight: Coalesces identical requests in flight at the
+        same time into a single request, defaults to None
+    :type single_flight: AsyncSingleFlight, optional
+    """
+
+    def __init__(
+        self,
+        config: Optional[TransportConfig] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        single_flight: Optional[AsyncSingleFlight] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "The asyncio API requires aiohttp, "
+                "install it with: pip install datenguidepy[async]"
+            )
+        self.config = TransportConfig() if config is None else config
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.single_flight = single_flight
+        self._session = None
+
+    @classmethod
+    def like(cls, transport) -> "AsyncHttpTransport":
+        """Creates a transport configured like a synchronous transport,
+        e.g. DEFAULT_TRANSPORT. The circuit breaker and the limiters are
+        shared with it, so both count against the same endpoint state.
+        Requests can only be coalesced with requests of the same event
+        loop, so if the transport coalesces requests, all transports created
+        by like share DEFAULT_ASYNC_SINGLE_FLIGHT instead of its single flight.
+
+        :param transport: An HttpTransport, the settings of other
+            transports that it lacks are left at their defaults.
+        :return: The asyncio transport.
+        """
+        return cls(
+            config=getattr(transport, "config", None),
+            retry_policy=getattr(transport, "retry_policy", None),
+            circuit_breaker=getattr(transport, "circuit_breaker", None),
+            rate_limiter=getattr(transport, "rate_limiter", None),
+            concurrency_limiter=getattr(transport, "concurrency_limiter", None),
+            single_flight=(
+                DEFAULT_ASYNC_SINGLE_FLIGHT
+                if getattr(transport, "single_flight", None) is not None
+                else None
+            ),
+        )
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_connections * self.config.pool_maxsize,
+                limit_per_host=self.config.pool_maxsize,
+                force_close=not self.config.keep_alive,
+            )
+            # responses are decompressed in post to count the transferred bytes
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+                headers={"Accept-Encoding": self.config.accept_encoding},
+                auto_decompress=False,
+            )
+        return self._session
+
+    @staticmethod
+    def _decompress(body: bytes, content_encoding: str) -> bytes:
+        content_encoding = content_encoding.strip().lower()
+        if content_encoding in ("gzip", "x-gzip"):
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        if content_encoding == "deflate":
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                # some servers send raw deflate streams without zlib header
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+        if content_encoding == "br" and brotli is not None:
+            return brotli.decompress(body)
+        return body
+
+    async def post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> Json_Dict:
+        """Posts a GraphQL request and returns the decoded response body.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param query_json: Request body containing the query and variables.
+        :param headers: Additional request headers, defaults to None
+        :param transfer_stats: Records the transferred bytes, defaults to None
+        :raises RuntimeError: If the response status code is not 200.
+        :return: The json response body.
+        """
+        if self.single_flight is None:
+            return await self._post(endpoint, query_json, headers, transfer_stats)
+        body_json, shared = await self.single_flight.do(
+            DiskResponseCache.request_key(endpoint, query_json),
+            lambda: self._post(endpoint, query_json, headers, transfer_stats),
+        )
+        if shared and transfer_stats is not None:
+            transfer_stats.add_shared_response()
+        return body_json
+
+    async def _post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]],
+        transfer_stats: Optional[TransferStats],
+    ) -> Json_Dict:
+        body, headers = encode_request(
+            query_json, headers, self.config.compress_requests_above
+        )
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            await self._before_attempt(endpoint)
+            retry_after = None
+            success = False
+            started = time.monotonic()
+            try:
+                async with self._get_session().post(
+                    endpoint, headers=headers, data=body
+                ) as resp:
+                    success = resp.status not in policy.status_codes
+                    if success or attempt + 1 >= policy.max_attempts:
+                        if resp.status == 200:
+                            raw_body = await resp.read()
+                            decoded_body = self._decompress(
+                                raw_body, resp.headers.get("Content-Encoding", "")
+                            )
+                            if transfer_stats is not None:
+                                transfer_stats.add(
+                                    len(body), len(raw_body), len(decoded_body)
+                                )
+                            return json.loads(decoded_body.decode("utf-8"))
+                        else:
+                            raise RuntimeError(
+                                endpoint
+                                + "\n"
+                                + f"No result, got HTML status code {resp.status}"
+                            )
+                    retry_after = resp.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if (
+                    not policy.retry_connection_errors
+                    or attempt + 1 >= policy.max_attempts
+                ):
+                    raise
+            finally:
+                self._after_attempt(endpoint, time.monotonic() - started, success)
+            await asyncio.sleep(policy.delay(attempt, retry_after))
+            attempt += 1
+
+    async def _before_attempt(self, endpoint: str) -> None:
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(endpoint)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        if self.concurrency_limiter is not None:
+            await self.concurrency_limiter.acquire_async()
+
+    def _after_attempt(self, endpoint: str, latency: float, success: bool) -> None:
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(latency, success)
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success(endpoint)
+        else:
+            self.circuit_breaker.record_failure(endpoint)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncQueryExecutioner(object):
+    """Queries the Datenguide API for data and meta data from within
+    an asyncio event loop.
+
+    The executioner mirrors QueryExecutioner and produces the same
+    ExecutionResults, so they can be passed on to the
+    QueryOutputTransformer. The documents of multi region queries and the
+    pages of allRegions queries are requested concurrently, while a
+    semaphore limits the number of requests in flight to max_workers.
+    It can be used as an async context manager to release the
+    connections afterwards.
+
+    :param alternative_endpoint: Endpoint to be used instead of the
+        default endpoint, defaults to None
+    :type alternative_endpoint: Optional[str], optional
+    :param transport: Transport used to send the requests, defaults to an
+        AsyncHttpTransport configured like QueryExecutioner.transport.
+    :type transport: Optional[AsyncHttpTransport], optional
+    :param max_workers: Maximum number of requests in flight at the same
+        time, defaults to the class attribute max_workers.
+    :type max_workers: Optional[int], optional
+    :param page_size: Number of regions per page of allRegions queries,
+        defaults to the class attribute page_size.
+    :type page_size: Optional[int], optional
+    :param adaptive_paging: Chooses the page size of allRegions queries
+        from the responses of earlier pages instead, defaults to None
+    :type adaptive_paging: Optional[AdaptivePaging], optional
+    :ivar transfer_stats: Bytes transferred by the last run_query call.
+    """
+
+    REQUEST_HEADER: Dict[str, str] = QueryExecutioner.REQUEST_HEADER
+
+    # None falls back to the current value of the QueryExecutioner attribute
+    endpoint: Optional[str] = None
+    max_workers: Optional[int] = None
+    page_size: Optional[int] = None
+
+    def __init__(
+        self,
+        alternative_endpoint: Optional[str] = None,
+        statistics_meta_data_provider=None,
+        transport: Optional[AsyncHttpTransport] = None,
+        max_workers: Optional[int] = None,
+        page_size: Optional[int] = None,
+        adaptive_paging: Optional[AdaptivePaging] = None,
+    ) -> None:
+        if alternative_endpoint:
+            self.endpoint = cast(str, alternative_endpoint)
+        elif self.endpoint is None:
+            self.endpoint = QueryExecutioner.endpoint
+
+        if max_workers is not None:
+            if max_workers < 1:
+                raise ValueError("max_workers has to be at least 1.")
+            self.max_workers = max_workers
+        elif self.max_workers is None:
+            self.max_workers = QueryExecutioner.max_workers
+
+        if page_size is None:
+            page_size = (
+                QueryExecutioner.page_size if self.page_size is None else self.page_size
+            )
+        self.paginator = Paginator(page_size, adaptive_paging)
+
+        self.transport = (
+            AsyncHttpTransport.like(QueryExecutioner.transport)
+            if transport is None
+            else transport
+        )
+
+        self.graph_ql_schema_meta_data_provider = GraphQlSchemaMetaDataProvider(
+            self.endpoint
+        )
+
+        if statistics_meta_data_provider is None:
+            self.stat_meta_data_provider = DEFAULT_STATISTICS_META_DATA_PROVIDER
+        else:
+            self.stat_meta_data_provider = statistics_meta_data_provider
+
+        self.transfer_stats = TransferStats()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncQueryExecutioner":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self.transport.close()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # created lazily so that it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(cast(int, self.max_workers))
+        return self._semaphore
+
+    async def get_type_info(
+        self, graph_ql_type: str, verbose=False
+    ) -> Optional[TypeMetaData]:
+        """Returns the meta data of a GraphQL type, see
+        GraphQlSchemaMetaDataProvider.get_type_info.
+
+        :param graph_ql_type: Name of the GraphQL type.
+        :type graph_ql_type: str
+        :param verbose: Prints whether the cache was used, defaults to False
+        :type verbose: bool, optional
+        :return: The meta data of the type.
+        :rtype: Optional[TypeMetaData]
+        """
+        provider = self.graph_ql_schema_meta_data_provider
+        type_meta = provider.cached_type_info(graph_ql_type)
+        if type_meta is not None:
+            if verbose:
+                print("use cache")
+            return type_meta
+        request_json = provider.type_info_request(graph_ql_type)
+        if request_json is None:
+            return None
+        if verbose:
+            print("query REST API")
+        info = await self._send_request(request_json)
+        return provider.parse_type_info(graph_ql_type, info)
+
+    async def run_query(self, query) -> Optional[List[ExecutionResults]]:
+        """Runs all GraphQL documents of a query concurrently.
+
+        :param query: The query to be executed.
+        :type query: Query
+        :return: One ExecutionResults per GraphQL document in the
+            order of the documents.
+        :rtype: Optional[List[ExecutionResults]]
+        """
+        self.transfer_stats = TransferStats()
+        query_fields_with_types = query._get_fields_with_types()
+        all_results = await asyncio.gather(
+            *[
+                self._run_single_query_json(query_json, query_fields_with_types)
+                for query_json in QueryExecutioner._generate_post_json(query)
+            ]
+        )
+        if not any(map(lambda r: r is None, all_results)):
+            return [cast(ExecutionResults, r) for r in all_results]
+        else:
+            return None
+
+    async def _run_single_query_json(
+        self, query_json: Json_Dict, query_fields_with_types: List[Tuple[str, str]]
+    ) -> Optional[ExecutionResults]:
+        if "allRegions" in [
+            field_with_types[0] for field_with_types in query_fields_with_types
+        ]:
+            started = time.monotonic()
+            first_page = await self._send_page_request(
+                query_json, 0, self.paginator.first_page_size(query_json)
+            )
+            if first_page is None:
+                return None
+            other_pages = await asyncio.gather(
+                *[
+                    self._send_page_request(query_json, page, items_per_page)
+                    for page, items_per_page in self.paginator.remaining_pages(
+                        query_json, first_page, time.monotonic() - started
+                    )
+                ]
+            )
+            if any(map(lambda p: p is None, other_pages)):
+                return None
+            results = [first_page] + list(other_pages)
+        else:
+            single_result = await self._send_request(query_json)
+            if single_result is None:
+                return None
+            results = [single_result]
+
+        # the meta data provider may read files or send requests
+        meta_data = await asyncio.get_event_loop().run_in_executor(
+            None,
+            create_query_meta,
+            self.stat_meta_data_provider,
+            query_fields_with_types,
+        )
+        return ExecutionResults(
+            query_results=cast(Json_List, results), meta_data=meta_data
+        )
+
+    async def _send_page_request(
+        self, query_json: Json_Dict, page: int, items_per_page: int
+    ) -> Optional[Json_Dict]:
+        page_json = dict(
+            query_json,
+            variables=QueryExecutioner._pagination_json(page, items_per_page),
+        )
+        return await self._send_request(page_json)
+
+    async def _send_request(self, query_json: Json_Dict) -> Optional[Json_Dict]:
+        async with self._get_semaphore():
+            body_json = await self.transport.post(
+                self.endpoint,
+                query_json,
+                headers=self.REQUEST_HEADER,
+                transfer_stats=self.transfer_stats,
+            )
+        check_http200_body_error(body_json)
+        return body_json
@@ -0,0 +1,620 @@
+from typing import (
+    Dict,
+    Any,
+    Callable,
+    Optional,
+    NamedTuple,
+    List,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import zlib
+
+from pandas import DataFrame
+
+if TYPE_CHECKING:
+    from datenguidepy.query_execution import TypeMetaData  # noqa: F401
+
+Json_Dict = Dict[str, Any]
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "datenguidepy",
+)
+
+
+class SqliteConnections(object):
+    """One connection to a SQLite database per thread, as sqlite connections
+    can not be shared across threads.
+
+    Writable databases are created if necessary and use write ahead logging
+    and autocommit mode, so that several threads and processes can use them
+    at the same time.
+
+    :param path: Path of the database.
+    :type path: str
+    :param setup: Called with every new connection, e.g. to create tables
+        or to check the format of the database. If it raises, the
+        connection is closed again.
+    :type setup: Optional[Callable[[sqlite3.Connection], None]], optional
+    :param read_only: Toggles opening the database read only, defaults
+        to False
+    :type read_only: bool, optional
+    """
+
+    def __init__(
+        self,
+        path: str,
+        setup: Optional[Callable[[sqlite3.Connection], None]] = None,
+        read_only: bool = False,
+    ) -> None:
+        self.path = path
+        self.setup = setup
+        self.read_only = read_only
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """Returns the connection of the calling thread, opening it
+        on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self.read_only:
+                uri = pathlib.Path(os.path.abspath(self.path)).as_uri() + "?mode=ro"
+                connection = sqlite3.connect(uri, uri=True)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                connection = sqlite3.connect(
+                    self.path, timeout=30, isolation_level=None
+                )
+                connection.execute("PRAGMA journal_mode=WAL")
+            if self.setup is not None:
+                try:
+                    self.setup(connection)
+                except BaseException:
+                    connection.close()
+                    raise
+            self._local.connection = connection
+        return connection
+
+
+class DiskResponseCache(object):
+    """Persistent cache for responses of the datenguide API.
+
+    Responses are stored zlib compressed in a SQLite database, keyed by a
+    hash of the endpoint, the query document and its variables. SQLite's
+    file locking makes it safe to use the same cache directory from several
+    threads and processes at the same time.
+
+    :param directory: Directory of the cache database, defaults to
+        DEFAULT_CACHE_DIR
+    :type directory: Optional[str], optional
+    :param ttl: Time in seconds after which cached responses expire,
+        defaults to None, meaning they never expire.
+    :type ttl: Optional[float], optional
+    :param max_size: Budget in bytes for the compressed responses. If it is
+        exceeded the least recently used responses are evicted,
+        defaults to 512 MB. None means unbounded.
+    :type max_size: Optional[int], optional
+    """
+
+    FILE_NAME: str = "responses.sqlite"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = 512 * 1024 ** 2,
+    ) -> None:
+        self.directory = DEFAULT_CACHE_DIR if directory is None else directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.path = os.path.join(self.directory, self.FILE_NAME)
+        self._connections = SqliteConnections(self.path, self._create_tables)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)"
+        )
+
+    @staticmethod
+    def request_key(endpoint: str, query_json: Json_Dict) -> str:
+        """Hash identifying a request independent of the order of
+        the variables.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param query_json: Request body containing the query and variables.
+        :return: Hex digest of the request.
+        """
+        canonical_request = json.dumps(
+            [endpoint, query_json.get("query"), query_json.get("variables")],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint: str, query_json: Json_Dict) -> Optional[Json_Dict]:
+        """Returns the cached response of a request if present and not expired.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param query_json: Request body containing the query and variables.
+        :return: The cached response body or None.
+        """
+        key = self.request_key(endpoint, query_json)
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT body, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        body, created = row
+        now = time.time()
+        if self.ttl is not None and now - created > self.ttl:
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        connection.execute(
+            "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+        )
+        return json.loads(zlib.decompress(body).decode("utf-8"))
+
+    def set(self, endpoint: str, query_json: Json_Dict, body_json: Json_Dict) -> None:
+        """Stores the response of a request and evicts the least recently
+        used responses if the size budget is exceeded.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param query_json: Request body containing the query and variables.
+        :param body_json: The response body.
+        """
+        key = self.request_key(endpoint, query_json)
+        body = zlib.compress(json.dumps(body_json).encode("utf-8"))
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now),
+            )
+            if self.max_size is not None:
+                self._evict(connection, self.max_size)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _evict(connection: sqlite3.Connection, max_size: int) -> None:
+        total_size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total_size <= max_size:
+            return
+        evicted_keys = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ):
+            evicted_keys.append((key,))
+            total_size -= size
+            if total_size <= max_size:
+                break
+        connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+
+    def size(self) -> int:
+        """Returns the size of all cached (compressed) responses in bytes."""
+        return (
+            self._connection()
+            .execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+            .fetchone()[0]
+        )
+
+    def clear(self) -> None:
+        """Removes all cached responses."""
+        self._connection().execute("DELETE FROM responses")
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a TransformedResultCache."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class TransformedResultCache(object):
+    """Size bounded in memory LRU cache for transformed query results.
+
+    The cache is meant to be shared by a whole process. It is keyed by
+    a fingerprint of the query and the flags that were used to transform
+    its results. Cached DataFrames are never handed out directly, instead
+    every hit returns a copy, so callers can modify their results without
+    affecting the cache. With pandas' copy on write mode these copies are
+    lazy and therefore cheap.
+
+    :param maxsize: Maximum number of cached results, defaults to 128
+    :type maxsize: int, optional
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[DataFrame, Json_Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(
+        endpoint: str, graphql_queries: List[str], provider_name: str, **flags: Any
+    ) -> str:
+        """Canonical key of a query and its transformation flags.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param graphql_queries: GraphQL documents of the query.
+        :param provider_name: Name of the statistics meta data provider,
+            as it determines the meta data of the results.
+        :param flags: Flags passed to the transformation of the results.
+        :return: Hex digest identifying the results.
+        """
+        canonical_query = json.dumps(
+            [endpoint, graphql_queries, provider_name, flags],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical_query.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[DataFrame, Json_Dict]]:
+        """Returns a copy of the cached results and their meta data.
+
+        :param key: Fingerprint of the results.
+        :return: Results and meta data or None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        frame, meta = entry
+        return frame.copy(), copy.deepcopy(meta)
+
+    def set(self, key: str, frame: DataFrame, meta: Json_Dict) -> None:
+        """Stores a copy of results and their meta data.
+
+        :param key: Fingerprint of the results.
+        :param frame: Transformed query results.
+        :param meta: Meta data of the query results.
+        """
+        if self.maxsize <= 0:
+            return
+        entry = (frame.copy(), copy.deepcopy(meta))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        """Removes all cached results and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class TypeMetaDataCache(object):
+    """Cache for the meta data of GraphQL types.
+
+    Types are cached per endpoint and schema, so that endpoints never share
+    types. The schema of an endpoint is identified by the hash of its
+    types, see set_schema. Once a newer schema of an endpoint is seen,
+    the types of the previous one are dropped. Lookups are served from
+    memory. If a directory is given, the types of endpoints with a known
+    schema are also stored in a SQLite database in it and all types of an
+    endpoint are loaded from there on its first lookup, so that new
+    processes start with the types earlier processes have seen. Types of
+    endpoints whose schema was never set are only kept in memory, as
+    nothing would tell when they became outdated. The cache can be
+    populated from several threads at the same time.
+
+    :param directory: Directory of the cache database, defaults to None,
+        meaning types are only kept in memory.
+    :type directory: Optional[str], optional
+    :param ttl: Time in seconds after which stored types expire, defaults
+        to one week. None means they never expire.
+    :type ttl: Optional[float], optional
+    :param maxsize: Maximum number of types kept in memory per endpoint,
+        the least recently used types are dropped first. Defaults to 16384,
+        None means unbounded.
+    :type maxsize: Optional[int], optional
+    """
+
+    FILE_NAME: str = "type_meta_data.sqlite"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = 7 * 24 * 3600.0,
+        maxsize: Optional[int] = 16384,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._types: Dict[str, "OrderedDict[str, TypeMetaData]"] = dict()
+        # hash and creation time of the schema of every endpoint
+        self._schemas: Dict[str, Tuple[str, float]] = dict()
+        self._markers: Set[Tuple[str, str]] = set()
+        self._lock = threading.RLock()
+        self._connections = (
+            None
+            if directory is None
+            else SqliteConnections(
+                os.path.join(directory, self.FILE_NAME), self._create_tables
+            )
+        )
+
+    def get(self, endpoint: str, type_name: str) -> Optional["TypeMetaData"]:
+        """Returns the cached meta data of a type or None."""
+        with self._lock:
+            types = self._endpoint_types(endpoint)
+            type_meta = types.get(type_name)
+            if type_meta is not None:
+                types.move_to_end(type_name)
+                return type_meta
+            # the type may have been dropped from memory but not from disk
+            rows = self._load(endpoint, type_name)
+            if rows:
+                type_meta = rows[0][1]
+                types[type_name] = type_meta
+                self._shrink(endpoint, types)
+            return type_meta
+
+    def set(self, endpoint: str, type_name: str, type_meta: "TypeMetaData") -> None:
+        """Stores the meta data of a type."""
+        self.set_many(endpoint, {type_name: type_meta})
+
+    def set_many(
+        self,
+        endpoint: str,
+        type_metas: Dict[str, "TypeMetaData"],
+        replace: bool = True,
+    ) -> None:
+        """Stores the meta data of several types at once.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param type_metas: Meta data by type name.
+        :param replace: Toggles replacing types that are already cached,
+            defaults to True
+        """
+        with self._lock:
+            types = self._endpoint_types(endpoint)
+            if not replace:
+                type_metas = {
+                    name: type_meta
+                    for name, type_meta in type_metas.items()
+                    if name not in types
+                }
+            types.update(type_metas)
+            self._shrink(endpoint, types)
+            self._store(
+                endpoint,
+                "INSERT OR REPLACE INTO types VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        endpoint,
+                        self._schema(endpoint)[0],
+                        name,
+                        zlib.compress(json.dumps(type_meta).encode("utf-8")),
+                        time.time(),
+                    )
+                    for name, type_meta in type_metas.items()
+                ],
+            )
+
+    def has_marker(self, endpoint: str, marker: str) -> bool:
+        """Whether a marker was set for the endpoint, e.g. to remember
+        that the complete schema of the endpoint was cached.
+        """
+        with self._lock:
+            self._endpoint_types(endpoint)
+            return (endpoint, marker) in self._markers
+
+    def add_marker(self, endpoint: str, marker: str) -> None:
+        with self._lock:
+            self._markers.add((endpoint, marker))
+            self._store(
+                endpoint,
+                "INSERT OR REPLACE INTO markers VALUES (?, ?, ?, ?)",
+                [(endpoint, self._schema(endpoint)[0], marker, time.time())],
+            )
+
+    def set_schema(self, endpoint: str, schema_hash: str, created: float) -> bool:
+        """Sets the schema the types of an endpoint are cached for, unless
+        the cache holds a schema of the endpoint created after it. Types
+        and markers of the previous schema are dropped. Until a schema is
+        set, the types of an endpoint are cached for an unknown schema.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param schema_hash: Hash of the schema, see schema_snapshot.schema_hash.
+        :param created: Time the schema was fetched, in seconds since the epoch.
+        :return: Whether types of the schema are cached now.
+        """
+        with self._lock:
+            current_hash, current_created = self._schema(endpoint)
+            if schema_hash == current_hash:
+                return True
+            if created < current_created:
+                return False
+            self._schemas[endpoint] = (schema_hash, created)
+            self._types.pop(endpoint, None)
+            self._markers = {
+                (marker_endpoint, marker)
+                for marker_endpoint, marker in self._markers
+                if marker_endpoint != endpoint
+            }
+            self._store(
+                endpoint,
+                "INSERT OR REPLACE INTO schemas VALUES (?, ?, ?)",
+                [(endpoint, schema_hash, created)],
+            )
+            for table in ["types", "markers"]:
+                self._store(
+                    endpoint,
+                    f"DELETE FROM {table} WHERE endpoint = ? AND version != ?",
+                    [(endpoint, schema_hash)],
+                )
+            return True
+
+    def clear(self) -> None:
+        """Removes all types from memory and disk."""
+        with self._lock:
+            self._types.clear()
+            self._markers.clear()
+            self._schemas.clear()
+            for table in ["types", "markers", "schemas"]:
+                self._store(None, f"DELETE FROM {table}", [()])
+
+    def _endpoint_types(self, endpoint: str) -> "OrderedDict[str, TypeMetaData]":
+        types = self._types.get(endpoint)
+        if types is None:
+            # loaded lazily on the first lookup for the endpoint
+            types = OrderedDict(self._load(endpoint))
+            self._shrink(endpoint, types)
+            self._types[endpoint] = types
+        return types
+
+    def _schema(self, endpoint: str) -> Tuple[str, float]:
+        schema = self._schemas.get(endpoint)
+        if schema is None:
+            schema = ("", 0.0)
+            connection = self._connection()
+            if connection is not None:
+                try:
+                    row = connection.execute(
+                        "SELECT schema_hash, created FROM schemas WHERE endpoint = ?",
+                        (endpoint,),
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    schema = (row[0], row[1])
+            self._schemas[endpoint] = schema
+        return schema
+
+    def _shrink(self, endpoint: str, types: "OrderedDict[str, TypeMetaData]") -> None:
+        if self.maxsize is None or len(types) <= self.maxsize:
+            return
+        while len(types) > self.maxsize:
+            types.popitem(last=False)
+        if not self._is_persisted(endpoint):
+            # without a database the dropped types are gone, so markers
+            # like a complete schema no longer hold
+            self._markers = {
+                (marker_endpoint, marker)
+                for marker_endpoint, marker in self._markers
+                if marker_endpoint != endpoint
+            }
+
+    def _load(
+        self, endpoint: str, type_name: Optional[str] = None
+    ) -> List[Tuple[str, "TypeMetaData"]]:
+        connection = self._connection()
+        if connection is None or not self._is_persisted(endpoint):
+            return []
+        oldest = 0.0 if self.ttl is None else time.time() - self.ttl
+        parameters: Tuple[Any, ...] = (endpoint, self._schema(endpoint)[0], oldest)
+        query = (
+            "SELECT name, body FROM types "
+            "WHERE endpoint = ? AND version = ? AND created >= ?"
+        )
+        if type_name is None:
+            for (marker,) in connection.execute(
+                "SELECT marker FROM markers "
+                "WHERE endpoint = ? AND version = ? AND created >= ?",
+                parameters,
+            ):
+                self._markers.add((endpoint, marker))
+        else:
+            query += " AND name = ?"
+            parameters += (type_name,)
+        try:
+            rows = connection.execute(query, parameters).fetchall()
+        except sqlite3.Error:
+            return []
+        return [(name, self._decode(body)) for name, body in rows]
+
+    @staticmethod
+    def _decode(body: bytes) -> "TypeMetaData":
+        from datenguidepy.query_execution import FieldMetaDict, TypeMetaData
+
+        kind, fields, enum_values = json.loads(zlib.decompress(body).decode("utf-8"))
+        if fields is not None:
+            fields = {name: FieldMetaDict(field) for name, field in fields.items()}
+        return TypeMetaData(kind, fields, enum_values)
+
+    def _is_persisted(self, endpoint: str) -> bool:
+        return self._connections is not None and self._schema(endpoint)[0] != ""
+
+    def _store(
+        self, endpoint: Optional[str], statement: str, rows: List[Tuple[Any, ...]]
+    ) -> None:
+        if endpoint is not None and not self._is_persisted(endpoint):
+            return
+        connection = self._connection()
+        if connection is None or not rows:
+            return
+        try:
+            connection.executemany(statement, rows)
+        except sqlite3.Error:
+            # e.g. a read only or full disk, the types stay cached in memory
+            pass
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._connections is None:
+            return None
+        try:
+            return self._connections.get()
+        except (OSError, sqlite3.Error):
+            # fall back to an in memory cache
+            self._connections = None
+            return None
+
+    @staticmethod
+    def _create_tables(connection: sqlite3.Connection) -> None:
+        # version is the hash of the schema the type belongs to
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS types (endpoint TEXT NOT NULL, "
+            "version TEXT NOT NULL, name TEXT NOT NULL, body BLOB NOT NULL, "
+            "created REAL NOT NULL, PRIMARY KEY (endpoint, version, name))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS markers (endpoint TEXT NOT NULL, "
+            "version TEXT NOT NULL, marker TEXT NOT NULL, "
+            "created REAL NOT NULL, PRIMARY KEY (endpoint, version, marker))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS schemas (endpoint TEXT PRIMARY KEY, "
+            "schema_hash TEXT NOT NULL, created REAL NOT NULL)"
+        )
@@ -0,0 +1,202 @@
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
+import codecs
+import gzip
+import json
+import os
+import tempfile
+
+Json_Dict = Dict[str, Any]
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonArrayStream(object):
+    """Incrementally decodes the elements of an array inside a json document.
+
+    The document is read chunk by chunk, e.g. from a streamed HTTP response.
+    The elements of the array found by following the keys in path are
+    decoded and yielded one at a time, so that the complete array is never
+    held in memory. Everything else in the document is decoded as usual and
+    available as document once the stream is exhausted, with an empty list
+    in place of the streamed array. If the path does not exist, e.g. because
+    the API returned errors instead of data, the stream yields nothing.
+
+    A stream can only be iterated once.
+
+    :param chunks: Bytes of the utf-8 encoded json document.
+    :type chunks: Iterable[bytes]
+    :param path: Keys leading from the top level object to the array,
+        e.g. ["data", "allRegions", "regions"].
+    :type path: Sequence[str]
+    """
+
+    BUFFER_COMPACTION_SIZE: int = 64 * 1024
+
+    def __init__(self, chunks: Iterable[bytes], path: Sequence[str]) -> None:
+        if len(path) == 0:
+            raise ValueError("path has to contain at least one key.")
+        self.path = list(path)
+        self.document: Optional[Json_Dict] = None
+        self.item_count = 0
+        self.byte_count = 0
+        self._chunks = iter(chunks)
+        self._utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._text = ""
+        self._pos = 0
+        self._eof = False
+        self._started = False
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._started:
+            raise RuntimeError("A JsonArrayStream can only be iterated once.")
+        self._started = True
+        return self._items()
+
+    def _items(self) -> Iterator[Any]:
+        document: Json_Dict = dict()
+        self._expect("{")
+        containers = [document]
+        for depth, key in enumerate(self.path):
+            container = containers[-1]
+            if not self._read_members(container, stop_key=key):
+                # the path does not exist, the container is already closed
+                self._close(containers[:-1])
+                self._finish(document)
+                return
+            opening = "[" if depth == len(self.path) - 1 else "{"
+            if self._peek() != opening:
+                container[key] = self._read_value()
+                self._close(containers)
+                self._finish(document)
+                return
+            self._pos += 1
+            if opening == "{":
+                child: Json_Dict = dict()
+                container[key] = child
+                containers.append(child)
+            else:
+                container[key] = []
+
+        while True:
+            char = self._peek()
+            if char == "]":
+                self._pos += 1
+                break
+            if char == ",":
+                self._pos += 1
+                continue
+            item = self._read_value()
+            self.item_count += 1
+            yield item
+
+        self._close(containers)
+        self._finish(document)
+
+    def _finish(self, document: Json_Dict) -> None:
+        if self._peek() != "":
+            raise ValueError("Unexpected data after the end of the json document.")
+        self.document = document
+
+    def _close(self, containers: List[Json_Dict]) -> None:
+        for container in reversed(containers):
+            self._read_members(container, stop_key=None)
+
+    def _read_members(self, container: Json_Dict, stop_key: Optional[str]) -> bool:
+        """Decodes the members of an object into container until stop_key
+        is found or the object ends.
+
+        :return: True if stop_key was found. The position is then right
+            after the colon following the key.
+        """
+        while True:
+            char = self._peek()
+            if char == "}":
+                self._pos += 1
+                return False
+            if char == ",":
+                self._pos += 1
+                continue
+            if char != '"':
+                raise ValueError(f"Expected an object key but found {char!r}.")
+            key = self._read_value()
+            self._expect(":")
+            if key == stop_key:
+                return True
+            container[key] = self._read_value()
+
+    def _expect(self, expected: str) -> None:
+        char = self._peek()
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} but found {char!r}.")
+        self._pos += 1
+
+    def _peek(self) -> str:
+        """Skips whitespace and returns the next character,
+        or an empty string at the end of the document."""
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._fill():
+                return ""
+
+    def _read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number at the end of the buffer might continue in the next chunk
+            if end == len(self._text) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _fill(self) -> bool:
+        """Appends the next chunk to the buffer.
+
+        :return: False if the document has been read completely.
+        """
+        if self._eof:
+            return False
+        if self._pos > self.BUFFER_COMPACTION_SIZE:
+            self._text = self._text[self._pos :]
+            self._pos = 0
+        for chunk in self._chunks:
+            self.byte_count += len(chunk)
+            text = self._utf8_decoder.decode(chunk)
+            if text:
+                self._text += text
+                return True
+        self._text += self._utf8_decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+
+def dump_gzip_json(content: Any, path: str) -> None:
+    """Writes content as gzip compressed json.
+
+    The file is written to a temporary file in the same directory first
+    and then moved into place, so that readers never see a partially
+    written file, even if the process is killed while writing.
+
+    :param content: Json serializable content.
+    :param path: Path of the file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as raw_file:
+            with gzip.open(raw_file, "wt", encoding="utf-8") as json_file:
+                json.dump(content, json_file, separators=(",", ":"))
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
@@ -61,10 +61,11 @@ class QueryOutputTransformer:
         This result converts region output from the API. The
         Graphql API has two distinct enpoints, one called "region"
         returning results for a single region and one called "allRegions"
-        which returns results for multiple regions. This function identifies
-        the endpoint that was used and then converts the results for the one
-        or more regions that it finds. If multiple regions are found,
-        their results are concatenated.
+        which returns results for multiple regions. Several "region" results
+        can also be part of one page if they were queried with aliases.
+        This function identifies the endpoint that was used and then converts
+        the results for the one or more regions that it finds. If multiple
+        regions are found, their results are concatenated.
 
         :param query_page: Single page of API query results as a python dict
             representation of a json.
@@ -76,6 +77,7 @@ class QueryOutputTransformer:
                 query_page["data"]["region"], meta_data, remove_duplicates
             )
         elif "allRegions" in query_page["data"]:
+            # regions may also be a lazy stream, see QueryExecutioner.stream
             allRegions = []
             for region in query_page["data"]["allRegions"]["regions"]:
                 allRegions.append(
@@ -84,6 +86,16 @@ class QueryOutputTransformer:
                     )
                 )
             return pd.concat(allRegions)
+        elif len(query_page["data"]) > 0:
+            # aliased regions (r0, r1, ...) in the order they were queried
+            return pd.concat(
+                [
+                    QueryOutputTransformer._convert_single_results_to_frame(
+                        region, meta_data, remove_duplicates
+                    )
+                    for region in query_page["data"].values()
+                ]
+            )
         else:
             raise RuntimeError(
                 "Only queries containing" + '"region" or "regions" can be transformed'
@@ -1,4 +1,4 @@
-from typing import Optional, Union, List, Dict, Any, Tuple, Set
+from typing import Optional, Union, List, Dict, Any, Tuple, Set, cast
 from pandas import DataFrame
 from datenguidepy.query_execution import (
     QueryExecutioner,
@@ -7,8 +7,12 @@ from datenguidepy.query_execution import (
     DEFAULT_STATISTICS_META_DATA_PROVIDER,
     TypeMetaData,
     QueryResultsMeta,
+    ExecutionResults,
+    AdaptivePaging,
 )
 from datenguidepy.output_transformer import QueryOutputTransformer
+from datenguidepy.cache import TransformedResultCache
+from datenguidepy.transport import TransferStats
 
 
 class Field:
@@ -317,7 +321,9 @@ class Field:
         :return: Description of the field as string.
         :rtype: Optional[str]
         """
-        return self._stat_meta_data_provider.get_stat_descriptions()[self.name][0]
+        return self._stat_meta_data_provider.get_query_stat_meta(
+            [(self.name, self.return_type)]
+        )[self.name]
 
     @staticmethod
     def _get_fields_recursion(field: "Field") -> List[str]:
@@ -347,6 +353,16 @@ class Query:
     :param default_fields: Wether default fields shall
             be attached to the fields., defaults to True
     :type default_fields: bool, optional
+    :param region_batch_size: Number of region ids that are combined into
+        a single GraphQL document using aliases, defaults to None, meaning
+        one document per region id.
+    :type region_batch_size: int, optional
+    :param page_size: Number of regions per page if start_field is
+        allRegions, defaults to None, meaning QueryExecutioner.page_size.
+    :type page_size: int, optional
+    :param adaptive_paging: Chooses the page size from the responses of
+        earlier pages instead of using a fixed page size, defaults to None
+    :type adaptive_paging: AdaptivePaging, optional
     :raises RuntimeError: [description]
     """
 
@@ -354,6 +370,10 @@ class Query:
     _return_type_region: str = "Region"
     _return_type_allreg: str = "RegionsResult"
     _return_type_regions: str = "Region"
+    _region_alias_prefix: str = "r"
+
+    # shared by all queries of the process, see results(use_cache=True)
+    result_cache: TransformedResultCache = TransformedResultCache(maxsize=128)
 
     def __init__(
         self,
@@ -361,10 +381,21 @@ class Query:
         region_field: Field = None,
         default_fields: bool = True,
         stat_meta_data_provider: StatisticsMetaDataProvider = None,
+        region_batch_size: Optional[int] = None,
+        page_size: Optional[int] = None,
+        adaptive_paging: Optional[AdaptivePaging] = None,
     ):
+        if region_batch_size is not None and region_batch_size < 1:
+            raise ValueError("region_batch_size has to be at least 1.")
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size has to be at least 1.")
         self.start_field = start_field
         self.region_field = region_field
+        self.region_batch_size = region_batch_size
+        self.page_size = page_size
+        self.adaptive_paging = adaptive_paging
         self.result_meta_data: Optional[QueryResultsMeta] = None
+        self.transfer_stats: Optional[TransferStats] = None
         if stat_meta_data_provider is None:
             self._stat_meta_data_provider: StatisticsMetaDataProvider = (
                 DEFAULT_STATISTICS_META_DATA_PROVIDER
@@ -381,6 +412,7 @@ class Query:
         fields: List[Union[str, "Field"]] = [],
         default_fields: bool = True,
         stat_meta_data_provider=None,
+        batch_size: Optional[int] = None,
     ) -> "Query":
         """Factory method to instantiate a Query with a single region through
             its region id.
@@ -395,6 +427,10 @@ class Query:
                 or fields with nested fields.
         :param default_fields: Wether default fields shall
         :type default_fields: bool
+        :param batch_size: If set, up to batch_size region ids are
+            requested with a single GraphQL document by using aliases.
+            Otherwise one document is sent per region id.
+        :type batch_size: int, optional
 
         :raises RuntimeError: [description]
 
@@ -422,6 +458,7 @@ class Query:
                 stat_meta_data_provider=stat_meta_data_provider,
             ),
             stat_meta_data_provider=stat_meta_data_provider,
+            region_batch_size=batch_size,
         )
 
     @classmethod
@@ -433,6 +470,8 @@ class Query:
         lau: int = None,
         default_fields: bool = True,
         stat_meta_data_provider=None,
+        page_size: Optional[int] = None,
+        adaptive_paging: Optional[AdaptivePaging] = None,
     ) -> "Query":
         """Factory method to instantiate a Query with allRegions start field.
         A parent id, nuts or lau can be further specified for the query.
@@ -458,6 +497,15 @@ class Query:
         :param default_fields: Wether default fields shall
             be attached to the fields.
         :type default_fields: bool
+        :param page_size: Number of regions requested per page. Smaller
+            pages keep responses with many statistics manageable, larger
+            pages reduce the number of requests for few fields.
+            Defaults to QueryExecutioner.page_size (1000).
+        :type page_size: int, optional
+        :param adaptive_paging: If set, the page size is chosen from the size
+            and latency of earlier pages, aiming at adaptive_paging.target_bytes
+            per page, defaults to None
+        :type adaptive_paging: AdaptivePaging, optional
 
 
         :return:  A query object with allRegions as start Field.
@@ -500,6 +548,8 @@ class Query:
             ),
             region_field=regions,
             stat_meta_data_provider=stat_meta_data_provider,
+            page_size=page_size,
+            adaptive_paging=adaptive_paging,
         )
 
     def add_field(
@@ -569,6 +619,8 @@ class Query:
         if (self.start_field.name == "region") and isinstance(
             self.start_field.args.get("id", ""), list
         ):
+            if self.region_batch_size is not None:
+                return self._get_batched_region_queries()
             query_list: List[str] = []
             for region_id in self.start_field.args["id"]:
                 query_list += [
@@ -589,6 +641,30 @@ class Query:
                 + "}"
             ]
 
+    def _get_batched_region_queries(self) -> List[str]:
+        """Combines region_batch_size region ids into a single query each.
+        Within a query the regions are distinguished by the aliases
+        r0, r1, ... in the order of the region ids.
+
+        :return: the Query formatted for the GraphQL API as a List of query strings
+        :rtype: List[str]
+        """
+        region_ids = self.start_field.args["id"]
+        batch_size = cast(int, self.region_batch_size)
+        query_list: List[str] = []
+        for batch_start in range(0, len(region_ids), batch_size):
+            aliased_regions = [
+                self._region_alias_prefix
+                + str(alias_number)
+                + ": "
+                + self.start_field._get_fields_to_query(self.start_field, region_id)
+                for alias_number, region_id in enumerate(
+                    region_ids[batch_start : batch_start + batch_size]
+                )
+            ]
+            query_list.append("{" + " ".join(aliased_regions) + "}")
+        return query_list
+
     def get_fields(self) -> List[str]:
         """Get all fields of a query.
 
@@ -613,10 +689,14 @@ class Query:
         verbose_enums: bool = False,
         add_units: bool = False,
         remove_duplicates: bool = True,
+        max_workers: Optional[int] = None,
+        use_cache: bool = False,
+        stream: bool = False,
     ) -> DataFrame:
         """Runs the query and returns a Pandas DataFrame with the results.
            It also fills the instance variable result_meta_data with meta
-           data specific to the query instance.
+           data specific to the query instance and transfer_stats with
+           the number of bytes that were transferred.
 
         :param verbose_statistics: Toggles whether statistic column names
             displayed with their short description in the result data frame
@@ -633,20 +713,124 @@ class Query:
             The removal happens before potentially joining several different statistics.
             Unless diagnosing the API the default (True) is generally in the users
             interest.
+        :param max_workers: Maximum number of requests sent concurrently,
+            e.g. when the query covers several region ids or the results
+            of allRegions span several pages. Defaults to sequential execution.
+        :param use_cache: Looks up the results in the process wide
+            result_cache before running the query and stores them there
+            afterwards. Useful for long running applications that run the
+            same queries repeatedly. Defaults to False.
+        :param stream: Decodes the pages of allRegions queries while they are
+            downloaded and converts the regions one at a time, which lowers
+            the peak memory of large queries. The pages are then requested
+            one after another. Defaults to False.
 
         :raises RuntimeError: If the query fails raise RuntimeError.
         :return: A DataFrame with the queried data.
         :rtype: DataFrame
         """
+        self._check_statistic_field()
+
+        flags = dict(
+            verbose_statistics=verbose_statistics,
+            verbose_enums=verbose_enums,
+            add_units=add_units,
+            remove_duplicates=remove_duplicates,
+        )
+        cache_key = self._result_cache_key(flags) if use_cache else None
+        if cache_key is not None:
+            cached_results = self._get_cached_results(cache_key)
+            if cached_results is not None:
+                return cached_results
+
+        executioner = QueryExecutioner(
+            statistics_meta_data_provider=self._stat_meta_data_provider,
+            max_workers=max_workers,
+            page_size=self.page_size,
+            adaptive_paging=self.adaptive_paging,
+            stream=stream,
+        )
+        result = executioner.run_query(self)
+        self.transfer_stats = executioner.transfer_stats
+        return self._transform_results(result, cache_key=cache_key, **flags)
+
+    async def results_async(
+        self,
+        verbose_statistics: bool = False,
+        verbose_enums: bool = False,
+        add_units: bool = False,
+        remove_duplicates: bool = True,
+        max_workers: Optional[int] = None,
+        use_cache: bool = False,
+    ) -> DataFrame:
+        """Awaitable version of results that runs the query
+           on the running asyncio event loop. All arguments are the
+           same as for results.
+
+           Requires the optional dependency aiohttp.
+
+        :raises RuntimeError: If the query fails raise RuntimeError.
+        :return: A DataFrame with the queried data.
+        :rtype: DataFrame
+        """
+        self._check_statistic_field()
+
+        flags = dict(
+            verbose_statistics=verbose_statistics,
+            verbose_enums=verbose_enums,
+            add_units=add_units,
+            remove_duplicates=remove_duplicates,
+        )
+        cache_key = self._result_cache_key(flags) if use_cache else None
+        if cache_key is not None:
+            cached_results = self._get_cached_results(cache_key)
+            if cached_results is not None:
+                return cached_results
+
+        # imported here, so that aiohttp is only loaded when it is used
+        from datenguidepy.async_execution import AsyncQueryExecutioner
+
+        async with AsyncQueryExecutioner(
+            statistics_meta_data_provider=self._stat_meta_data_provider,
+            max_workers=max_workers,
+            page_size=self.page_size,
+            adaptive_paging=self.adaptive_paging,
+        ) as executioner:
+            result = await executioner.run_query(self)
+        self.transfer_stats = executioner.transfer_stats
+        return self._transform_results(result, cache_key=cache_key, **flags)
+
+    def _check_statistic_field(self) -> None:
         if not self._contains_statistic_field():
             raise Exception(
                 "No statistic field is defined in query, please add statistic field "
                 "via method add_field."
             )
 
-        result = QueryExecutioner(
-            statistics_meta_data_provider=self._stat_meta_data_provider
-        ).run_query(self)
+    def _result_cache_key(self, flags: Dict[str, bool]) -> str:
+        return self.result_cache.fingerprint(
+            QueryExecutioner.endpoint,
+            self.get_graphql_query(),
+            type(self._stat_meta_data_provider).__name__,
+            **flags,
+        )
+
+    def _get_cached_results(self, cache_key: str) -> Optional[DataFrame]:
+        cached_results = self.result_cache.get(cache_key)
+        if cached_results is None:
+            return None
+        frame, self.result_meta_data = cached_results
+        return frame
+
+    def _transform_results(
+        self,
+        result: Optional[List[ExecutionResults]],
+        verbose_statistics: bool,
+        verbose_enums: bool,
+        add_units: bool,
+        remove_duplicates: bool,
+        cache_key: Optional[str] = None,
+    ) -> DataFrame:
         if result:
             # It is currently assumed that all graphql queries
             # that are generated internally for the Query instance
@@ -654,12 +838,15 @@ class Query:
             if self._query_result_contains_undefined_region(result):
                 raise ValueError("Queried region is invalid.")
             self.result_meta_data = result[0].meta_data
-            return QueryOutputTransformer(result).transform(
+            frame = QueryOutputTransformer(result).transform(
                 verbose_statistic_names=verbose_statistics,
                 verbose_enum_values=verbose_enums,
                 add_units=add_units,
                 remove_duplicates=remove_duplicates,
             )
+            if cache_key is not None:
+                self.result_cache.set(cache_key, frame, self.result_meta_data)
+            return frame
         else:
             raise RuntimeError("No results could be returned for this Query.")
 
@@ -687,9 +874,11 @@ class Query:
         )
         return start_field_subfields.union(region_field_subfields)
 
-    def meta_data(self) -> QueryResultsMeta:
+    def meta_data(self, max_workers: Optional[int] = None) -> QueryResultsMeta:
         """Runs the query and returns a Dict with the meta data of the queries results.
 
+        :param max_workers: Maximum number of requests sent concurrently,
+            defaults to sequential execution.
         :raises RuntimeError: If the Query did not return any results.
         E.g. if the Query was ill-formed.
         :return: A Dict with the queried meta data.
@@ -697,9 +886,46 @@ class Query:
         :rtype: Union[Dict[str, Any], List[Dict[str, Any]]]
         """
 
-        result = QueryExecutioner(
-            statistics_meta_data_provider=self._stat_meta_data_provider
-        ).run_query(self)
+        executioner = QueryExecutioner(
+            statistics_meta_data_provider=self._stat_meta_data_provider,
+            max_workers=max_workers,
+            page_size=self.page_size,
+            adaptive_paging=self.adaptive_paging,
+        )
+        result = executioner.run_query(self)
+        self.transfer_stats = executioner.transfer_stats
+        return self._extract_meta_data(result)
+
+    async def meta_data_async(
+        self, max_workers: Optional[int] = None
+    ) -> QueryResultsMeta:
+        """Awaitable version of meta_data that runs the query
+        on the running asyncio event loop.
+
+        Requires the optional dependency aiohttp.
+
+        :param max_workers: Maximum number of requests sent concurrently,
+            defaults to sequential execution.
+        :raises RuntimeError: If the Query did not return any results.
+        :return: A Dict with the queried meta data.
+        :rtype: QueryResultsMeta
+        """
+        from datenguidepy.async_execution import AsyncQueryExecutioner
+
+        async with AsyncQueryExecutioner(
+            statistics_meta_data_provider=self._stat_meta_data_provider,
+            max_workers=max_workers,
+            page_size=self.page_size,
+            adaptive_paging=self.adaptive_paging,
+        ) as executioner:
+            result = await executioner.run_query(self)
+        self.transfer_stats = executioner.transfer_stats
+        return self._extract_meta_data(result)
+
+    @staticmethod
+    def _extract_meta_data(
+        result: Optional[List[ExecutionResults]],
+    ) -> QueryResultsMeta:
         if result:
             # TODO: correct indexing?
             return result[0].meta_data
@@ -1,9 +1,39 @@
-from typing import Dict, Any, cast, Optional, NamedTuple, List, Tuple, Union
+from typing import (
+    Dict,
+    Iterator,
+    Any,
+    cast,
+    Optional,
+    NamedTuple,
+    List,
+    Tuple,
+    Union,
+    Callable,
+    TypeVar,
+)
 from typing_extensions import Protocol
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import json
+import os
 import re
-
-from datenguidepy.schema_json_meta import get_schema_json, get_json_path
+import threading
+import time
+import warnings
+
+from datenguidepy.schema_store import (
+    StatisticsSchema,
+    DEFAULT_SCHEMA_STORE_PATH,
+    open_statistics_schema,
+)
+from datenguidepy.transport import Transport, TransferStats, DEFAULT_TRANSPORT
+from datenguidepy.json_stream import JsonArrayStream
+from datenguidepy.cache import DEFAULT_CACHE_DIR, TypeMetaDataCache
+from datenguidepy.schema_snapshot import (
+    SchemaSnapshot,
+    load_snapshot,
+    schema_hash,
+)
 
 Json_Dict = Dict[str, Any]
 Json_List = List[Json_Dict]
@@ -14,6 +44,9 @@ UnitMeta = Dict[str, str]
 EnumMeta = Dict[str, Dict[Optional[str], str]]
 QueryResultsMeta = Dict[str, Union[StatMeta, EnumMeta, UnitMeta]]
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class ExecutionResults(NamedTuple):
     """Results of a query with the results itself and the according meta data.
@@ -23,9 +56,18 @@ class ExecutionResults(NamedTuple):
     meta_data: QueryResultsMeta
 
     def contains_undefined_region_result(self):
+        if not isinstance(self.query_results, list):
+            # streamed allRegions pages, which can not be undefined
+            return False
+        # besides "region" the data may contain aliased regions
+        # for queries that batch several region ids
         query_results_with_empty_region = list(
             filter(
-                lambda query_result: query_result["data"]["region"] is None,
+                lambda query_result: any(
+                    region is None
+                    for field, region in query_result["data"].items()
+                    if field != "allRegions"
+                ),
                 self.query_results,
             )
         )
@@ -98,17 +140,49 @@ class GraphQlSchemaMetaDataProvider(object):
         it helps to privde information as to how structurally correct
         queries are build. It does not directly supply information
         about statistics.
+
+        :param endpoint: Url of the GraphQL endpoint, defaults to the
+            class attribute endpoint.
+        :param transport: Transport used to send the requests, defaults
+            to the class attribute transport.
+        :param full_schema: Toggles fetching the meta data of all types with
+            a single __schema introspection request on the first cache miss
+            instead of one __type request per type. Defaults to the class
+            attribute full_schema.
+        :param meta_data_cache: Cache for the meta data of the types,
+            defaults to the class attribute meta_data_cache, which is shared
+            by all providers and persists the types of known schemas
+            in DEFAULT_CACHE_DIR.
+
+        If the class attribute schema_snapshot is set to the path of a
+        schema snapshot taken from the same endpoint, types are looked up
+        in it first, so that building queries usually needs no requests
+        at all. Setting check_snapshot to True compares the snapshot with
+        the endpoint in a background thread and warns if it is outdated.
     """
 
     endpoint: str = "https://api-next.datengui.de/graphql"
 
     REQUEST_HEADER: Dict[str, str] = {"Content-Type": "application/json"}
 
-    _META_DATA_CACHE: Json_Dict = dict()
+    transport: Transport = DEFAULT_TRANSPORT
+
+    full_schema: bool = False
+
+    # path of a snapshot written by tasks/refresh_graphql_schema.py
+    schema_snapshot: Optional[str] = None
 
-    _meta_type_info: str = """
-        query TypeInfo($type: String!) {
-          __type(name: $type) {
+    check_snapshot: bool = False
+
+    meta_data_cache: TypeMetaDataCache = TypeMetaDataCache(DEFAULT_CACHE_DIR)
+
+    # markers of the meta data cache
+    _SCHEMA_MARKER: str = "schema"
+    _SNAPSHOT_MARKER: str = "snapshot:"
+
+    _schema_lock = threading.Lock()
+
+    _meta_type_selection: str = """
             kind
             enumValues {
               name
@@ -138,13 +212,35 @@ class GraphQlSchemaMetaDataProvider(object):
                 }
               }
             }
-          }
-        }
     """
 
-    def __init__(self, endpoint=None):
+    _meta_type_info: str = (
+        "query TypeInfo($type: String!) { __type(name: $type) {"
+        + _meta_type_selection
+        + "} }"
+    )
+
+    _meta_schema_info: str = (
+        "query SchemaInfo { __schema { types { name"
+        + _meta_type_selection
+        + "} } }"
+    )
+
+    def __init__(
+        self,
+        endpoint=None,
+        transport: Optional[Transport] = None,
+        full_schema: Optional[bool] = None,
+        meta_data_cache: Optional[TypeMetaDataCache] = None,
+    ):
         if endpoint is not None:
             self.endpoint = endpoint
+        if transport is not None:
+            self.transport = transport
+        if full_schema is not None:
+            self.full_schema = full_schema
+        if meta_data_cache is not None:
+            self.meta_data_cache = meta_data_cache
 
     def get_type_info(
         self, graph_ql_type: str, verbose=False
@@ -160,55 +256,231 @@ class GraphQlSchemaMetaDataProvider(object):
         :rtype: Optional[TypeMetaData]
         """
 
-        if graph_ql_type in self.__class__._META_DATA_CACHE:
+        type_meta = self.meta_data_cache.get(self.endpoint, graph_ql_type)
+        if type_meta is not None:
             if verbose:
                 print("use cache")
-            return self.__class__._META_DATA_CACHE[graph_ql_type]
+            return type_meta
+        type_meta = self.cached_type_info(graph_ql_type)
+        if type_meta is not None:
+            if verbose:
+                print("use schema snapshot")
+            return type_meta
+        if verbose:
+            print("query REST API")
+        if self.full_schema:
+            self.load_schema()
+            return self.meta_data_cache.get(self.endpoint, graph_ql_type)
+        info = self._send_request(self._type_info_query_json(graph_ql_type))
+        return self.parse_type_info(graph_ql_type, info)
+
+    def cached_type_info(self, graph_ql_type: str) -> Optional[TypeMetaData]:
+        """Returns the meta data of a type from the cache or the schema
+        snapshot without sending a request.
+
+        :param graph_ql_type: Name of the GraphQL type.
+        :return: The meta data or None if it has to be requested.
+        """
+        type_meta = self.meta_data_cache.get(self.endpoint, graph_ql_type)
+        if type_meta is None:
+            self.load_snapshot()
+            type_meta = self.meta_data_cache.get(self.endpoint, graph_ql_type)
+        return type_meta
+
+    def type_info_request(self, graph_ql_type: str) -> Optional[Json_Dict]:
+        """Returns the request body for the meta data of a type that is
+        not cached, e.g. to send it with another transport. This is a
+        __schema request if full_schema is set, otherwise a __type request.
+
+        :param graph_ql_type: Name of the GraphQL type.
+        :return: The request body or None if the full schema was already
+            fetched, so the type does not exist.
+        """
+        if not self.full_schema:
+            return self._type_info_query_json(graph_ql_type)
+        if self.meta_data_cache.has_marker(self.endpoint, self._SCHEMA_MARKER):
+            return None
+        return self._schema_info_query_json()
+
+    def parse_type_info(
+        self, graph_ql_type: str, info: Optional[Json_Dict]
+    ) -> Optional[TypeMetaData]:
+        """Stores the meta data in the response to a type_info_request
+        in the cache.
+
+        :param graph_ql_type: Name of the requested GraphQL type.
+        :param info: The json response body.
+        :return: The meta data of the requested type.
+        """
+        if info and "__schema" in info["data"]:
+            self._process_schema_info(info)
+            return self.meta_data_cache.get(self.endpoint, graph_ql_type)
+        return self._process_type_info(graph_ql_type, info)
+
+    def load_schema(self) -> None:
+        """Fetches the meta data of all types with a single introspection
+        request and stores it in the cache. Concurrent calls wait for
+        the first one, later calls for the same endpoint do nothing.
+        """
+        if self.meta_data_cache.has_marker(self.endpoint, self._SCHEMA_MARKER):
+            return
+        with self._schema_lock:
+            if self.meta_data_cache.has_marker(self.endpoint, self._SCHEMA_MARKER):
+                return
+            info = self._send_request(self._schema_info_query_json())
+            self._process_schema_info(info)
+
+    def load_snapshot(self) -> None:
+        """Adds the types of the schema snapshot to the cache if the
+        snapshot was taken from the endpoint of the provider and the cache
+        holds no schema of the endpoint fetched after it. The snapshot is
+        only read once per endpoint and cache, and again when the file
+        changes. If it can not be read, a warning is issued and types are
+        requested from the endpoint instead.
+        """
+        if self.schema_snapshot is None:
+            return
+        marker = self._SNAPSHOT_MARKER + self.schema_snapshot
+        if os.path.exists(self.schema_snapshot):
+            marker += f"@{os.stat(self.schema_snapshot).st_mtime_ns}"
+        if self.meta_data_cache.has_marker(self.endpoint, marker):
+            return
+        with self._schema_lock:
+            if self.meta_data_cache.has_marker(self.endpoint, marker):
+                return
+            type_metas = None
+            try:
+                snapshot = load_snapshot(self.schema_snapshot)
+                if snapshot is None:
+                    raise FileNotFoundError("the file does not exist")
+                if snapshot.endpoint == self.endpoint:
+                    created = time.time() - snapshot.age().total_seconds()
+                    type_metas = {
+                        type_json["name"]: self._type_meta_data(type_json)
+                        for type_json in snapshot.types
+                    }
+            except (OSError, EOFError, KeyError, TypeError, ValueError) as error:
+                # json.JSONDecodeError is a ValueError
+                warnings.warn(
+                    "Could not read the GraphQL schema snapshot "
+                    f"{self.schema_snapshot}: {error}. "
+                    "Types are requested from the API instead."
+                )
+            if type_metas is not None:
+                if self.meta_data_cache.set_schema(
+                    self.endpoint, snapshot.schema_hash, created
+                ):
+                    # types requested since the snapshot was taken are more recent
+                    self.meta_data_cache.set_many(
+                        self.endpoint, type_metas, replace=False
+                    )
+                if self.check_snapshot:
+                    threading.Thread(
+                        target=self._check_snapshot_in_background,
+                        args=(snapshot,),
+                        daemon=True,
+                    ).start()
+            self.meta_data_cache.add_marker(self.endpoint, marker)
+
+    def fetch_schema_types(self) -> List[Json_Dict]:
+        """Fetches all types of the endpoint with a single introspection
+        request, e.g. to create a SchemaSnapshot.
+
+        :return: The types as returned by the __schema query.
+        """
+        info = cast(Json_Dict, self._send_request(self._schema_info_query_json()))
+        return info["data"]["__schema"]["types"]
+
+    def check_snapshot_staleness(self, snapshot: SchemaSnapshot) -> bool:
+        """Compares a schema snapshot with the current schema of the
+        endpoint and warns if the schema has changed since.
+
+        :param snapshot: The snapshot to check.
+        :return: True if the snapshot is outdated.
+        """
+        stale = schema_hash(self.fetch_schema_types()) != snapshot.schema_hash
+        if stale:
+            warnings.warn(
+                f"The GraphQL schema snapshot taken at {snapshot.created} is "
+                "outdated. Refresh it with tasks/refresh_graphql_schema.py "
+                "or set GraphQlSchemaMetaDataProvider.schema_snapshot to None."
+            )
+        return stale
+
+    def _check_snapshot_in_background(self, snapshot: SchemaSnapshot) -> None:
+        try:
+            self.check_snapshot_staleness(snapshot)
+        except Exception:
+            # the check is advisory, an unreachable endpoint is no reason to fail
+            pass
+
+    def _schema_info_query_json(self) -> Json_Dict:
+        return {"query": self._meta_schema_info}
+
+    def _type_info_query_json(self, graph_ql_type: str) -> Json_Dict:
         variables = {"type": graph_ql_type}
         query_json: Json_Dict = {}
         query_json["query"] = self._meta_type_info
         query_json["variables"] = variables
-        if verbose:
-            print("query REST API")
-        info = self._send_request(query_json)
-        if info:
-            type_kind = info["data"]["__type"]["kind"]
+        return query_json
 
-            if type_kind == "OBJECT":
-                field_meta: Optional[Json_Dict] = {
-                    f["name"]: FieldMetaDict(f)
-                    for f in info["data"]["__type"]["fields"]
-                }
-            else:
-                field_meta = None
-
-            if type_kind == "ENUM":
-                enum_vals: Optional[Dict[str, str]] = {
-                    value["name"]: value["description"]
-                    for value in info["data"]["__type"]["enumValues"]
-                }
-            else:
-                enum_vals = None
-            type_meta = TypeMetaData(type_kind, field_meta, enum_vals)
-            self.__class__._META_DATA_CACHE[graph_ql_type] = type_meta
+    def _process_type_info(
+        self, graph_ql_type: str, info: Optional[Json_Dict]
+    ) -> Optional[TypeMetaData]:
+        """Converts the response of a type info request into
+        TypeMetaData and stores it in the cache.
+        """
+        if info:
+            type_meta = self._type_meta_data(info["data"]["__type"])
+            self.meta_data_cache.set(self.endpoint, graph_ql_type, type_meta)
             return type_meta
         else:
             return None
 
+    def _process_schema_info(self, info: Optional[Json_Dict]) -> None:
+        """Converts the response of a schema info request into
+        TypeMetaData for every type and stores them in the cache.
+        """
+        if info:
+            types = info["data"]["__schema"]["types"]
+            self.meta_data_cache.set_schema(
+                self.endpoint, schema_hash(types), time.time()
+            )
+            self.meta_data_cache.set_many(
+                self.endpoint,
+                {
+                    type_json["name"]: self._type_meta_data(type_json)
+                    for type_json in types
+                },
+            )
+            self.meta_data_cache.add_marker(self.endpoint, self._SCHEMA_MARKER)
+
+    @staticmethod
+    def _type_meta_data(type_json: Json_Dict) -> TypeMetaData:
+        type_kind = type_json["kind"]
+
+        if type_kind == "OBJECT":
+            field_meta: Optional[Json_Dict] = {
+                f["name"]: FieldMetaDict(f) for f in type_json["fields"]
+            }
+        else:
+            field_meta = None
+
+        if type_kind == "ENUM":
+            enum_vals: Optional[Dict[str, str]] = {
+                value["name"]: value["description"]
+                for value in type_json["enumValues"]
+            }
+        else:
+            enum_vals = None
+        return TypeMetaData(type_kind, field_meta, enum_vals)
+
     def _send_request(self, query_json: Json_Dict) -> Optional[Json_Dict]:
-        resp = requests.post(
-            self.endpoint, headers=self.REQUEST_HEADER, json=query_json
+        body_json = self.transport.post(
+            self.endpoint, query_json, headers=self.REQUEST_HEADER
         )
-        if resp.status_code == 200:
-            body_json = resp.json()
-            check_http200_body_error(body_json)
-            return body_json
-        else:
-            raise RuntimeError(
-                self.endpoint
-                + "\n"
-                + f"No result, got HTML status code {resp.status_code}"
-            )
+        check_http200_body_error(body_json)
+        return body_json
 
 
 class StatisticsMetaDataProvider(Protocol):
@@ -244,9 +516,9 @@ class StatisticsGraphQlMetaDataProvider(object):
         results.
     """
 
-    def __init__(self, endpoint=None):
+    def __init__(self, endpoint=None, transport: Optional[Transport] = None):
         self.schema_meta_data_provider = GraphQlSchemaMetaDataProvider(
-            endpoint=endpoint
+            endpoint=endpoint, transport=transport
         )
 
     def get_query_stat_meta(
@@ -348,95 +620,270 @@ class StatisticsSchemaJsonMetaDataProvider(object):
         different sources.
         This particular data provider the hard copy of a schema file from the SOAP
         cubes that datenguide extracts fron GENESIS and transfers into their API.
+
+        The schema is read from the compiled store at schema_store on first
+        use, see datenguidepy.schema_store. If there is no store or
+        use_schema_store is False, schema.json is parsed instead.
+
+        :param schema_store: Path of the compiled schema store, defaults to
+            the class attribute schema_store.
+        :param use_schema_store: Toggles reading the compiled store instead
+            of parsing schema.json, defaults to the class attribute
+            use_schema_store.
     """
 
-    def __init__(self):
-        self._full_data_json = [get_schema_json()]
+    schema_store: str = DEFAULT_SCHEMA_STORE_PATH
+
+    use_schema_store: bool = True
+
+    def __init__(
+        self,
+        schema_store: Optional[str] = None,
+        use_schema_store: Optional[bool] = None,
+    ):
+        if schema_store is not None:
+            self.schema_store = schema_store
+        if use_schema_store is not None:
+            self.use_schema_store = use_schema_store
+        self._statistics_schema: Optional[StatisticsSchema] = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def _schema(self) -> StatisticsSchema:
+        """The statistics of the schema, opened on first access instead
+        of on import.
+        """
+        if self._statistics_schema is None:
+            with self._load_lock:
+                if self._statistics_schema is None:
+                    self._statistics_schema = open_statistics_schema(
+                        self.schema_store if self.use_schema_store else None
+                    )
+        return self._statistics_schema
 
     @property
     def stat_names(self):
-        return [
-            k
-            for stat in get_json_path(self._full_data_json, ["..", "measures"])
-            for k in stat.keys()
-        ]
+        return self._schema.stat_names()
 
     def get_query_stat_meta(
         self, query_fields_with_types: List[Tuple[str, str]]
     ) -> StatMeta:
-        fields = [field for field, _ in query_fields_with_types]
-        sd = self.get_stat_descriptions()
-        return {stat: sd[stat][0] for stat in sd if stat in fields}
+        stat_meta: StatMeta = {}
+        for field, _ in query_fields_with_types:
+            description = self._schema.stat_description(field)
+            if description is not None:
+                stat_meta[field] = description[0]
+        return stat_meta
 
     def get_query_unit_meta(
         self, query_fields_with_types: List[Tuple[str, str]]
     ) -> UnitMeta:
-
-        fields = [field for field, _ in query_fields_with_types]
-
-        units = self.get_stat_units()
-
-        return {stat: units[stat] for stat in units if stat in fields}
+        unit_meta: UnitMeta = {}
+        for field, _ in query_fields_with_types:
+            unit = self._schema.stat_unit(field)
+            if unit is not None:
+                unit_meta[field] = unit
+        return unit_meta
 
     def get_query_enum_meta(
         self, query_fields_with_types: List[Tuple[str, str]]
     ) -> EnumMeta:
         enum_meta: EnumMeta = {}
         for field, _ in query_fields_with_types:
-            enum_values = get_json_path(
-                self._full_data_json,
-                ["..", "measures", "..", "dimensions", field, "value_names"],
-            )
-            if len(enum_values) > 0:
-                gesamt_update = {"GESAMT": "Gesamt"}
-                enum_meta[field] = dict(enum_values[0], **gesamt_update)
+            enum_values = self._schema.enum_values(field)
+            if enum_values is not None:
+                enum_meta[field] = cast(Dict[Optional[str], str], enum_values)
         return enum_meta
 
     def is_statistic(self, stat_candidate: str) -> bool:
-        return stat_candidate in self.stat_names
+        return self._schema.is_statistic(stat_candidate)
 
     def get_stat_units(self) -> Dict[str, str]:
-        def get_unit_info(unit_json):
-            return unit_json[0]["measure_name_de"]
-
-        stat_names = get_json_path(
-            self._full_data_json, ["..", "measures", "..", "name"]
-        )
-        units = map(
-            get_unit_info,
-            get_json_path(self._full_data_json, ["..", "measures", "..", "units"]),
-        )
-        return dict(zip(stat_names, units))
+        return self._schema.stat_units()
 
     def get_stat_descriptions(self) -> Dict[str, Tuple[str, str]]:
-
-        stat_descriptions_short = get_json_path(
-            self._full_data_json, ["..", "measures", "..", "title_de"]
-        )
-        stat_descriptions_long = get_json_path(
-            self._full_data_json, ["..", "measures", "..", "definition_de"]
-        )
-        return {
-            name: (short, long)
-            for name, short, long in zip(
-                self.stat_names, stat_descriptions_short, stat_descriptions_long
-            )
-        }
+        return self._schema.stat_descriptions()
 
     def get_enum_values(self) -> Dict[str, Dict[str, str]]:
-        names = get_json_path(
-            self._full_data_json, ["..", "measures", "..", "dimensions", "..", "name"]
-        )
-        values = get_json_path(
-            self._full_data_json,
-            ["..", "measures", "..", "dimensions", "..", "value_names"],
+        return self._schema.all_enum_values()
+
+
+DEFAULT_STATISTICS_META_DATA_PROVIDER = StatisticsSchemaJsonMetaDataProvider()
+
+
+def create_query_meta(
+    stat_meta_data_provider: StatisticsMetaDataProvider,
+    query_fields_with_types: List[Tuple[str, str]],
+) -> QueryResultsMeta:
+    """Collects the meta data of the statistics, enums and units
+    that are part of a query.
+
+    :param stat_meta_data_provider: Source of the meta data.
+    :param query_fields_with_types: Fields of the query and their return types.
+    :return: Meta data for the query results.
+    """
+    meta: QueryResultsMeta = dict()
+    meta["statistics"] = stat_meta_data_provider.get_query_stat_meta(
+        query_fields_with_types
+    )
+    meta["enums"] = stat_meta_data_provider.get_query_enum_meta(
+        query_fields_with_types
+    )
+    meta["units"] = stat_meta_data_provider.get_query_unit_meta(
+        query_fields_with_types
+    )
+    return meta
+
+
+class AdaptivePaging(NamedTuple):
+    """Settings for choosing the page size of allRegions queries from the
+    responses of earlier pages.
+
+    Page sizes are powers of two, so that pages of different sizes can
+    be combined without overlaps or gaps.
+
+    :param target_bytes: Aimed at size of a single page in bytes.
+    :param target_seconds: Aimed at duration of a single page request in
+        seconds, None ignores the latency.
+    :param initial_page_size: Page size of the first page of a query for
+        which no earlier pages have been observed.
+    :param min_page_size: Lower bound of the page size.
+    :param max_page_size: Upper bound of the page size.
+    """
+
+    target_bytes: int = 2 * 1024 ** 2
+    target_seconds: Optional[float] = 5.0
+    initial_page_size: int = 256
+    min_page_size: int = 16
+    max_page_size: int = 8192
+
+
+class Paginator(object):
+    """Decides which pages of an allRegions query are requested.
+
+    With a fixed page size all pages have page_size items. In the adaptive
+    mode the first page is used as probe: its size in bytes and its
+    latency per region determine the page size of the remaining pages.
+    The observations are kept per GraphQL document for the whole process,
+    so that repeating a query starts with a suitable page size right away.
+    Only the MAX_OBSERVATIONS most recently used documents are remembered.
+
+    :param page_size: Number of regions per page, defaults to 1000
+    :type page_size: int, optional
+    :param adaptive_paging: Enables the adaptive mode, in which case
+        page_size is ignored, defaults to None
+    :type adaptive_paging: AdaptivePaging, optional
+    """
+
+    MAX_OBSERVATIONS: int = 256
+
+    # bytes and seconds per region observed for each GraphQL document
+    _observations: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+    _observations_lock = threading.Lock()
+
+    def __init__(
+        self, page_size: int = 1000, adaptive_paging: Optional[AdaptivePaging] = None
+    ) -> None:
+        if page_size < 1:
+            raise ValueError("page_size has to be at least 1.")
+        self.page_size = page_size
+        self.adaptive_paging = adaptive_paging
+
+    def first_page_size(self, query_json: Json_Dict) -> int:
+        """Page size of the first page of a query.
+
+        :param query_json: Request body of the query.
+        :return: Number of regions on the first page.
+        """
+        if self.adaptive_paging is None:
+            return self.page_size
+        with self._observations_lock:
+            observation = self._observations.get(query_json["query"])
+            if observation is not None:
+                self._observations.move_to_end(query_json["query"])
+        if observation is None:
+            return self._power_of_two(self.adaptive_paging.initial_page_size)
+        return self._ideal_page_size(*observation)
+
+    def remaining_pages(
+        self,
+        query_json: Json_Dict,
+        first_page: Json_Dict,
+        latency: float,
+        region_count: Optional[int] = None,
+        payload_bytes: Optional[int] = None,
+    ) -> List[Tuple[int, int]]:
+        """Pages that have to be requested after the first page.
+
+        :param query_json: Request body of the query.
+        :param first_page: Response of the first page.
+        :param latency: Duration of the first page request in seconds.
+        :param region_count: Number of regions on the first page, defaults
+            to the number of regions contained in first_page.
+        :param payload_bytes: Size of the first page in bytes, defaults to
+            the size of first_page encoded as json.
+        :return: Page numbers and page sizes in the order of the regions.
+        """
+        if self.adaptive_paging is None:
+            return [
+                (page, self.page_size)
+                for page in QueryExecutioner._remaining_pages(first_page)
+            ]
+        pagination = first_page["data"]["allRegions"]
+        if region_count is None:
+            region_count = len(pagination["regions"])
+        if region_count == 0:
+            return []
+        if payload_bytes is None:
+            payload_bytes = len(json.dumps(first_page, separators=(",", ":")))
+        observation = (payload_bytes / region_count, latency / region_count)
+        with self._observations_lock:
+            self._observations[query_json["query"]] = observation
+            self._observations.move_to_end(query_json["query"])
+            while len(self._observations) > self.MAX_OBSERVATIONS:
+                self._observations.popitem(last=False)
+        return self._page_plan(
+            pagination["itemsPerPage"],
+            pagination["total"],
+            self._ideal_page_size(*observation),
         )
-        gesamt_update = {"GESAMT": "Gesamt"}
 
-        return {name: dict(vs, **gesamt_update) for name, vs in zip(names, values)}
+    def _ideal_page_size(
+        self, bytes_per_region: float, seconds_per_region: float
+    ) -> int:
+        paging = cast(AdaptivePaging, self.adaptive_paging)
+        page_size = paging.target_bytes / max(bytes_per_region, 1.0)
+        if paging.target_seconds is not None and seconds_per_region > 0:
+            page_size = min(page_size, paging.target_seconds / seconds_per_region)
+        page_size = min(max(page_size, paging.min_page_size), paging.max_page_size)
+        return self._power_of_two(page_size)
 
+    @staticmethod
+    def _power_of_two(page_size: float) -> int:
+        """Largest power of two that is not greater than page_size."""
+        return 1 << max(int(page_size), 1).bit_length() - 1
 
-DEFAULT_STATISTICS_META_DATA_PROVIDER = StatisticsSchemaJsonMetaDataProvider()
+    @staticmethod
+    def _page_plan(offset: int, total: int, page_size: int) -> List[Tuple[int, int]]:
+        """Splits the regions from offset to total into pages of page_size.
+
+        Since a page covers the regions page * itemsPerPage to
+        (page + 1) * itemsPerPage, offset has to be a multiple of the page
+        size. Otherwise the gap up to the next multiple is closed with
+        smaller pages whose size is the largest power of two dividing the
+        current offset.
+
+        :param offset: Number of regions that were already requested.
+        :param total: Total number of regions.
+        :param page_size: Page size of the remaining pages.
+        :return: Page numbers and page sizes in the order of the regions.
+        """
+        pages = []
+        while offset < total:
+            size = page_size if offset % page_size == 0 else offset & -offset
+            pages.append((offset // size, size))
+            offset += size
+        return pages
 
 
 class QueryExecutioner(object):
@@ -444,23 +891,76 @@ class QueryExecutioner(object):
 
     :param alternative_endpoint: [description], defaults to None
     :type alternative_endpoint: Optional[str], optional
+    :param transport: Transport used to send the requests, defaults to the
+        class attribute transport, a pooled HttpTransport shared by all
+        executioners. Replacing the class attribute, e.g. by a
+        ReplayTransport, also affects the executioners created by Query.
+    :type transport: Optional[Transport], optional
+    :param max_workers: Maximum number of requests that are in flight at the
+        same time, e.g. for queries with several region ids or for the
+        pages of allRegions queries. Defaults to the class attribute
+        max_workers, i.e. sequential execution.
+    :type max_workers: Optional[int], optional
+    :param page_size: Number of regions per page of allRegions queries,
+        defaults to the class attribute page_size.
+    :type page_size: Optional[int], optional
+    :param adaptive_paging: Chooses the page size of allRegions queries
+        from the responses of earlier pages instead, defaults to None
+    :type adaptive_paging: Optional[AdaptivePaging], optional
+    :param stream: Toggles streaming the pages of allRegions queries.
+        The regions are then decoded one at a time while the response is
+        downloaded, and the query_results of the ExecutionResults are a
+        lazy iterator that can be consumed once. The pages are requested
+        one after another. Defaults to the class attribute stream.
+    :type stream: Optional[bool], optional
+    :ivar transfer_stats: Bytes transferred by the last run_query call.
     :return: [description]
     :rtype: None
     """
 
     REQUEST_HEADER: Dict[str, str] = {"Content-Type": "application/json"}
     endpoint: str = "https://api-next.datengui.de/graphql"
+    max_workers: int = 1
+    page_size: int = 1000
+    stream: bool = False
+    transport: Transport = DEFAULT_TRANSPORT
+    _regions_path: List[str] = ["data", "allRegions", "regions"]
 
     def __init__(
         self,
         alternative_endpoint: Optional[str] = None,
         statistics_meta_data_provider=None,
+        transport: Optional[Transport] = None,
+        max_workers: Optional[int] = None,
+        page_size: Optional[int] = None,
+        adaptive_paging: Optional[AdaptivePaging] = None,
+        stream: Optional[bool] = None,
     ) -> None:
         if alternative_endpoint:
             self.endpoint = cast(str, alternative_endpoint)
 
+        if max_workers is not None:
+            if max_workers < 1:
+                raise ValueError("max_workers has to be at least 1.")
+            self.max_workers = max_workers
+        # limits the requests in flight, as the pages of allRegions queries
+        # are requested concurrently within the concurrent queries
+        self._request_slots = threading.BoundedSemaphore(self.max_workers)
+
+        if stream is not None:
+            self.stream = stream
+
+        self.transfer_stats = TransferStats()
+
+        self.paginator = Paginator(
+            self.page_size if page_size is None else page_size, adaptive_paging
+        )
+
+        if transport is not None:
+            self.transport = transport
+
         self.graph_ql_schema_meta_data_provider = GraphQlSchemaMetaDataProvider(
-            self.endpoint
+            self.endpoint, transport=self.transport
         )
 
         if statistics_meta_data_provider is None:
@@ -486,8 +986,8 @@ class QueryExecutioner(object):
         )
 
     @staticmethod
-    def _pagination_json(page: int) -> Json_Dict:
-        return {"page": page, "itemsPerPage": 1000}
+    def _pagination_json(page: int, items_per_page: int = 1000) -> Json_Dict:
+        return {"page": page, "itemsPerPage": items_per_page}
 
     def run_query(self, query) -> Optional[List[ExecutionResults]]:
         """[summary]
@@ -497,35 +997,66 @@ class QueryExecutioner(object):
         :return: [description]
         :rtype: Optional[List[ExecutionResults]]
         """
-        all_results = [
-            self._run_single_query_json(query_json, query._get_fields_with_types())
-            for query_json in self._generate_post_json(query)
-        ]
+        self.transfer_stats = TransferStats()
+        query_fields_with_types = query._get_fields_with_types()
+        all_results = self._map_concurrently(
+            lambda query_json: self._run_single_query_json(
+                query_json, query_fields_with_types
+            ),
+            self._generate_post_json(query),
+        )
         if not any(map(lambda r: r is None, all_results)):
             return [cast(ExecutionResults, r) for r in all_results]
         else:
             return None
 
+    def _map_concurrently(self, function: Callable[[T], R], items: List[T]) -> List[R]:
+        """Applies function to all items using at most max_workers threads.
+
+        The results are returned in the order of the input items, irrespective
+        of the order in which the requests finish. Exceptions raised
+        for any item are propagated to the caller. Calls may be nested, the
+        requests sent by all of them share the limit of max_workers.
+        """
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(items))
+        ) as executor:
+            return list(executor.map(function, items))
+
     def _run_single_query_json(
         self, query_json: Json_Dict, query_fields_with_types: List[Tuple[str, str]]
     ) -> Optional[ExecutionResults]:
-        if "allRegions" in [
+        if self.stream and "allRegions" in [
             field_with_types[0] for field_with_types in query_fields_with_types
         ]:
-            results = []
-            page = 0
-            while True:
-                query_json["variables"] = self._pagination_json(page)
-                result_page = self._send_request(query_json)
-                if result_page is None:
-                    return None
-                results.append(result_page)
-                if (cast(Json_Dict, result_page)["data"]["allRegions"]["page"] + 1) * (
-                    cast(Json_Dict, result_page)["data"]["allRegions"]["itemsPerPage"]
-                ) >= cast(Json_Dict, result_page)["data"]["allRegions"]["total"]:
-                    break
-                else:
-                    page += 1
+            return ExecutionResults(
+                query_results=cast(Json_List, self._stream_pages(query_json)),
+                meta_data=create_query_meta(
+                    self.stat_meta_data_provider, query_fields_with_types
+                ),
+            )
+        elif "allRegions" in [
+            field_with_types[0] for field_with_types in query_fields_with_types
+        ]:
+            started = time.monotonic()
+            first_page = self._send_page_request(
+                query_json, 0, self.paginator.first_page_size(query_json)
+            )
+            if first_page is None:
+                return None
+            # the first page already tells which pages remain, so they can
+            # be requested all at once instead of one after another
+            other_pages = self._map_concurrently(
+                lambda page: self._send_page_request(query_json, *page),
+                self.paginator.remaining_pages(
+                    query_json, first_page, time.monotonic() - started
+                ),
+            )
+            if any(map(lambda p: p is None, other_pages)):
+                return None
+            results = [first_page] + other_pages
         else:
             single_result = self._send_request(query_json)
             if single_result is None:
@@ -534,23 +1065,88 @@ class QueryExecutioner(object):
                 results = [single_result]
 
         if results:
-            meta: QueryResultsMeta = dict()
-            meta["statistics"] = self.stat_meta_data_provider.get_query_stat_meta(
-                query_fields_with_types
-            )
-            meta["enums"] = self.stat_meta_data_provider.get_query_enum_meta(
-                query_fields_with_types
-            )
-            meta["units"] = self.stat_meta_data_provider.get_query_unit_meta(
-                query_fields_with_types
-            )
             return ExecutionResults(
-                query_results=cast(Json_List, results), meta_data=meta
+                query_results=cast(Json_List, results),
+                meta_data=create_query_meta(
+                    self.stat_meta_data_provider, query_fields_with_types
+                ),
             )
-            print(meta)
         else:
             return None
 
+    def _send_page_request(
+        self, query_json: Json_Dict, page: int, items_per_page: int
+    ) -> Optional[Json_Dict]:
+        page_json = dict(
+            query_json, variables=self._pagination_json(page, items_per_page)
+        )
+        return self._send_request(page_json)
+
+    def _stream_pages(self, query_json: Json_Dict) -> Iterator[Json_Dict]:
+        """Requests the pages of an allRegions query one after another.
+
+        Each page is yielded before its response is decoded, with a lazy
+        stream of regions in place of the region list. The next page is
+        requested once the stream of the previous one has been consumed.
+        """
+        started = time.monotonic()
+        first_stream = self._send_page_stream(
+            query_json, 0, self.paginator.first_page_size(query_json)
+        )
+        yield self._streamed_page(first_stream)
+        if first_stream.document is None:
+            raise RuntimeError(
+                "The regions of a streamed page have to be consumed "
+                "before the next page can be requested."
+            )
+        remaining_pages = self.paginator.remaining_pages(
+            query_json,
+            cast(Json_Dict, first_stream.document),
+            time.monotonic() - started,
+            region_count=first_stream.item_count,
+            payload_bytes=first_stream.byte_count,
+        )
+        for page, items_per_page in remaining_pages:
+            yield self._streamed_page(
+                self._send_page_stream(query_json, page, items_per_page)
+            )
+
+    def _send_page_stream(
+        self, query_json: Json_Dict, page: int, items_per_page: int
+    ) -> JsonArrayStream:
+        page_json = dict(
+            query_json, variables=self._pagination_json(page, items_per_page)
+        )
+        return self.transport.post_stream(
+            self.endpoint,
+            page_json,
+            self._regions_path,
+            headers=self.REQUEST_HEADER,
+            transfer_stats=self.transfer_stats,
+        )
+
+    @staticmethod
+    def _streamed_page(region_stream: JsonArrayStream) -> Json_Dict:
+        def checked_regions() -> Iterator[Json_Dict]:
+            yield from region_stream
+            # errors are only known once the whole response was read
+            check_http200_body_error(cast(Json_Dict, region_stream.document))
+
+        return {"data": {"allRegions": {"regions": checked_regions()}}}
+
+    @staticmethod
+    def _remaining_pages(result_page: Json_Dict) -> List[int]:
+        """Determines the pages following result_page from the
+        pagination information it contains.
+
+        :param result_page: Response of an allRegions query.
+        :return: Page numbers that still have to be requested in order.
+        """
+        pagination = result_page["data"]["allRegions"]
+        items_per_page = max(pagination["itemsPerPage"], 1)
+        page_count = -(-pagination["total"] // items_per_page)
+        return list(range(pagination["page"] + 1, page_count))
+
     @staticmethod
     def _generate_post_json(query) -> List[Dict[str, str]]:
         jsons: List[Dict[str, str]] = []
@@ -561,16 +1157,12 @@ class QueryExecutioner(object):
         return jsons
 
     def _send_request(self, query_json: Json_Dict) -> Optional[Json_Dict]:
-        resp = requests.post(
-            self.endpoint, headers=self.REQUEST_HEADER, json=query_json
-        )
-        if resp.status_code == 200:
-            body_json = resp.json()
-            check_http200_body_error(body_json)
-            return body_json
-        else:
-            raise RuntimeError(
-                self.endpoint
-                + "\n"
-                + f"No result, got HTML status code {resp.status_code}"
+        with self._request_slots:
+            body_json = self.transport.post(
+                self.endpoint,
+                query_json,
+                headers=self.REQUEST_HEADER,
+                transfer_stats=self.transfer_stats,
             )
+        check_http200_body_error(body_json)
+        return body_json
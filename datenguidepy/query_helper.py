@@ -5,20 +5,38 @@ from datenguidepy.query_execution import (
     DEFAULT_STATISTICS_META_DATA_PROVIDER,
 )
 from datenguidepy.translation import DEFAULT_TRANSLATION_PROVIDER, TranslationProvider
+from datenguidepy.search import SearchIndex, STATISTIC_FIELD_WEIGHTS
+from datenguidepy.region_search import RegionIndex
+from datenguidepy.region_hierarchy import RegionHierarchy, Generation
+from datenguidepy.cache import DEFAULT_CACHE_DIR
 
-from typing import Dict, Any, cast, Optional, List
+from typing import Dict, Any, Callable, cast, Iterable, Optional, List, Set, Union
+import numpy as np
 import pandas as pd
-from functools import partial
+from functools import partial, lru_cache
 
+import json
 import os
+import sys
+import types
+
+# directory the search index of get_statistics is persisted in, None
+# keeps it in memory only
+SEARCH_INDEX_DIR: Optional[str] = DEFAULT_CACHE_DIR
+SEARCH_INDEX_FILE = "statistics_search.json.gz"
 
 PACKAGE_DATA_DIR = "package_data"
 PACKAGE_DATA_PATH = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), PACKAGE_DATA_DIR
 )
-ALL_REGIONS: pd.DataFrame = pd.read_csv(
-    os.path.join(PACKAGE_DATA_PATH, "regions.csv"), index_col="region_id"
-)
+
+
+@lru_cache(maxsize=None)
+def _load_all_regions() -> pd.DataFrame:
+    """Reads the regions once on first use, ALL_REGIONS refers to this frame."""
+    return pd.read_csv(
+        os.path.join(PACKAGE_DATA_PATH, "regions.csv"), index_col="region_id"
+    )
 
 
 class ConfigMapping:
@@ -47,13 +65,42 @@ class ConfigMapping:
         return self._mapping.values().__iter__()
 
 
+def get_region_hierarchy(
+    hirachy_frame: Optional[pd.DataFrame] = None,
+) -> RegionHierarchy:
+    """Integer coded hierarchy of regions for vectorised lookups of the
+    ancestors, descendants and siblings of many sets of regions at once.
+
+    :param hirachy_frame: Regions with level and parent columns,
+        defaults to ALL_REGIONS, whose hierarchy is only built once.
+    :return: The hierarchy of the regions.
+    """
+    if hirachy_frame is None or hirachy_frame is _load_all_regions():
+        return _default_region_hierarchy()
+    return RegionHierarchy(hirachy_frame)
+
+
+@lru_cache(maxsize=None)
+def _default_region_hierarchy() -> RegionHierarchy:
+    return RegionHierarchy(_load_all_regions())
+
+
+def _generation_rows(
+    hirachy_frame: Optional[pd.DataFrame], generations: Iterable[Generation]
+) -> pd.DataFrame:
+    if hirachy_frame is None:
+        hirachy_frame = _load_all_regions()
+    positions = [codes for _, codes in generations] or [np.zeros(0, dtype=np.int64)]
+    return hirachy_frame.iloc[np.concatenate(positions)].sort_index()
+
+
 def hirachy_up(
-    lowestids: str, hirachy_frame: pd.DataFrame = ALL_REGIONS
+    lowestids: Union[str, Iterable[str]], hirachy_frame: Optional[pd.DataFrame] = None
 ) -> pd.DataFrame:
     """[summary]
 
-    :param lowestids: [description]
-    :type lowestids: str
+    :param lowestids: A region id or several region ids.
+    :type lowestids: Union[str, Iterable[str]]
     :param hirachy_frame: [description], defaults to ALL_REGIONS
     :type hirachy_frame: pd.DataFrame, optional
     :raises RuntimeError: [description]
@@ -61,24 +108,21 @@ def hirachy_up(
     :return: [description]
     :rtype: pd.DataFrame
     """
-    anscestors = []
-    current_ids = lowestids
-    while len(current_ids) > 0:
-        current_regions = hirachy_frame.query("index.isin(@current_ids)")
-        anscestors.append(current_regions)
-        current_ids = current_regions.dropna().parent.unique()
-    return pd.concat(anscestors).sort_index()
+    hierarchy = get_region_hierarchy(hirachy_frame)
+    return _generation_rows(
+        hirachy_frame, hierarchy.ancestor_generations(*hierarchy.lookup([lowestids]))
+    )
 
 
 def hirachy_down(
-    highest_ids: str,
+    highest_ids: Union[str, Iterable[str]],
     lowest_level: str = "lau",
-    hirachy_frame: pd.DataFrame = ALL_REGIONS,
+    hirachy_frame: Optional[pd.DataFrame] = None,
 ) -> pd.DataFrame:
     """[summary]
 
-    :param highest_ids: [description]
-    :type highest_ids: str
+    :param highest_ids: A region id or several region ids.
+    :type highest_ids: Union[str, Iterable[str]]
     :param lowest_level: [description], defaults to "lau"
     :type lowest_level: str, optional
     :param hirachy_frame: [description], defaults to ALL_REGIONS
@@ -88,19 +132,17 @@ def hirachy_down(
     :return: [description]
     :rtype: pd.DataFrame
     """
-    descendents = [hirachy_frame.query("index.isin(@highest_ids)")]
-    current_ids = highest_ids
-    while len(current_ids) > 0:
-        current_regions = hirachy_frame.query("parent.isin(@current_ids)")
-        descendents.append(current_regions)
-        current_ids = current_regions.dropna().index.unique()
-        if lowest_level in current_regions.level.unique():
-            break
-    return pd.concat(descendents).sort_index()
+    hierarchy = get_region_hierarchy(hirachy_frame)
+    return _generation_rows(
+        hirachy_frame,
+        hierarchy.descendant_generations(
+            *hierarchy.lookup([highest_ids]), lowest_level=lowest_level
+        ),
+    )
 
 
 def siblings(
-    region_id: pd.DataFrame, hirachy_frame: pd.DataFrame = ALL_REGIONS
+    region_id: pd.DataFrame, hirachy_frame: Optional[pd.DataFrame] = None
 ) -> pd.DataFrame:
     """[summary]
 
@@ -113,10 +155,11 @@ def siblings(
     :return: [description]
     :rtype: pd.DataFrame
     """
-    parent = (  # noqa: F841
-        hirachy_frame.query("index == @region_id").loc[:, "parent"].iloc[0]
-    )
-    return hirachy_frame.query("parent == @parent")
+    hierarchy = get_region_hierarchy(hirachy_frame)
+    if hirachy_frame is None:
+        hirachy_frame = _load_all_regions()
+    _, positions = hierarchy.sibling_codes(*hierarchy.lookup([[region_id]]))
+    return hirachy_frame.iloc[positions]
 
 
 def get_regions() -> pd.DataFrame:
@@ -137,15 +180,70 @@ def get_regions() -> pd.DataFrame:
 
     :return: DataFrame with all regions.
     """
-    return ALL_REGIONS.copy()
+    return _load_all_regions().copy()
 
 
-state_regions: pd.DataFrame = get_regions().query('level == "nuts1"')
-federal_state_dictionary = {
-    region.name.replace("-", "_"): region.Index for region in state_regions.itertuples()
-}
+@lru_cache(maxsize=None)
+def get_region_index() -> RegionIndex:
+    """Typo tolerant lookup of all regions by name, built on first use
+    from regions.csv and names.json.
+
+    Its search method returns a list of RegionMatch tuples and takes
+    well below a millisecond, which makes it suitable for autocompletion.
+
+    :return: The index of all regions.
+    """
+    all_regions = _load_all_regions()
+    levels = all_regions["level"].to_dict()
+    with open(
+        os.path.join(PACKAGE_DATA_PATH, "names.json"), encoding="utf-8"
+    ) as names_file:
+        names = json.load(names_file)
+    regions = [
+        (region.Index, region.name, region.level) for region in all_regions.itertuples()
+    ]
+    regions.extend(
+        (region_id, name, levels[region_id])
+        for region_id, name in names.items()
+        if region_id in levels
+    )
+    return RegionIndex(regions)
+
+
+def search_regions(
+    name: str, limit: Optional[int] = 10, levels: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Regions whose names best match a (partial) name.
+
+    Umlauts may be spelled out ("Muenchen") and small typos are tolerated.
+    The last word is also matched as the beginning of a word, e.g.
+    "Frankfurt M" finds Frankfurt am Main.
+
+    :param name: Name of the region or its beginning.
+    :param limit: Maximum number of regions, defaults to 10,
+        None returns all matches.
+    :param levels: Only return regions of these levels (nuts1, nuts2,
+        nuts3, lau), defaults to None, meaning all levels.
+    :return: DataFrame of the matching regions with their name, level and
+        score of the match, the best match first.
+    """
+    matches = get_region_index().search(name, limit=limit, levels=levels)
+    return pd.DataFrame(
+        [match[1:] for match in matches],
+        index=pd.Index([match.region_id for match in matches], name="region_id"),
+        columns=["name", "level", "score"],
+    )
+
 
-federal_states = ConfigMapping(federal_state_dictionary)
+def _state_regions() -> pd.DataFrame:
+    return get_regions().query('level == "nuts1"')
+
+
+def _federal_state_dictionary() -> Dict[str, str]:
+    return {
+        region.name.replace("-", "_"): region.Index
+        for region in _state_regions().itertuples()
+    }
 
 
 def get_statistics(
@@ -166,8 +264,12 @@ def get_statistics(
     also allows to get a machine translated version for english of these
     descritpions.
 
-    :param search: Search term used for non-case-sensitive
-        search in the long description
+    :param search: Search terms. Only statistics matching any of them in
+        their code or their German or English descriptions are returned,
+        the best matches first. Words are compared by their stem, so
+        inflected forms and compound words match as well. Statistics whose
+        code starts with the search or whose short description contains it
+        follow after them. An empty search returns all statistics.
     :param translation_provider: Object used for translating the statistics.
         Defaults to  default translation provider if None
     :param target_language: language to translate statistic descriptions to,
@@ -192,25 +294,101 @@ def get_statistics(
             "please use one of {1}".format(target_language, valid_language_codes)
         )
 
-    stat_descr = stat_meta_data_provider.get_stat_descriptions()
+    stat_frame = _statistics_frame(stat_meta_data_provider)
 
-    stat_frame = pd.DataFrame(
-        [(stat, *stat_descr[stat]) for stat in stat_descr],
-        columns=["statistic", "short_description", "long_description"],
-    ).set_index("statistic")
+    if search is not None and search.strip():
+        search_index = _statistics_search_index(
+            stat_meta_data_provider, translation_provider
+        )
+        ranked = [stat for stat, _ in search_index.search(search)]
+        stat_frame = stat_frame.loc[
+            ranked + _substring_matches(stat_frame, search.strip(), set(ranked))
+        ]
+    else:
+        stat_frame = stat_frame.copy()
 
     if target_language != "de":
         translation_provider.translate_data_frame_from_german(
             stat_frame, target_language
         )
+    return stat_frame
 
-    if search is not None:
-        search_string = cast(str, search)  # noqa: F841
-        return stat_frame.query(
-            "short_description.str.contains(@search_string,case=False)"
-        )
-    else:
-        return stat_frame
+
+def _substring_matches(
+    stat_frame: pd.DataFrame, search: str, excluded: Set[str]
+) -> List[str]:
+    """Statistics whose code starts with search or whose short description
+    contains it, ignoring case, in frame order.
+    """
+    code_matches = stat_frame.index.str.lower().str.startswith(search.lower())
+    description_matches = stat_frame["short_description"].str.contains(
+        search, case=False, regex=False
+    )
+    matches = code_matches | description_matches.fillna(False).values
+    return [stat for stat in stat_frame.index[matches] if stat not in excluded]
+
+
+@lru_cache(maxsize=8)
+def _statistics_frame(stat_meta_data_provider) -> pd.DataFrame:
+    stat_descr = stat_meta_data_provider.get_stat_descriptions()
+    return pd.DataFrame(
+        [(stat, *stat_descr[stat]) for stat in stat_descr],
+        columns=["statistic", "short_description", "long_description"],
+    ).set_index("statistic")
+
+
+@lru_cache(maxsize=8)
+def _statistics_search_index(
+    stat_meta_data_provider, translation_provider: TranslationProvider
+) -> SearchIndex:
+    """Search index over the codes and the German and English descriptions
+    of the statistics. It is built on the first search and persisted in
+    SEARCH_INDEX_DIR, so that later processes only build it again if
+    the statistics or translations changed.
+    """
+    translate = translation_provider.is_valid_language_code("en")
+
+    def english(text: str) -> str:
+        if not translate:
+            return ""
+        return translation_provider.translate_from_german(text, "en")
+
+    documents = {
+        stat: {
+            "statistic": stat,
+            "short_description": short,
+            "long_description": long,
+            "short_description_en": english(short),
+            "long_description_en": english(long),
+        }
+        for stat, short, long in _statistics_frame(
+            stat_meta_data_provider
+        ).itertuples()
+    }
+    fingerprint = SearchIndex.document_fingerprint(documents)
+    path = (
+        None
+        if SEARCH_INDEX_DIR is None
+        else os.path.join(SEARCH_INDEX_DIR, SEARCH_INDEX_FILE)
+    )
+    if path is not None and os.path.exists(path):
+        try:
+            search_index = SearchIndex.load(path)
+            if search_index.fingerprint == fingerprint:
+                return search_index
+        except (OSError, EOFError, KeyError, TypeError, ValueError):
+            # a corrupt or truncated index file is rebuilt and overwritten,
+            # json.JSONDecodeError is a ValueError
+            pass
+    search_index = SearchIndex.build(documents, STATISTIC_FIELD_WEIGHTS)
+    if path is not None:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            search_index.save(path)
+        except OSError:
+            # e.g. a read only cache directory, the index stays in memory
+            pass
+    return search_index
 
 
 def get_availability_summary() -> pd.DataFrame:
@@ -360,3 +538,32 @@ def download_all_regions() -> pd.DataFrame:
     all_rg_parents.loc[all_rg_parents.level == "nuts1", "parent"] = "DG"
 
     return all_rg_parents
+
+
+# module attributes that are backed by package data and loaded on first access
+_LAZY_ATTRIBUTES: Dict[str, Callable[[], Any]] = {
+    "ALL_REGIONS": _load_all_regions,
+    "state_regions": _state_regions,
+    "federal_state_dictionary": _federal_state_dictionary,
+    "federal_states": lambda: ConfigMapping(_federal_state_dictionary()),
+}
+
+
+class _LazyModule(types.ModuleType):
+    """Module type that resolves the names in _LAZY_ATTRIBUTES on first
+    access, so that importing datenguidepy does not read the regions.
+    (Module level __getattr__ is not available before Python 3.7.)
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in _LAZY_ATTRIBUTES:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        value = _LAZY_ATTRIBUTES[name]()
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self) -> List[str]:
+        return sorted(set(super().__dir__()) | set(_LAZY_ATTRIBUTES))
+
+
+sys.modules[__name__].__class__ = _LazyModule
@@ -0,0 +1,194 @@
+from typing import List, Tuple, Optional, TYPE_CHECKING
+import threading
+import time
+
+if TYPE_CHECKING:  # pragma: no cover
+    # asyncio is imported where it is used, it takes long to import
+    import asyncio
+
+
+class TokenBucket(object):
+    """Limits the rate of requests sent to the API.
+
+    The bucket holds up to burst tokens and is refilled with rate tokens
+    per second. Every request takes one token and waits if none is left.
+    A single bucket can be shared by several threads as well as by
+    asyncio tasks, e.g. by an HttpTransport and an AsyncHttpTransport,
+    so that the combined request rate stays within the limit.
+
+    :param rate: Sustained number of requests per second.
+    :type rate: float
+    :param burst: Maximum number of requests that can be sent at once
+        after a quiet period, defaults to 1
+    :type burst: int, optional
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError("rate has to be positive.")
+        if burst < 1:
+            raise ValueError("burst has to be at least 1.")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long the caller has to wait
+        before it may send its request.
+
+        Tokens are handed out in order, so a token that is not available
+        yet is reserved for the caller by letting the bucket go into debt.
+
+        :return: Waiting time in seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Waits on the event loop until a request may be sent."""
+        import asyncio
+
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """Adjusts the number of requests in flight to what the API tolerates.
+
+    The limit follows the AIMD scheme known from TCP congestion control.
+    While responses arrive without errors and their latency stays within
+    latency_tolerance times the lowest latency seen so far, the limit grows
+    by one per window of completed requests (additive increase). A failed
+    request or a latency spike shrinks it by backoff_factor (multiplicative
+    decrease), at most once per smoothed latency so that a burst of errors
+    from the same window counts only once.
+
+    Like TokenBucket it can be shared by threads and asyncio tasks.
+    Requests exceeding the current limit wait until a slot is released.
+
+    :param initial_limit: Limit to start with, defaults to 4
+    :type initial_limit: int, optional
+    :param min_limit: Lower bound of the limit, defaults to 1
+    :type min_limit: int, optional
+    :param max_limit: Upper bound of the limit, defaults to 32
+    :type max_limit: int, optional
+    :param latency_tolerance: Factor of the lowest latency from which on a
+        response counts as latency spike, defaults to 2
+    :type latency_tolerance: float, optional
+    :param backoff_factor: Factor the limit is multiplied with on errors and
+        latency spikes, defaults to 0.5
+    :type backoff_factor: float, optional
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        backoff_factor: float = 0.5,
+    ) -> None:
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits have to satisfy 1 <= min <= initial <= max.")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+        self._limit = float(initial_limit)
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.smoothed_latency: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+        self._async_waiters: List[
+            Tuple["asyncio.AbstractEventLoop", "asyncio.Future[None]"]
+        ] = []
+
+    @property
+    def limit(self) -> int:
+        """Current maximum number of requests in flight."""
+        return int(self._limit)
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        with self._condition:
+            while not self._try_acquire():
+                self._condition.wait()
+
+    async def acquire_async(self) -> None:
+        """Waits on the event loop until a request may be sent."""
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        while True:
+            with self._condition:
+                if self._try_acquire():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, latency: float, success: bool) -> None:
+        """Frees the slot of a finished request and adapts the limit.
+
+        :param latency: Duration of the request in seconds.
+        :param success: Whether the request succeeded.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if success:
+                self._record_latency(latency)
+            spike = (
+                success
+                and self.min_latency is not None
+                and latency > self.latency_tolerance * self.min_latency
+            )
+            if not success or spike:
+                if now - self._last_decrease >= (self.smoothed_latency or 0.0):
+                    self._limit = max(
+                        float(self.min_limit), self._limit * self.backoff_factor
+                    )
+                    self._last_decrease = now
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake_up, waiter)
+
+    def _record_latency(self, latency: float) -> None:
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        if self.smoothed_latency is None:
+            self.smoothed_latency = latency
+        else:
+            self.smoothed_latency = 0.8 * self.smoothed_latency + 0.2 * latency
+
+
+def _wake_up(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
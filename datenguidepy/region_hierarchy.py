@@ -0,0 +1,180 @@
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# pairs of the number of a region set and a region code, see RegionHierarchy
+Generation = Tuple[np.ndarray, np.ndarray]
+
+_EMPTY_GENERATION: Generation = (
+    np.zeros(0, dtype=np.int64),
+    np.zeros(0, dtype=np.int64),
+)
+
+
+class RegionHierarchy(object):
+    """Parent and child relations of regions as integer arrays, for
+    vectorised traversals of the region hierarchy.
+
+    Every region is coded by its position in the frame. Parent ids that
+    are not regions of the frame themselves, like "DG" for the federal
+    states, get the codes after them. The children of every code are
+    stored in compressed sparse row layout: the children of code c are
+    children[child_offsets[c] : child_offsets[c + 1]], in frame order.
+
+    All lookups take many sets of region ids at once and traverse the
+    hierarchy one level per step for all of them together.
+
+    :param regions: Regions indexed by their id, with the columns level
+        and parent, like get_regions.
+    :type regions: pd.DataFrame
+    :raises ValueError: If the region ids are not unique.
+    """
+
+    def __init__(self, regions: pd.DataFrame) -> None:
+        if not regions.index.is_unique:
+            raise ValueError("The region ids of a hierarchy must be unique.")
+        self.size = len(regions)
+        parents = regions["parent"]
+        external_parents = parents[
+            parents.notna() & ~parents.isin(regions.index)
+        ].unique()
+        self.codes = regions.index.append(pd.Index(external_parents))
+        self.parents = self.codes.get_indexer(parents).astype(np.int64)
+        self.levels, self.level_names = pd.factorize(regions["level"])
+
+        children = np.flatnonzero(self.parents >= 0)
+        children = children[np.argsort(self.parents[children], kind="stable")]
+        self.children = children
+        self.child_offsets = np.zeros(len(self.codes) + 1, dtype=np.int64)
+        self.child_offsets[1:] = np.cumsum(
+            np.bincount(self.parents[children], minlength=len(self.codes))
+        )
+
+    def lookup(self, region_id_sets: Sequence[Iterable[str]]) -> Generation:
+        """Numbers of the sets and codes of their region ids, unknown ids
+        are left out. A single id is taken as a set of one id.
+        """
+        region_id_lists = [
+            [region_ids] if isinstance(region_ids, str) else list(region_ids)
+            for region_ids in region_id_sets
+        ]
+        groups = np.repeat(
+            np.arange(len(region_id_lists)),
+            [len(region_ids) for region_ids in region_id_lists],
+        )
+        codes = self.codes.get_indexer(
+            [region_id for region_ids in region_id_lists for region_id in region_ids]
+        )
+        known = codes >= 0
+        return self._unique(groups[known], codes[known])
+
+    def ancestor_generations(
+        self, groups: np.ndarray, codes: np.ndarray
+    ) -> Iterator[Generation]:
+        """The regions of every set, then their parents, grand parents
+        and so on, one generation per step.
+        """
+        in_frame = codes < self.size
+        groups, codes = self._unique(groups[in_frame], codes[in_frame])
+        while len(codes) > 0:
+            yield groups, codes
+            parents = self.parents[codes]
+            known = (parents >= 0) & (parents < self.size)
+            groups, codes = self._unique(groups[known], parents[known])
+
+    def descendant_generations(
+        self, groups: np.ndarray, codes: np.ndarray, lowest_level: Optional[str]
+    ) -> Iterator[Generation]:
+        """The regions of every set, then their children, grand children
+        and so on, one generation per step. The descendants of a set end
+        with the first generation containing a region of lowest_level.
+        """
+        in_frame = codes < self.size
+        yield self._unique(groups[in_frame], codes[in_frame])
+        lowest = (
+            self.level_names.get_loc(lowest_level)
+            if lowest_level in self.level_names
+            else -1
+        )
+        groups, codes = self._unique(groups, codes)
+        while len(codes) > 0:
+            groups, codes = self._children(groups, codes)
+            yield groups, codes
+            if lowest >= 0:
+                finished = np.unique(groups[self.levels[codes] == lowest])
+                unfinished = ~np.isin(groups, finished)
+                groups, codes = groups[unfinished], codes[unfinished]
+
+    def sibling_codes(self, groups: np.ndarray, codes: np.ndarray) -> Generation:
+        """All regions with the same parent as any region of a set."""
+        in_frame = codes < self.size
+        groups, parents = groups[in_frame], self.parents[codes[in_frame]]
+        has_parent = parents >= 0
+        return self._children(*self._unique(groups[has_parent], parents[has_parent]))
+
+    def ancestors(self, region_id_sets: Sequence[Iterable[str]]) -> List[np.ndarray]:
+        """Ids of the regions of every set and all their ancestors.
+
+        :param region_id_sets: Sets of region ids.
+        :return: Region ids per set, in frame order.
+        """
+        return self._ids_per_set(
+            len(region_id_sets),
+            self.ancestor_generations(*self.lookup(region_id_sets)),
+        )
+
+    def descendants(
+        self,
+        region_id_sets: Sequence[Iterable[str]],
+        lowest_level: Optional[str] = "lau",
+    ) -> List[np.ndarray]:
+        """Ids of the regions of every set and their descendants down to
+        lowest_level, see hirachy_down.
+
+        :param region_id_sets: Sets of region ids.
+        :param lowest_level: Level to stop at, defaults to "lau",
+            None returns all descendants.
+        :return: Region ids per set, in frame order.
+        """
+        return self._ids_per_set(
+            len(region_id_sets),
+            self.descendant_generations(
+                *self.lookup(region_id_sets), lowest_level=lowest_level
+            ),
+        )
+
+    def siblings(self, region_ids: Sequence[str]) -> List[np.ndarray]:
+        """Ids of the regions with the same parent as every region,
+        including the region itself.
+
+        :param region_ids: Region ids.
+        :return: Sibling ids per region, in frame order.
+        """
+        groups, codes = self.lookup([[region_id] for region_id in region_ids])
+        return self._ids_per_set(len(region_ids), [self.sibling_codes(groups, codes)])
+
+    def _children(self, groups: np.ndarray, codes: np.ndarray) -> Generation:
+        starts = self.child_offsets[codes]
+        counts = self.child_offsets[codes + 1] - starts
+        # positions in children of the children of all codes
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        children = self.children[np.arange(counts.sum()) + offsets]
+        return self._unique(np.repeat(groups, counts), children)
+
+    def _unique(self, groups: np.ndarray, codes: np.ndarray) -> Generation:
+        """Pairs without duplicates, ordered by set and then code."""
+        keys = np.unique(groups.astype(np.int64) * len(self.codes) + codes)
+        return keys // len(self.codes), keys % len(self.codes)
+
+    def _ids_per_set(
+        self, set_count: int, generations: Iterable[Generation]
+    ) -> List[np.ndarray]:
+        generations = list(generations) or [_EMPTY_GENERATION]
+        groups, codes = self._unique(
+            np.concatenate([groups for groups, _ in generations]),
+            np.concatenate([codes for _, codes in generations]),
+        )
+        bounds = np.searchsorted(groups, np.arange(set_count + 1))
+        region_ids = self.codes.values[codes]
+        return [region_ids[bounds[i] : bounds[i + 1]] for i in range(set_count)]
@@ -0,0 +1,278 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+LEVEL_ORDER: Dict[str, int] = {"nuts1": 0, "nuts2": 1, "nuts3": 2, "lau": 3}
+
+# words without meaning for the lookup, e.g. "am" in "Frankfurt am Main"
+STOPWORDS = frozenset(["a", "am", "an", "b", "bei", "d", "der", "i", "im", "in"])
+
+_FOLDINGS = [("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss")]
+_STRIPPING_FOLDINGS = [("ß", "ss")]
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_words(name: str, spell_out_umlauts: bool = True) -> List[str]:
+    """Lower case words of a region name with umlauts and ß spelled out
+    like "Muenchen" and other accents removed.
+
+    :param name: Name of a region or a part of it.
+    :param spell_out_umlauts: Toggles spelling out umlauts, defaults to
+        True, False strips their dots like "Munchen".
+    :return: The words of the name.
+    """
+    name = name.lower()
+    foldings = _FOLDINGS if spell_out_umlauts else _STRIPPING_FOLDINGS
+    for character, replacement in foldings:
+        name = name.replace(character, replacement)
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return [word for word in _WORD_PATTERN.findall(name) if word not in STOPWORDS]
+
+
+def trigrams(word: str) -> List[str]:
+    padded = f"^{word}$"
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+class RegionMatch(NamedTuple):
+    """A region found by a RegionIndex.
+
+    :param region_id: Id of the region, as used in queries.
+    :param name: Name of the region.
+    :param level: Hierarchy level of the region (nuts1, nuts2, nuts3 or lau).
+    :param score: Relevance of the match, 1.0 for a perfect match.
+    """
+
+    region_id: str
+    name: str
+    level: str
+    score: float
+
+
+class RegionIndex(object):
+    """Typo tolerant lookup of regions by name, for example to
+    autocomplete region names.
+
+    Names are indexed with umlauts spelled out ("Koeln") and with their
+    dots stripped ("Koln"), so both spellings are found.
+
+    The words of all names are kept in a sorted vocabulary, which serves
+    as prefix trie: the words starting with a prefix are found by
+    bisection. Words that do not match, e.g. because of typos, are
+    looked up in a trigram index of the vocabulary instead.
+
+    Regions are ranked by the number of query words they match, how well
+    and how completely they match the main part of their name (before
+    the first comma), and their hierarchy level, larger regions first.
+
+    :param regions: Id, name and level of every region. Several names
+        of the same region are all searched.
+    :type regions: Iterable[Tuple[str, str, str]]
+    """
+
+    PREFIX_WEIGHT: float = 0.9
+    FUZZY_WEIGHT: float = 0.8
+    # weight of words after the first comma, e.g. "Landkreis"
+    SUFFIX_WORD_WEIGHT: float = 0.5
+
+    MIN_FUZZY_SIMILARITY: float = 0.45
+    MAX_FUZZY_WORDS: int = 20
+
+    # bounds the memory of the memoised matches of query words
+    MAX_CACHED_WORDS: int = 4096
+
+    def __init__(self, regions: Iterable[Tuple[str, str, str]]) -> None:
+        self.region_ids: List[str] = []
+        self.names: List[str] = []
+        self.levels: List[str] = []
+        main_word_counts: List[int] = []
+        positions: Dict[str, int] = {}
+        word_regions: Dict[str, Dict[int, float]] = {}
+        for region_id, name, level in regions:
+            position = positions.get(region_id)
+            if position is None:
+                position = positions[region_id] = len(self.region_ids)
+                self.region_ids.append(region_id)
+                self.names.append(name)
+                self.levels.append(level)
+                main_word_counts.append(0)
+            main, _, suffix = name.partition(",")
+            main_words = normalize_words(main)
+            main_word_counts[position] = max(
+                main_word_counts[position], len(set(main_words))
+            )
+            for words, weight in [
+                (normalize_words(suffix), self.SUFFIX_WORD_WEIGHT),
+                (normalize_words(suffix, False), self.SUFFIX_WORD_WEIGHT),
+                (main_words, 1.0),
+                (normalize_words(main, False), 1.0),
+            ]:
+                for word in words:
+                    regions_of_word = word_regions.setdefault(word, {})
+                    regions_of_word[position] = max(
+                        weight, regions_of_word.get(position, 0.0)
+                    )
+        self._main_word_counts = np.maximum(np.array(main_word_counts), 1)
+        self._levels = np.array(self.levels, dtype=object)
+        # rank of every region among matches that score the same
+        self._tie_ranks = np.empty(len(self.region_ids), dtype=np.int64)
+        self._tie_ranks[
+            sorted(
+                range(len(self.region_ids)),
+                key=lambda position: (
+                    LEVEL_ORDER.get(self.levels[position], len(LEVEL_ORDER)),
+                    self.region_ids[position],
+                ),
+            )
+        ] = np.arange(len(self.region_ids))
+
+        # the postings of all words in the order of the sorted vocabulary,
+        # so the postings of all words with a common prefix are adjacent
+        self.vocabulary: List[str] = sorted(word_regions)
+        self._offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(
+            [len(word_regions[word]) for word in self.vocabulary]
+        )
+        self._posting_regions = np.fromiter(
+            (p for word in self.vocabulary for p in word_regions[word]),
+            dtype=np.int64,
+            count=self._offsets[-1],
+        )
+        self._posting_weights = np.fromiter(
+            (w for word in self.vocabulary for w in word_regions[word].values()),
+            dtype=np.float64,
+            count=self._offsets[-1],
+        )
+
+        self._word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        trigram_words: Dict[str, List[int]] = {}
+        trigram_counts = []
+        for word_id, word in enumerate(self.vocabulary):
+            word_trigrams = set(trigrams(word))
+            trigram_counts.append(len(word_trigrams))
+            for trigram in word_trigrams:
+                trigram_words.setdefault(trigram, []).append(word_id)
+        self._trigram_counts = np.array(trigram_counts, dtype=np.int64)
+        self._trigrams = {
+            trigram: np.array(word_ids, dtype=np.int64)
+            for trigram, word_ids in trigram_words.items()
+        }
+        self._word_matches: Dict[Tuple[str, bool], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def search(
+        self, query: str, limit: Optional[int] = 10, levels: Optional[List[str]] = None
+    ) -> List[RegionMatch]:
+        """Finds the regions best matching a (partial) name.
+
+        The last word of the query is completed as a prefix unless the
+        query ends with a space.
+
+        :param query: Name or beginning of the name of a region.
+        :param limit: Maximum number of results, defaults to 10,
+            None means all matches.
+        :param levels: Only return regions of these levels, defaults to
+            None, meaning all levels.
+        :return: The matching regions, best first.
+        """
+        words = normalize_words(query)
+        complete_last = bool(query) and not query[-1].isspace()
+        matched_words = np.zeros(len(self.region_ids), dtype=np.int64)
+        scores = np.zeros(len(self.region_ids))
+        for i, word in enumerate(words):
+            positions, word_scores = self._match(
+                word, complete_last and i == len(words) - 1
+            )
+            matched_words[positions] += 1
+            scores[positions] += word_scores
+
+        candidates = np.flatnonzero(matched_words)
+        if levels is not None:
+            candidates = candidates[np.isin(self._levels[candidates], levels)]
+        matched_words = matched_words[candidates]
+        coverage = np.minimum(matched_words / self._main_word_counts[candidates], 1.0)
+        relevance = scores[candidates] / max(len(words), 1) * (0.8 + 0.2 * coverage)
+        # relevance is at most 1, so more matched words always rank higher
+        primary = matched_words * 2 + np.round(relevance, 6)
+        if limit is not None and len(candidates) > limit:
+            if limit <= 0:
+                return []
+            threshold = np.partition(primary, len(primary) - limit)[-limit]
+            selected = primary >= threshold
+            candidates = candidates[selected]
+            primary = primary[selected]
+            relevance = relevance[selected]
+        order = np.lexsort((self._tie_ranks[candidates], -primary))[:limit]
+        return [
+            RegionMatch(
+                self.region_ids[position],
+                self.names[position],
+                self.levels[position],
+                float(score),
+            )
+            for position, score in zip(candidates[order], relevance[order])
+        ]
+
+    def _match(self, word: str, as_prefix: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and best scores of the regions matching a query word."""
+        match = self._word_matches.get((word, as_prefix))
+        if match is None:
+            spans = self._candidates(word, as_prefix)
+            positions = np.concatenate(
+                [
+                    self._posting_regions[self._offsets[start] : self._offsets[end]]
+                    for start, end, _ in spans
+                ]
+                or [np.zeros(0, dtype=np.int64)]
+            )
+            word_scores = np.concatenate(
+                [
+                    self._posting_weights[self._offsets[start] : self._offsets[end]]
+                    * weight
+                    for start, end, weight in spans
+                ]
+                or [np.zeros(0)]
+            )
+            best_scores = np.zeros(len(self.region_ids))
+            np.maximum.at(best_scores, positions, word_scores)
+            positions = np.flatnonzero(best_scores)
+            match = (positions, best_scores[positions])
+            if len(self._word_matches) >= self.MAX_CACHED_WORDS:
+                self._word_matches.clear()
+            self._word_matches[(word, as_prefix)] = match
+        return match
+
+    def _candidates(self, word: str, as_prefix: bool) -> List[Tuple[int, int, float]]:
+        """Spans of vocabulary words matching a query word and their weights."""
+        spans = []
+        if as_prefix:
+            start = bisect.bisect_left(self.vocabulary, word)
+            end = bisect.bisect_left(self.vocabulary, word + "\uffff", start)
+            if end > start:
+                spans.append((start, end, self.PREFIX_WEIGHT))
+        word_id = self._word_ids.get(word)
+        if word_id is not None:
+            spans.append((word_id, word_id + 1, 1.0))
+        elif not spans and len(word) >= 3:
+            spans.extend(
+                (word_id, word_id + 1, self.FUZZY_WEIGHT * similarity)
+                for word_id, similarity in self._similar_words(word)
+            )
+        return spans
+
+    def _similar_words(self, word: str) -> List[Tuple[int, float]]:
+        """Vocabulary words with a similar trigram set, by Dice coefficient."""
+        word_trigrams = set(trigrams(word))
+        word_ids = [self._trigrams[t] for t in word_trigrams if t in self._trigrams]
+        if not word_ids:
+            return []
+        shared = np.bincount(np.concatenate(word_ids), minlength=len(self.vocabulary))
+        similarities = 2 * shared / (len(word_trigrams) + self._trigram_counts)
+        similar = np.flatnonzero(similarities >= self.MIN_FUZZY_SIMILARITY)
+        similar = similar[np.argsort(-similarities[similar], kind="stable")]
+        return [
+            (int(word_id), float(similarities[word_id]))
+            for word_id in similar[: self.MAX_FUZZY_WORDS]
+        ]
@@ -0,0 +1,465 @@
+from typing import Dict, Any, Optional, List, Sequence, Tuple
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from abc import abstractmethod, ABC
+import gzip
+import json
+import random
+import threading
+import time
+
+from datenguidepy.cache import DiskResponseCache
+from datenguidepy.json_stream import JsonArrayStream, dump_gzip_json
+from datenguidepy.transport import Transport, TransferStats, DEFAULT_TRANSPORT
+
+Json_Dict = Dict[str, Any]
+
+
+class Cassette(object):
+    """Recorded GraphQL requests and their responses.
+
+    Requests are identified by their query and variables, the endpoint
+    is ignored so that a recording can be replayed against any endpoint.
+    Cassette files are gzip compressed json documents in which every
+    distinct query string is only stored once.
+
+    :param path: File the cassette is loaded from and saved to,
+        defaults to None, meaning the cassette is kept in memory only.
+    :type path: Optional[str], optional
+    """
+
+    VERSION: int = 1
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._interactions: Dict[str, Tuple[Json_Dict, bytes, float]] = dict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """Reads a cassette file written by save.
+
+        :param path: Path of the cassette file.
+        :raises ValueError: If the file has an unknown format version.
+        :return: The cassette with all recorded interactions.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as cassette_file:
+            content = json.load(cassette_file)
+        if content.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported cassette version {content.get('version')}.")
+        cassette = cls(path)
+        queries = content["queries"]
+        for interaction in content["interactions"]:
+            query_json = {
+                "query": queries[interaction["query"]],
+                "variables": interaction["variables"],
+            }
+            cassette.record(query_json, interaction["response"], interaction["latency"])
+        return cassette
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Writes the cassette to a file. An existing file is replaced
+        atomically, so it stays intact if writing fails.
+
+        :param path: Path of the cassette file, defaults to the path
+            the cassette was created with.
+        """
+        path = self.path if path is None else path
+        if path is None:
+            raise ValueError("The cassette has no path to save it to.")
+        queries: Dict[str, int] = dict()
+        interactions: List[Json_Dict] = []
+        with self._lock:
+            recorded = list(self._interactions.values())
+        for query_json, response, latency in recorded:
+            query_index = queries.setdefault(query_json.get("query"), len(queries))
+            interactions.append(
+                {
+                    "query": query_index,
+                    "variables": query_json.get("variables"),
+                    "latency": round(latency, 4),
+                    "response": json.loads(response),
+                }
+            )
+        content = {
+            "version": self.VERSION,
+            "queries": list(queries),
+            "interactions": interactions,
+        }
+        dump_gzip_json(content, path)
+        self.path = path
+
+    def record(
+        self, query_json: Json_Dict, response: Json_Dict, latency: float
+    ) -> None:
+        """Adds or replaces the response to a request.
+
+        :param query_json: Request body containing the query and variables.
+        :param response: The json response body.
+        :param latency: Seconds it took to receive the response.
+        """
+        encoded = json.dumps(response, separators=(",", ":")).encode("utf-8")
+        query_json = {
+            "query": query_json.get("query"),
+            "variables": query_json.get("variables"),
+        }
+        with self._lock:
+            self._interactions[self.request_key(query_json)] = (
+                query_json,
+                encoded,
+                latency,
+            )
+
+    def response(self, query_json: Json_Dict) -> Optional[Tuple[bytes, float]]:
+        """Looks up the response to a request.
+
+        :param query_json: Request body containing the query and variables.
+        :return: The utf-8 encoded response body and the recorded latency
+            or None if the request was not recorded.
+        """
+        with self._lock:
+            interaction = self._interactions.get(self.request_key(query_json))
+        if interaction is None:
+            return None
+        return interaction[1], interaction[2]
+
+    @staticmethod
+    def request_key(query_json: Json_Dict) -> str:
+        return DiskResponseCache.request_key("", query_json)
+
+    def __len__(self) -> int:
+        return len(self._interactions)
+
+
+class RecordingTransport(object):
+    """Sends requests with another transport and records the responses
+    into a cassette.
+
+    Responses with a status code other than 200 raise as usual and
+    are not recorded. Call cassette.save() once recording is done.
+
+    :param cassette: Cassette the responses are added to.
+    :type cassette: Cassette
+    :param transport: Transport sending the requests,
+        defaults to the shared DEFAULT_TRANSPORT.
+    :type transport: Optional[Transport], optional
+    """
+
+    def __init__(
+        self, cassette: Cassette, transport: Optional[Transport] = None
+    ) -> None:
+        self.cassette = cassette
+        self.transport = DEFAULT_TRANSPORT if transport is None else transport
+
+    def post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> Json_Dict:
+        started = time.monotonic()
+        body_json = self.transport.post(endpoint, query_json, headers, transfer_stats)
+        self.cassette.record(query_json, body_json, time.monotonic() - started)
+        return body_json
+
+    def post_stream(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        path: Sequence[str],
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> JsonArrayStream:
+        # the complete response is needed for the recording anyway
+        body_json = self.post(endpoint, query_json, headers, transfer_stats)
+        return JsonArrayStream(
+            [json.dumps(body_json, separators=(",", ":")).encode("utf-8")], path
+        )
+
+
+class ReplayTransport(object):
+    """Answers requests from a cassette without network access.
+
+    The latency of a response is simulated by sleeping before returning
+    it, which makes the concurrent and paginated code paths behave like
+    against a real server while being reproducible.
+
+    :param cassette: Cassette with the recorded responses.
+    :type cassette: Cassette
+    :param latency: Seconds every request takes, defaults to 0.0.
+        None replays the latency that was recorded for each response.
+    :type latency: Optional[float], optional
+    :param bandwidth: Simulated download speed in bytes per second,
+        defaults to None, meaning unlimited.
+    :type bandwidth: Optional[float], optional
+    """
+
+    STREAM_CHUNK_SIZE: int = 64 * 1024
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: Optional[float] = 0.0,
+        bandwidth: Optional[float] = None,
+    ) -> None:
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("bandwidth has to be positive.")
+        self.cassette = cassette
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> Json_Dict:
+        """Returns the recorded response to a request.
+
+        :raises RuntimeError: If the request was not recorded.
+        :return: The json response body.
+        """
+        response = self._replay(endpoint, query_json, transfer_stats)
+        return json.loads(response)
+
+    def post_stream(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        path: Sequence[str],
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> JsonArrayStream:
+        response = self._replay(endpoint, query_json, transfer_stats)
+        chunks = [
+            response[start : start + self.STREAM_CHUNK_SIZE]
+            for start in range(0, len(response), self.STREAM_CHUNK_SIZE)
+        ]
+        return JsonArrayStream(chunks, path)
+
+    def _replay(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        transfer_stats: Optional[TransferStats],
+    ) -> bytes:
+        interaction = self.cassette.response(query_json)
+        if interaction is None:
+            raise RuntimeError(
+                endpoint + "\n" + "No result, the request is not in the cassette"
+            )
+        response, recorded_latency = interaction
+        time.sleep(self.delay(len(response), recorded_latency))
+        if transfer_stats is not None:
+            sent_bytes = len(json.dumps(query_json).encode("utf-8"))
+            transfer_stats.add(sent_bytes, len(response), len(response))
+        return response
+
+    def delay(self, size: int, recorded_latency: float) -> float:
+        """Simulated duration of a request.
+
+        :param size: Size of the response in bytes.
+        :param recorded_latency: Latency recorded for the response.
+        :return: Seconds to wait before returning the response.
+        """
+        delay = recorded_latency if self.latency is None else self.latency
+        if self.bandwidth is not None:
+            delay += size / self.bandwidth
+        return delay
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _GraphQlRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        stand_in: LocalGraphQlServer = self.server.stand_in  # type: ignore
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if stand_in.fail_request():
+            time.sleep(stand_in.latency or 0.0)
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            query_json = json.loads(body.decode("utf-8"))
+            answer = stand_in.respond(query_json)
+        except Exception as error:
+            self._send(500, json.dumps({"message": str(error)}).encode("utf-8"))
+            return
+        if answer is None:
+            self._send(404, b'{"message": "No recorded response"}')
+            return
+        response, latency = answer
+        time.sleep(latency)
+        self._send(200, response)
+
+    def _send(self, status: int, response: bytes) -> None:
+        stand_in: LocalGraphQlServer = self.server.stand_in  # type: ignore
+        if "gzip" in self.headers.get("Accept-Encoding", "") and stand_in.compress:
+            response = gzip.compress(response)
+            content_encoding: Optional[str] = "gzip"
+        else:
+            content_encoding = None
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        if content_encoding is not None:
+            self.send_header("Content-Encoding", content_encoding)
+        self.end_headers()
+        chunk_size = stand_in.WRITE_CHUNK_SIZE
+        for start in range(0, len(response), chunk_size):
+            chunk = response[start : start + chunk_size]
+            self.wfile.write(chunk)
+            if stand_in.bandwidth is not None:
+                time.sleep(len(chunk) / stand_in.bandwidth)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class LocalGraphQlServer(ABC):
+    """Stand-in GraphQL endpoint on localhost.
+
+    The server answers POST requests in background threads, so that the
+    complete HTTP stack including connection pooling, compression and
+    retries is exercised. Subclasses decide on the responses by
+    implementing respond. The server can be used as a context manager,
+    queries are sent to its endpoint url::
+
+        with ReplayServer(Cassette.load("cassette.json.gz"), latency=0.05) as server:
+            QueryExecutioner(server.endpoint).run_query(query)
+
+    :param latency: Seconds added to every response, defaults to 0.0
+    :type latency: float, optional
+    :param bandwidth: Simulated upload speed of the server in bytes per
+        second, defaults to None, meaning unlimited.
+    :type bandwidth: Optional[float], optional
+    :param compress: Toggles gzip compressing responses for clients
+        accepting it, defaults to True
+    :type compress: bool, optional
+    :param port: Port to listen on, defaults to 0, meaning any free port.
+    :type port: int, optional
+    :param error_rate: Fraction of requests answered with status code 503
+        instead, e.g. to exercise retries, defaults to 0.0
+    :type error_rate: float, optional
+    :param seed: Seed of the random failures, defaults to None
+    :type seed: Optional[int], optional
+    """
+
+    WRITE_CHUNK_SIZE: int = 16 * 1024
+
+    # subclasses may allow None, e.g. to replay recorded latencies
+    latency: Optional[float]
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        compress: bool = True,
+        port: int = 0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("bandwidth has to be positive.")
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate has to be between 0 and 1.")
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.compress = compress
+        self.port = port
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._server: Optional[_ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @abstractmethod
+    def respond(self, query_json: Json_Dict) -> Optional[Tuple[bytes, float]]:
+        """Answers a request, called from the request handling threads.
+
+        :param query_json: Request body containing the query and variables.
+        :return: The utf-8 encoded response body and the seconds to wait
+            before sending it, usually the latency attribute, or None to
+            respond with status code 404.
+        """
+
+    def fail_request(self) -> bool:
+        if self.error_rate == 0.0:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    @property
+    def endpoint(self) -> str:
+        if self._server is None:
+            raise RuntimeError("The server is not running.")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def start(self) -> "LocalGraphQlServer":
+        if self._server is None:
+            self._server = _ThreadingHTTPServer(
+                ("127.0.0.1", self.port), _GraphQlRequestHandler
+            )
+            self._server.stand_in = self  # type: ignore
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if self._thread is not None:
+                self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self) -> "LocalGraphQlServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+class ReplayServer(LocalGraphQlServer):
+    """Serves the responses of a cassette on localhost,
+    see LocalGraphQlServer.
+
+    :param cassette: Cassette with the recorded responses.
+    :type cassette: Cassette
+    :param latency: Seconds added to every response, defaults to 0.0.
+        None replays the latency that was recorded for each response.
+    :type latency: Optional[float], optional
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: Optional[float] = 0.0,
+        bandwidth: Optional[float] = None,
+        compress: bool = True,
+        port: int = 0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(0.0, bandwidth, compress, port, error_rate, seed)
+        self.cassette = cassette
+        self.latency = latency
+
+    def respond(self, query_json: Json_Dict) -> Optional[Tuple[bytes, float]]:
+        interaction = self.cassette.response(query_json)
+        if interaction is None:
+            return None
+        response, recorded_latency = interaction
+        return response, recorded_latency if self.latency is None else self.latency
@@ -1,12 +1,15 @@
+from typing import Any, Callable, Iterator, List, Sequence, Tuple
+from functools import lru_cache
 import os
 import json
 
+SCHEMA_JSON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "package_data", "schema.json"
+)
+
 
 def get_schema_json():
-    curr_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(curr_dir, "package_data")
-    schema_json_path = os.path.join(data_dir, "schema.json")
-    with open(schema_json_path, "r") as schema_file:
+    with open(SCHEMA_JSON_PATH, "r") as schema_file:
         full_json = json.load(schema_file)
 
     return full_json
@@ -19,27 +22,92 @@ def get_simple_json_path(json, path_list):
         return get_simple_json_path(json.get(path_list[0]), path_list[1:])
 
 
+WILDCARD = ".."
+
+Nodes = Iterator[Any]
+Step = Callable[[Nodes], Nodes]
+
+
+def _wildcard_step(nodes: Nodes) -> Nodes:
+    for node in nodes:
+        yield from node.values()
+
+
+def _key_step(key: str) -> Step:
+    def step(nodes: Nodes) -> Nodes:
+        for node in nodes:
+            value = node.get(key)
+            if value is not None:
+                yield value
+
+    return step
+
+
+class JsonPath(object):
+    """Path through nested json compiled into a chain of generators.
+
+    Every key of the path selects that key of the current nodes, skipping
+    nodes where it is missing or None, the wildcard ".." selects all values
+    of the current nodes. Matches are produced lazily in document order
+    without intermediate lists. Use compile_json_path to create paths.
+
+    :param path: Keys and wildcards leading to the selected nodes.
+    :type path: Tuple[str, ...]
+    """
+
+    def __init__(self, path: Tuple[str, ...]) -> None:
+        self.path = path
+        self._steps: List[Step] = [
+            _wildcard_step if key == WILDCARD else _key_step(key) for key in path
+        ]
+
+    def iterate(self, json_list: List[Any]) -> Nodes:
+        """Yields the nodes matching the path.
+
+        :param json_list: List of the nodes to start from.
+        """
+        nodes: Nodes = iter(json_list)
+        for step in self._steps:
+            nodes = step(nodes)
+        return nodes
+
+    def project(
+        self, json_list: List[Any], leaf_keys: Sequence[str], default: Any = "Missing"
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Yields the values of several keys of every matching node,
+        so that they are collected in a single traversal.
+
+        :param json_list: List of the nodes to start from.
+        :param leaf_keys: Keys to select from every matching node.
+        :param default: Value for keys a node does not have.
+        """
+        for node in self.iterate(json_list):
+            yield tuple(node.get(key, default) for key in leaf_keys)
+
+
+@lru_cache(maxsize=256)
+def compile_json_path(path: Tuple[str, ...]) -> JsonPath:
+    """Compiles a path, compiled paths are memoised.
+
+    :param path: Keys and wildcards ".." of the path.
+    :return: The reusable compiled path.
+    """
+    return JsonPath(path)
+
+
 def get_json_path(json, path_list, default="Missing"):
+    """Values at the end of a path through a list of json nodes.
+
+    The last key of the path is looked up with default for nodes that
+    do not have it, see JsonPath for the other keys.
+    """
     if json == [] or len(path_list) == 0:
         return json
-    else:
-        next_val = path_list[0]
-        if next_val == "..":
-            return [
-                elem
-                for sub_j in json
-                for v in sub_j.values()
-                for elem in get_json_path([v], path_list[1:])
-            ]
-        elif len(path_list) == 1:
-            return [sub_j.get(next_val, default) for sub_j in json]
-        else:
-            sub_jsons = [sub_j for sub_j in json if sub_j.get(next_val) is not None]
-            return [
-                elem
-                for sub_j in sub_jsons
-                for elem in get_json_path([sub_j.get(next_val)], path_list[1:])
-            ]
+    *parent_path, last = path_list
+    parent = compile_json_path(tuple(parent_path))
+    if last == WILDCARD:
+        return list(_wildcard_step(parent.iterate(json)))
+    return [values[0] for values in parent.project(json, (last,), default)]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+from typing import Dict, Any, List, NamedTuple, Optional
+import datetime
+import gzip
+import hashlib
+import json
+import os
+
+from datenguidepy.json_stream import dump_gzip_json
+
+Json_Dict = Dict[str, Any]
+
+
+class SchemaSnapshot(NamedTuple):
+    """Introspection result of all types of a GraphQL endpoint.
+
+    :param endpoint: Url of the endpoint the snapshot was taken from.
+    :param created: ISO 8601 timestamp of the snapshot.
+    :param schema_hash: Hash identifying the schema, see schema_hash.
+    :param types: The types as returned by a __schema introspection query.
+    """
+
+    endpoint: str
+    created: str
+    schema_hash: str
+    types: List[Json_Dict]
+
+    FORMAT_VERSION = 1
+    TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+    @classmethod
+    def create(cls, endpoint: str, types: List[Json_Dict]) -> "SchemaSnapshot":
+        return cls(
+            endpoint,
+            datetime.datetime.now(datetime.timezone.utc).strftime(cls.TIME_FORMAT),
+            schema_hash(types),
+            types,
+        )
+
+    def age(self) -> datetime.timedelta:
+        created = datetime.datetime.strptime(self.created, self.TIME_FORMAT)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return now - created.replace(tzinfo=datetime.timezone.utc)
+
+
+def schema_hash(types: List[Json_Dict]) -> str:
+    """Hash of the introspected types independent of their order.
+
+    :param types: The types as returned by a __schema introspection query.
+    :return: Hex digest of the types.
+    """
+    canonical_types = json.dumps(
+        sorted(types, key=lambda type_json: type_json["name"]),
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical_types.encode("utf-8")).hexdigest()
+
+
+def load_snapshot(path: str) -> Optional[SchemaSnapshot]:
+    """Reads a snapshot written by save_snapshot.
+
+    :param path: Path of the snapshot.
+    :raises ValueError: If the file has an unknown format version.
+    :return: The snapshot or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as snapshot_file:
+        content = json.load(snapshot_file)
+    if content.get("version") != SchemaSnapshot.FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported schema snapshot version {content.get('version')}."
+        )
+    return SchemaSnapshot(
+        content["endpoint"],
+        content["created"],
+        content["schema_hash"],
+        content["types"],
+    )
+
+
+def save_snapshot(snapshot: SchemaSnapshot, path: str) -> None:
+    """Writes a snapshot as gzip compressed json, replacing an existing
+    file atomically.
+
+    :param snapshot: The snapshot.
+    :param path: Path of the snapshot.
+    """
+    content = dict(snapshot._asdict(), version=SchemaSnapshot.FORMAT_VERSION)
+    dump_gzip_json(content, path)
@@ -0,0 +1,419 @@
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from typing_extensions import Protocol
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import warnings
+
+from datenguidepy.cache import DEFAULT_CACHE_DIR, SqliteConnections
+from datenguidepy.schema_json_meta import SCHEMA_JSON_PATH, get_schema_json
+
+Json_Dict = Dict[str, Any]
+
+T = TypeVar("T")
+
+# store compiled by tasks/compile_schema_store.py, e.g. before building
+# a distribution, it is not part of the repository
+DEFAULT_SCHEMA_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "package_data", "schema.sqlite"
+)
+
+# directory a store is compiled into on first use if there is no up to date
+# store at the configured path, None parses schema.json instead
+SCHEMA_STORE_CACHE_DIR: Optional[str] = DEFAULT_CACHE_DIR
+
+FORMAT_VERSION = 1
+
+GESAMT_UPDATE = {"GESAMT": "Gesamt"}
+
+# name, unit name, short description, long description, unit
+MeasureRow = Tuple[str, str, Optional[str], Optional[str], str]
+
+
+class StatisticsSchema(Protocol):
+    """Lookups of the statistics in schema.json that the
+    StatisticsSchemaJsonMetaDataProvider needs.
+    """
+
+    def stat_names(self) -> List[str]: ...
+
+    def is_statistic(self, name: str) -> bool: ...
+
+    def stat_description(self, name: str) -> Optional[Tuple[str, str]]: ...
+
+    def stat_descriptions(self) -> Dict[str, Tuple[str, str]]: ...
+
+    def stat_unit(self, name: str) -> Optional[str]: ...
+
+    def stat_units(self) -> Dict[str, str]: ...
+
+    def enum_values(self, dimension: str) -> Optional[Dict[str, str]]: ...
+
+    def all_enum_values(self) -> Dict[str, Dict[str, str]]: ...
+
+
+def _measure_rows(schema_json: Json_Dict) -> Iterator[MeasureRow]:
+    for statistic in schema_json.values():
+        measures = statistic.get("measures")
+        if measures is None:
+            continue
+        for stat_name, measure in measures.items():
+            # units are keyed by the name attribute, which differs
+            # from the key of the measure for a few statistics
+            yield (
+                stat_name,
+                measure.get("name", "Missing"),
+                measure.get("title_de", "Missing"),
+                measure.get("definition_de", "Missing"),
+                measure["units"][0]["measure_name_de"],
+            )
+
+
+def _dimension_value_names(schema_json: Json_Dict) -> Dict[str, Dict[str, str]]:
+    """Value names of every dimension as given by the first measure
+    that has the dimension.
+    """
+    value_names: Dict[str, Dict[str, str]] = OrderedDict()
+    for statistic in schema_json.values():
+        for measure in (statistic.get("measures") or {}).values():
+            for name, dimension in (measure.get("dimensions") or {}).items():
+                if dimension.get("value_names") is not None:
+                    value_names.setdefault(name, dimension["value_names"])
+    return value_names
+
+
+class SchemaIndex(object):
+    """Statistics of a parsed schema.json, indexed in memory.
+
+    :param schema_json: Content of schema.json.
+    :type schema_json: Json_Dict
+    """
+
+    def __init__(self, schema_json: Json_Dict) -> None:
+        self._stat_names: List[str] = []
+        self._stat_descriptions: Dict[str, Tuple[str, str]] = {}
+        self._stat_units: Dict[str, str] = {}
+        for name, unit_name, title, definition, unit in _measure_rows(schema_json):
+            self._stat_names.append(name)
+            self._stat_descriptions[name] = (title, definition)
+            self._stat_units[unit_name] = unit
+        self._stat_name_set = frozenset(self._stat_names)
+        self._enum_values = {
+            name: dict(value_names, **GESAMT_UPDATE)
+            for name, value_names in _dimension_value_names(schema_json).items()
+        }
+
+    def stat_names(self) -> List[str]:
+        return list(self._stat_names)
+
+    def is_statistic(self, name: str) -> bool:
+        return name in self._stat_name_set
+
+    def stat_description(self, name: str) -> Optional[Tuple[str, str]]:
+        return self._stat_descriptions.get(name)
+
+    def stat_descriptions(self) -> Dict[str, Tuple[str, str]]:
+        return dict(self._stat_descriptions)
+
+    def stat_unit(self, name: str) -> Optional[str]:
+        return self._stat_units.get(name)
+
+    def stat_units(self) -> Dict[str, str]:
+        return dict(self._stat_units)
+
+    def enum_values(self, dimension: str) -> Optional[Dict[str, str]]:
+        values = self._enum_values.get(dimension)
+        return None if values is None else dict(values)
+
+    def all_enum_values(self) -> Dict[str, Dict[str, str]]:
+        return {name: dict(values) for name, values in self._enum_values.items()}
+
+
+class SchemaStore(object):
+    """Statistics of schema.json, compiled into a SQLite database by
+    compile_schema_store.
+
+    Nothing is read on construction and lookups of single statistics are
+    indexed queries, so the start up time does not depend on the size of
+    the schema. The tables that are needed in full, like the descriptions
+    of all statistics, are read on their first use and kept.
+
+    :param path: Path of the compiled store.
+    :type path: str
+    :raises ValueError: On the first lookup, if the store has an
+        unknown format version.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._connections = SqliteConnections(
+            path, self._check_format_version, read_only=True
+        )
+        self._tables: Dict[str, Any] = {}
+        self._tables_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    @classmethod
+    def _check_format_version(cls, connection: sqlite3.Connection) -> None:
+        version = cls._meta(connection, "format_version")
+        if version != str(FORMAT_VERSION):
+            raise ValueError(f"Unsupported schema store version {version}.")
+
+    @staticmethod
+    def _meta(connection: sqlite3.Connection, key: str) -> Optional[str]:
+        try:
+            row = connection.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.DatabaseError:
+            return None
+        return None if row is None else row[0]
+
+    def _table(self, name: str, load: Callable[[], T]) -> T:
+        table = self._tables.get(name)
+        if table is None:
+            with self._tables_lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = self._tables[name] = load()
+        return table
+
+    def source_hash(self) -> Optional[str]:
+        """Hash of the schema.json the store was compiled from."""
+        return self._meta(self._connection(), "source_hash")
+
+    def stat_names(self) -> List[str]:
+        return [
+            name
+            for (name,) in self._connection().execute(
+                "SELECT name FROM measures ORDER BY position"
+            )
+        ]
+
+    def is_statistic(self, name: str) -> bool:
+        return name in self._table("stat_names", self._load_stat_name_set)
+
+    def _load_stat_name_set(self) -> FrozenSet[str]:
+        return frozenset(
+            name
+            for (name,) in self._connection().execute(
+                "SELECT DISTINCT name FROM measures"
+            )
+        )
+
+    def stat_description(self, name: str) -> Optional[Tuple[str, str]]:
+        # like in schema.json, later measures of the same name take precedence
+        row = (
+            self._connection()
+            .execute(
+                "SELECT title_de, definition_de FROM measures WHERE name = ? "
+                "ORDER BY position DESC LIMIT 1",
+                (name,),
+            )
+            .fetchone()
+        )
+        return None if row is None else (row[0], row[1])
+
+    def stat_descriptions(self) -> Dict[str, Tuple[str, str]]:
+        return dict(self._table("stat_descriptions", self._load_stat_descriptions))
+
+    def _load_stat_descriptions(self) -> Dict[str, Tuple[str, str]]:
+        descriptions: Dict[str, Tuple[str, str]] = {}
+        for name, title, definition in self._connection().execute(
+            "SELECT name, title_de, definition_de FROM measures ORDER BY position"
+        ):
+            descriptions[name] = (title, definition)
+        return descriptions
+
+    def stat_unit(self, name: str) -> Optional[str]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT unit FROM measures WHERE unit_name = ? "
+                "ORDER BY position DESC LIMIT 1",
+                (name,),
+            )
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def stat_units(self) -> Dict[str, str]:
+        return dict(self._table("stat_units", self._load_stat_units))
+
+    def _load_stat_units(self) -> Dict[str, str]:
+        return dict(
+            self._connection().execute(
+                "SELECT unit_name, unit FROM measures ORDER BY position"
+            )
+        )
+
+    def enum_values(self, dimension: str) -> Optional[Dict[str, str]]:
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT code, label FROM enum_values WHERE dimension = ? "
+                "ORDER BY position",
+                (dimension,),
+            )
+            .fetchall()
+        )
+        if not rows:
+            return None
+        return dict(rows, **GESAMT_UPDATE)
+
+    def all_enum_values(self) -> Dict[str, Dict[str, str]]:
+        return {
+            dimension: dict(values)
+            for dimension, values in self._table(
+                "enum_values", self._load_all_enum_values
+            ).items()
+        }
+
+    def _load_all_enum_values(self) -> Dict[str, Dict[str, str]]:
+        enum_values: Dict[str, Dict[str, str]] = {}
+        for dimension, code, label in self._connection().execute(
+            "SELECT dimension, code, label FROM enum_values ORDER BY position"
+        ):
+            enum_values.setdefault(dimension, {})[code] = label
+        return {
+            dimension: dict(values, **GESAMT_UPDATE)
+            for dimension, values in enum_values.items()
+        }
+
+
+def compile_schema_store(
+    schema_json_path: str = SCHEMA_JSON_PATH, path: str = DEFAULT_SCHEMA_STORE_PATH
+) -> None:
+    """Compiles schema.json into the SQLite database read by SchemaStore.
+
+    Only the names, descriptions, units and enum values of the statistics
+    are kept. The file is replaced atomically, so that processes can
+    compile the same store at the same time.
+
+    :param schema_json_path: Path of schema.json, defaults to the bundled one.
+    :param path: Path of the store, defaults to the bundled store.
+    """
+    with open(schema_json_path, "rb") as schema_file:
+        content = schema_file.read()
+    schema_json = json.loads(content.decode("utf-8"))
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=os.path.basename(path) + ".",
+        suffix=".tmp",
+    )
+    os.close(file_descriptor)
+    connection = sqlite3.connect(temporary_path)
+    try:
+        connection.executescript(
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE measures (position INTEGER PRIMARY KEY, "
+            "name TEXT NOT NULL, unit_name TEXT, title_de TEXT, "
+            "definition_de TEXT, unit TEXT);"
+            "CREATE INDEX measures_name ON measures(name);"
+            "CREATE INDEX measures_unit_name ON measures(unit_name);"
+            "CREATE TABLE enum_values (position INTEGER PRIMARY KEY, "
+            "dimension TEXT NOT NULL, code TEXT NOT NULL, label TEXT);"
+            "CREATE INDEX enum_values_dimension ON enum_values(dimension);"
+        )
+        connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [
+                ("format_version", str(FORMAT_VERSION)),
+                ("source_hash", hashlib.sha256(content).hexdigest()),
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO measures (name, unit_name, title_de, definition_de, unit) "
+            "VALUES (?, ?, ?, ?, ?)",
+            _measure_rows(schema_json),
+        )
+        connection.executemany(
+            "INSERT INTO enum_values (dimension, code, label) VALUES (?, ?, ?)",
+            (
+                (dimension, code, label)
+                for dimension, value_names in _dimension_value_names(
+                    schema_json
+                ).items()
+                for code, label in value_names.items()
+            ),
+        )
+        connection.commit()
+        connection.execute("VACUUM")
+    except BaseException:
+        connection.close()
+        os.remove(temporary_path)
+        raise
+    connection.close()
+    os.replace(temporary_path, path)
+
+
+def schema_json_hash(schema_json_path: str = SCHEMA_JSON_PATH) -> str:
+    """Hash of schema.json, stored as source_hash by compile_schema_store."""
+    with open(schema_json_path, "rb") as schema_file:
+        return hashlib.sha256(schema_file.read()).hexdigest()
+
+
+def open_statistics_schema(path: Optional[str]) -> StatisticsSchema:
+    """Opens the compiled store at path if it was compiled from the bundled
+    schema.json. Otherwise a store is compiled into SCHEMA_STORE_CACHE_DIR
+    on first use, named after the hash of schema.json. If that fails as
+    well, schema.json is parsed and indexed in memory instead.
+
+    :param path: Path of the compiled store or None to parse schema.json.
+    :return: The statistics of the schema.
+    """
+    if path is None:
+        return SchemaIndex(get_schema_json())
+    source_hash = schema_json_hash()
+    if os.path.exists(path):
+        store = _open_store(path, source_hash)
+        if store is not None:
+            return store
+    if SCHEMA_STORE_CACHE_DIR is not None:
+        cached_path = os.path.join(
+            SCHEMA_STORE_CACHE_DIR, f"schema-{source_hash[:16]}.sqlite"
+        )
+        if os.path.exists(cached_path):
+            store = _open_store(cached_path, source_hash)
+            if store is not None:
+                return store
+        try:
+            os.makedirs(SCHEMA_STORE_CACHE_DIR, exist_ok=True)
+            compile_schema_store(SCHEMA_JSON_PATH, cached_path)
+        except (OSError, sqlite3.Error) as error:
+            warnings.warn(f"Could not compile the schema store {cached_path}: {error}")
+        else:
+            store = _open_store(cached_path, source_hash)
+            if store is not None:
+                return store
+    return SchemaIndex(get_schema_json())
+
+
+def _open_store(path: str, source_hash: str) -> Optional[SchemaStore]:
+    store = SchemaStore(path)
+    try:
+        if store.source_hash() == source_hash:
+            return store
+        warnings.warn(
+            f"The schema store {path} was not compiled from the bundled "
+            "schema.json, run tasks/compile_schema_store.py."
+        )
+    except (ValueError, sqlite3.Error) as error:
+        warnings.warn(f"Could not read the schema store {path}: {error}")
+    return None
@@ -0,0 +1,320 @@
+from typing import Collection, Dict, List, Mapping, Optional, Tuple
+from collections import Counter
+from functools import lru_cache
+import bisect
+import gzip
+import hashlib
+import json
+import math
+import re
+
+from datenguidepy.json_stream import dump_gzip_json
+
+# field weights of the statistics documents, matches in the statistic code
+# and the short descriptions count more than in the long descriptions
+STATISTIC_FIELD_WEIGHTS: Dict[str, float] = {
+    "statistic": 4.0,
+    "short_description": 2.0,
+    "long_description": 1.0,
+    "short_description_en": 1.5,
+    "long_description_en": 0.75,
+}
+
+STOPWORDS = frozenset(
+    # german
+    "aber als am an auf aus bei bis das dem den der des die durch ein eine "
+    "einem einen einer eines es fur im in ist je mit nach nicht noch oder "
+    "sich sie so uber um und von vom vor wie zu zum zur "
+    # english
+    "a an and are as at be by for from in is it of on or per the to with".split()
+)
+
+_UMLAUTS = [("ä", "a"), ("ö", "o"), ("ü", "u"), ("ß", "ss")]
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+_DOUBLE_LETTER_PATTERN = re.compile(r"(.)\1")
+_MARKED_DOUBLE_LETTER_PATTERN = re.compile(r"(.)\*")
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Light stemmer for lower case German words, a variant of CISTEM
+    that also strips inflections of nouns.
+
+    :param token: Lower case word without umlauts.
+    :return: The stem of the word.
+    """
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    # protect letter groups the suffix rules must not split
+    word = token.replace("sch", "$").replace("ei", "%").replace("ie", "&")
+    word = _DOUBLE_LETTER_PATTERN.sub(r"\1*", word)
+    while len(word) > 3:
+        if len(word) > 5 and word.endswith(("em", "er", "nd")):
+            word = word[:-2]
+        elif word.endswith(("e", "s", "n")):
+            word = word[:-1]
+        else:
+            break
+    word = _MARKED_DOUBLE_LETTER_PATTERN.sub(r"\1\1", word)
+    return word.replace("&", "ie").replace("%", "ei").replace("$", "sch")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lower case, umlaut folded and stemmed words
+    without stopwords.
+
+    :param text: German or English text.
+    :return: The terms of the text in order.
+    """
+    text = text.lower()
+    for umlaut, replacement in _UMLAUTS:
+        text = text.replace(umlaut, replacement)
+    return [
+        stem(token) for token in _TOKEN_PATTERN.findall(text) if token not in STOPWORDS
+    ]
+
+
+class SearchIndex(object):
+    """Inverted index with BM25F ranking over documents with several
+    weighted text fields.
+
+    Compound words also count as occurrences of the indexed terms they
+    start or end with, with a lower weight, so "gasteankunft" in a short
+    description counts for "gast" like an occurrence in a field of lower
+    weight. Compounds ending with the term, e.g. "ehescheidung" for
+    "scheidung", weigh more than those starting with it, as the last word
+    determines the meaning of a German compound. Query terms that are not
+    indexed themselves match the compounds starting or ending with them,
+    which are found by bisection of the sorted terms and of the sorted
+    reversed terms. The scores of all query terms are added, so documents
+    matching more terms rank higher.
+
+    :param keys: Keys of the documents.
+    :type keys: List[str]
+    :param postings: BM25F score of every document containing a term,
+        as pairs of the document's position in keys and the score.
+    :type postings: Dict[str, List[Tuple[int, float]]]
+    :param fingerprint: Identifies the indexed documents, defaults to None
+    :type fingerprint: Optional[str], optional
+    """
+
+    FORMAT_VERSION: int = 2
+
+    # BM25 term frequency saturation and document length normalisation
+    K1: float = 1.2
+    B: float = 0.75
+
+    COMPOUND_WEIGHT: float = 0.5
+    COMPOUND_HEAD_WEIGHT: float = 0.8
+    MIN_COMPOUND_TERM_LENGTH: int = 4
+
+    # bounds the memory of the memoised expansions of query terms
+    MAX_EXPANSIONS: int = 65536
+
+    def __init__(
+        self,
+        keys: List[str],
+        postings: Dict[str, List[Tuple[int, float]]],
+        fingerprint: Optional[str] = None,
+    ) -> None:
+        self.keys = keys
+        self.postings = postings
+        self.fingerprint = fingerprint
+        self._terms = sorted(postings)
+        self._reversed_terms = sorted(term[::-1] for term in postings)
+        self._expansions: Dict[str, List[Tuple[str, float]]] = {}
+
+    @staticmethod
+    def document_fingerprint(documents: Mapping[str, Mapping[str, str]]) -> str:
+        """Hash of documents, to tell whether a saved index is outdated."""
+        content = json.dumps(documents, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def build(
+        cls,
+        documents: Mapping[str, Mapping[str, str]],
+        field_weights: Mapping[str, float],
+    ) -> "SearchIndex":
+        """Indexes documents.
+
+        :param documents: Text of the fields of every document by its key.
+            The whole text of the first field is also indexed as a single
+            term, so keys like "AI-Z08" match as a whole.
+        :param field_weights: Weight of every field, fields without a
+            weight are not indexed.
+        :return: The index.
+        """
+        keys = list(documents)
+        fields = list(field_weights)
+        field_tokens: List[List[List[str]]] = []
+        for key in keys:
+            tokens_of_fields = []
+            for field in fields:
+                text = documents[key].get(field) or ""
+                tokens = tokenize(text)
+                if field == fields[0] and text.strip():
+                    tokens.append(text.strip().lower())
+                tokens_of_fields.append(tokens)
+            field_tokens.append(tokens_of_fields)
+        vocabulary = {
+            token
+            for tokens_of_fields in field_tokens
+            for tokens in tokens_of_fields
+            for token in tokens
+        }
+
+        # term frequencies and length of every field of every document
+        field_terms: List[List[Tuple[Counter, int]]] = []
+        total_lengths = Counter()
+        document_frequencies: Counter = Counter()
+        for tokens_of_fields in field_tokens:
+            terms = []
+            for field, tokens in zip(fields, tokens_of_fields):
+                frequencies = Counter(tokens)
+                part_frequencies: Counter = Counter()
+                for term, frequency in frequencies.items():
+                    for part, weight in cls._compound_parts(term, vocabulary):
+                        part_frequencies[part] += weight * frequency
+                frequencies.update(part_frequencies)
+                terms.append((frequencies, len(tokens)))
+                total_lengths[field] += len(tokens)
+            document_frequencies.update(
+                set().union(*(frequencies for frequencies, _ in terms))
+            )
+            field_terms.append(terms)
+        average_lengths = [
+            max(total_lengths[field] / max(len(keys), 1), 1.0) for field in fields
+        ]
+
+        idfs = {
+            term: math.log(1 + (len(keys) - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for position, terms in enumerate(field_terms):
+            weighted_frequencies: Counter = Counter()
+            for field_index, (frequencies, length) in enumerate(terms):
+                weight = field_weights[fields[field_index]] / (
+                    1 - cls.B + cls.B * length / average_lengths[field_index]
+                )
+                for term, frequency in frequencies.items():
+                    weighted_frequencies[term] += weight * frequency
+            for term, frequency in weighted_frequencies.items():
+                postings.setdefault(term, []).append(
+                    (position, idfs[term] * frequency / (cls.K1 + frequency))
+                )
+        return cls(keys, postings, cls.document_fingerprint(documents))
+
+    def search(
+        self, query: str, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Ranks the documents matching any term of the query.
+
+        :param query: Search terms.
+        :param limit: Maximum number of results, defaults to None,
+            meaning all matching documents.
+        :return: Keys and scores of the matching documents, best first.
+        """
+        terms = tokenize(query)
+        whole_query = query.strip().lower()
+        if whole_query in self.postings and whole_query not in terms:
+            terms.append(whole_query)
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            term_scores: Dict[int, float] = {}
+            for index_term, weight in self._expand(term):
+                for position, score in self.postings[index_term]:
+                    if weight * score > term_scores.get(position, 0.0):
+                        term_scores[position] = weight * score
+            for position, score in term_scores.items():
+                scores[position] = scores.get(position, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.keys[position], score) for position, score in ranked[:limit]]
+
+    @classmethod
+    def _compound_parts(
+        cls, term: str, vocabulary: Collection[str]
+    ) -> List[Tuple[str, float]]:
+        """Terms of the vocabulary a compound term starts or ends with,
+        with the weight of an occurrence of the compound.
+        """
+        if not term.isalpha():
+            return []
+        # the rest of the compound must be more than an inflection
+        min_length = cls.MIN_COMPOUND_TERM_LENGTH
+        parts = [
+            (term[:end], cls.COMPOUND_WEIGHT)
+            for end in range(min_length, len(term) - 2)
+            if term[:end] in vocabulary
+        ]
+        parts.extend(
+            (term[start:], cls.COMPOUND_HEAD_WEIGHT)
+            for start in range(3, len(term) - min_length + 1)
+            if term[start:] in vocabulary
+        )
+        return parts
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Index terms matched by a query term and their weights."""
+        expansion = self._expansions.get(term)
+        if expansion is None:
+            if term in self.postings:
+                # compounds containing the term are part of its postings
+                expansion = [(term, 1.0)]
+            elif len(term) >= self.MIN_COMPOUND_TERM_LENGTH:
+                weights = {
+                    index_term: self.COMPOUND_WEIGHT
+                    for index_term in self._terms_with_prefix(self._terms, term)
+                }
+                for reversed_term in self._terms_with_prefix(
+                    self._reversed_terms, term[::-1]
+                ):
+                    weights[reversed_term[::-1]] = self.COMPOUND_HEAD_WEIGHT
+                expansion = list(weights.items())
+            else:
+                expansion = []
+            if len(self._expansions) >= self.MAX_EXPANSIONS:
+                self._expansions.clear()
+            self._expansions[term] = expansion
+        return expansion
+
+    @staticmethod
+    def _terms_with_prefix(terms: List[str], prefix: str) -> List[str]:
+        start = bisect.bisect_left(terms, prefix)
+        end = bisect.bisect_left(terms, prefix + "\uffff", start)
+        return terms[start:end]
+
+    def save(self, path: str) -> None:
+        """Writes the index as gzip compressed json, replacing an existing
+        file atomically."""
+        content = {
+            "version": self.FORMAT_VERSION,
+            "fingerprint": self.fingerprint,
+            "keys": self.keys,
+            "postings": self.postings,
+        }
+        dump_gzip_json(content, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        """Reads an index written by save.
+
+        :raises ValueError: If the file has an unknown format version.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as index_file:
+            content = json.load(index_file)
+        if content.get("version") != cls.FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported search index version {content.get('version')}."
+            )
+        return cls(
+            content["keys"],
+            {
+                term: [(position, score) for position, score in postings]
+                for term, postings in content["postings"].items()
+            },
+            content["fingerprint"],
+        )
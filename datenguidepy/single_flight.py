@@ -0,0 +1,107 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple, TYPE_CHECKING
+from concurrent.futures import Future
+import copy
+import threading
+import weakref
+
+if TYPE_CHECKING:  # pragma: no cover
+    # asyncio is imported where it is used, it takes long to import
+    import asyncio
+
+_AsyncCalls = Dict[str, "asyncio.Future[Any]"]
+
+
+class SingleFlight(object):
+    """Coalesces identical calls that are in flight at the same time.
+
+    The first caller for a key executes the call. Callers arriving with
+    the same key while it is running wait for it instead of executing the
+    call again, and all of them receive its result or its exception.
+    Waiting callers get a deep copy of the result, so that they can not
+    affect each other by modifying it. Calls arriving after the call
+    finished execute it again, i.e. nothing is cached.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "Future[Any]"] = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Executes function unless a call with the same key is in flight.
+
+        :param key: Key identifying identical calls.
+        :param function: The call to execute.
+        :raises: Whatever the call raises, also in all waiting callers.
+        :return: The result and whether it was shared from another call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return copy.deepcopy(future.result()), True
+        try:
+            result = function()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight(object):
+    """Coalesces identical coroutine calls, see SingleFlight.
+
+    Calls are only coalesced within the same event loop, so one instance
+    can be shared by executioners running in different event loops.
+    """
+
+    def __init__(self) -> None:
+        # calls in flight per event loop
+        self._loop_calls: "weakref.WeakKeyDictionary[Any, _AsyncCalls]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    async def do(
+        self, key: str, function: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Awaits function unless a call with the same key is in flight.
+
+        :param key: Key identifying identical calls.
+        :param function: Coroutine function of the call to execute.
+        :raises: Whatever the call raises, also in all waiting callers.
+        :return: The result and whether it was shared from another call.
+        """
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            calls = self._loop_calls.setdefault(loop, dict())
+        future = calls.get(key)
+        if future is not None:
+            # a cancelled waiter must not cancel the shared call
+            return copy.deepcopy(await asyncio.shield(future)), True
+        future = loop.create_future()
+        calls[key] = future
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # avoids a warning if no other caller was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del calls[key]
@@ -0,0 +1,640 @@
+from typing import Dict, Any, Optional, List, NamedTuple, Iterator, Tuple, cast
+import itertools
+import json
+import re
+import zlib
+
+from datenguidepy.query_helper import get_regions
+from datenguidepy.replay import LocalGraphQlServer
+from datenguidepy.schema_json_meta import get_schema_json
+
+Json_Dict = Dict[str, Any]
+
+
+class Selection(NamedTuple):
+    """A field of a parsed GraphQL query.
+
+    :param name: Name of the field.
+    :param alias: Key of the field in the response.
+    :param args: Argument values with variables already substituted.
+    :param selections: Subfields of the field.
+    """
+
+    name: str
+    alias: str
+    args: Json_Dict
+    selections: List["Selection"]
+
+
+class GraphQlSyntaxError(ValueError):
+    pass
+
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<ignored>[\s,]+|\#[^\n]*)
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    | (?P<punctuator>\.\.\.|[!$():=@\[\]{}|&])
+    """,
+    re.VERBOSE,
+)
+
+
+class _Parser(object):
+    """Recursive descent parser for the subset of GraphQL sent by
+    datenguidepy: a single operation without fragments or directives.
+    """
+
+    def __init__(self, query: str, variables: Optional[Json_Dict]) -> None:
+        self.tokens = list(self._tokenize(query))
+        self.pos = 0
+        self.variables = {} if variables is None else variables
+
+    @staticmethod
+    def _tokenize(query: str) -> Iterator[Tuple[str, str]]:
+        pos = 0
+        while pos < len(query):
+            match = _TOKEN_PATTERN.match(query, pos)
+            if match is None:
+                raise GraphQlSyntaxError(f"Unexpected character {query[pos]!r}.")
+            pos = match.end()
+            if match.lastgroup != "ignored":
+                yield cast(str, match.lastgroup), match.group()
+
+    def parse(self) -> List[Selection]:
+        if self._peek() in (("name", "query"), ("name", "mutation")):
+            self.pos += 1
+            if self._peek()[0] == "name":
+                self.pos += 1
+            if self._peek() == ("punctuator", "("):
+                self._skip_variable_definitions()
+        selections = self._selection_set()
+        if self.pos != len(self.tokens):
+            raise GraphQlSyntaxError("Unexpected content after the query.")
+        return selections
+
+    def _peek(self) -> Tuple[str, str]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return ("end", "")
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token[0] == "end":
+            raise GraphQlSyntaxError("Unexpected end of the query.")
+        self.pos += 1
+        return token
+
+    def _expect(self, punctuator: str) -> None:
+        token = self._next()
+        if token != ("punctuator", punctuator):
+            raise GraphQlSyntaxError(f"Expected {punctuator!r} but found {token[1]!r}.")
+
+    def _skip_variable_definitions(self) -> None:
+        # the values are taken from the request variables instead
+        while self._next() != ("punctuator", ")"):
+            pass
+
+    def _selection_set(self) -> List[Selection]:
+        self._expect("{")
+        selections = []
+        while self._peek() != ("punctuator", "}"):
+            selections.append(self._selection())
+        self._expect("}")
+        return selections
+
+    def _selection(self) -> Selection:
+        kind, name = self._next()
+        if kind != "name":
+            raise GraphQlSyntaxError(f"Expected a field but found {name!r}.")
+        alias = name
+        if self._peek() == ("punctuator", ":"):
+            self.pos += 1
+            kind, name = self._next()
+            if kind != "name":
+                raise GraphQlSyntaxError(f"Expected a field but found {name!r}.")
+        args: Json_Dict = dict()
+        if self._peek() == ("punctuator", "("):
+            self.pos += 1
+            while self._peek() != ("punctuator", ")"):
+                key = self._next()[1]
+                self._expect(":")
+                args[key] = self._value()
+            self.pos += 1
+        selections = []
+        if self._peek() == ("punctuator", "{"):
+            selections = self._selection_set()
+        return Selection(name, alias, args, selections)
+
+    def _value(self) -> Any:
+        kind, token = self._next()
+        if kind in ("string", "number"):
+            return json.loads(token)
+        if kind == "name":
+            return {"true": True, "false": False, "null": None}.get(token, token)
+        if token == "$":
+            return self.variables.get(self._next()[1])
+        if token == "[":
+            values = []
+            while self._peek() != ("punctuator", "]"):
+                values.append(self._value())
+            self.pos += 1
+            return values
+        if token == "{":
+            fields = dict()
+            while self._peek() != ("punctuator", "}"):
+                key = self._next()[1]
+                self._expect(":")
+                fields[key] = self._value()
+            self.pos += 1
+            return fields
+        raise GraphQlSyntaxError(f"Unexpected {token!r}.")
+
+
+def parse_query(query: str, variables: Optional[Json_Dict] = None) -> List[Selection]:
+    """Parses a GraphQL query.
+
+    :param query: The query string.
+    :param variables: Values of the variables used in the query.
+    :raises GraphQlSyntaxError: If the query can not be parsed.
+    :return: The top level fields of the query.
+    """
+    return _Parser(query, variables).parse()
+
+
+class _ExecutionError(Exception):
+    pass
+
+
+def _type_ref(
+    kind: str,
+    name: Optional[str],
+    of_type: Optional[str] = None,
+    of_kind: Optional[str] = None,
+) -> Json_Dict:
+    return {
+        "kind": kind,
+        "name": name,
+        "description": None,
+        "ofType": (
+            None
+            if of_type is None
+            else {"kind": of_kind, "name": of_type, "description": None}
+        ),
+    }
+
+
+def _field(
+    name: str,
+    type_ref: Json_Dict,
+    description: Optional[str] = None,
+    args: Optional[List[Json_Dict]] = None,
+) -> Json_Dict:
+    return {
+        "name": name,
+        "description": description,
+        "type": type_ref,
+        "args": [] if args is None else args,
+    }
+
+
+def _argument(name: str, type_ref: Json_Dict) -> Json_Dict:
+    return {"name": name, "description": None, "type": type_ref}
+
+
+class SyntheticApi(object):
+    """Answers Datenguide GraphQL queries with synthetic data.
+
+    The statistics, their dimensions and the enum values are taken from
+    the bundled schema.json, the regions from regions.csv. Every
+    combination of region, statistic, year and enum values gets a value
+    derived from a hash of the combination, so that identical queries
+    always return identical results. Supported are the region and
+    allRegions queries as datenguidepy builds them, including pagination,
+    and __type and __schema introspection queries.
+
+    :param years: Number of years available for every statistic,
+        defaults to 10, ending with LAST_YEAR.
+    :type years: int, optional
+    :param regions: Number of regions, defaults to None, meaning all
+        regions of regions.csv. Fewer regions keep the first ones,
+        more regions add synthetic lau regions with ids starting with 99.
+    :type regions: Optional[int], optional
+    """
+
+    LAST_YEAR: int = 2019
+    SCALAR_TYPES: List[str] = ["String", "Int", "Float", "Boolean"]
+    SOURCE_FIELDS: List[str] = ["title_de", "valid_from", "periodicity", "name", "url"]
+
+    def __init__(self, years: int = 10, regions: Optional[int] = None) -> None:
+        if years < 1:
+            raise ValueError("years has to be at least 1.")
+        self.years = list(range(self.LAST_YEAR - years + 1, self.LAST_YEAR + 1))
+        self.regions = self._region_rows(regions)
+        self._region_index = {region["id"]: region for region in self.regions}
+        # measure name -> (first statistic containing it, measure)
+        self.measures: Dict[str, Tuple[Json_Dict, Json_Dict]] = dict()
+        self.statistics = get_schema_json()
+        for statistic in self.statistics.values():
+            for measure_name, measure in statistic["measures"].items():
+                if measure_name not in self.measures:
+                    measure = dict(measure, dimensions=dict(measure["dimensions"]))
+                    self.measures[measure_name] = (statistic, measure)
+                    continue
+                # a measure of several statistics has the dimensions of all of them
+                dimensions = self.measures[measure_name][1]["dimensions"]
+                for dimension_name, dimension in measure["dimensions"].items():
+                    dimensions.setdefault(dimension_name, dimension)
+        self.enum_values: Dict[str, Dict[str, str]] = dict()
+        for _, measure in self.measures.values():
+            for dimension_name, dimension in measure["dimensions"].items():
+                self.enum_values.setdefault(
+                    dimension_name, self._dimension_values(dimension)
+                )
+
+    @staticmethod
+    def _region_rows(count: Optional[int]) -> List[Json_Dict]:
+        frame = get_regions()
+        regions = [
+            {"id": region_id, "name": name, "level": level, "parent": parent}
+            for region_id, name, level, parent in zip(
+                frame.index, frame["name"], frame["level"], frame["parent"]
+            )
+        ]
+        if count is None:
+            return regions
+        for number in range(count - len(regions)):
+            regions.append(
+                {
+                    "id": f"99{number:06d}",
+                    "name": f"Synthetic region {number}",
+                    "level": "lau",
+                    "parent": "DG",
+                }
+            )
+        return regions[:count]
+
+    @staticmethod
+    def _dimension_values(dimension: Json_Dict) -> Dict[str, str]:
+        if dimension.get("value_names"):
+            return dict(dimension["value_names"])
+        return {value["key"]: value["title_de"] for value in dimension["values"]}
+
+    def execute(self, query_json: Json_Dict) -> Json_Dict:
+        """Executes a GraphQL request.
+
+        :param query_json: Request body containing the query and variables.
+        :return: The response body, containing errors for invalid queries.
+        """
+        try:
+            selections = parse_query(
+                query_json.get("query", ""), query_json.get("variables")
+            )
+            data = {
+                selection.alias: self._resolve_root(selection)
+                for selection in selections
+            }
+        except (GraphQlSyntaxError, _ExecutionError) as error:
+            return {"errors": [{"message": str(error)}]}
+        return {"data": data}
+
+    def _resolve_root(self, selection: Selection) -> Any:
+        if selection.name == "region":
+            region = self._region_index.get(str(selection.args.get("id")))
+            if region is None:
+                return None
+            return self._resolve_region(region, selection.selections)
+        if selection.name == "allRegions":
+            return self._resolve_all_regions(selection)
+        if selection.name == "__type":
+            return self._project(
+                self.type_info(selection.args.get("name")), selection.selections
+            )
+        if selection.name == "__schema":
+            return self._project(self.schema_info(), selection.selections)
+        raise _ExecutionError(f'Cannot query field "{selection.name}" on type "Query".')
+
+    def _resolve_all_regions(self, selection: Selection) -> Json_Dict:
+        page = selection.args.get("page") or 0
+        items_per_page = selection.args.get("itemsPerPage") or 10
+        regions = self.regions
+        for sub_selection in selection.selections:
+            if sub_selection.name == "regions":
+                regions = self._filter_regions(**sub_selection.args)
+        page_regions = regions[page * items_per_page : (page + 1) * items_per_page]
+        result: Json_Dict = dict()
+        for sub_selection in selection.selections:
+            if sub_selection.name == "regions":
+                result[sub_selection.alias] = [
+                    self._resolve_region(region, sub_selection.selections)
+                    for region in page_regions
+                ]
+            elif sub_selection.name == "page":
+                result[sub_selection.alias] = page
+            elif sub_selection.name == "itemsPerPage":
+                result[sub_selection.alias] = items_per_page
+            elif sub_selection.name == "total":
+                result[sub_selection.alias] = len(regions)
+            else:
+                raise _ExecutionError(
+                    f'Cannot query field "{sub_selection.name}" '
+                    'on type "RegionsResult".'
+                )
+        return result
+
+    def _filter_regions(
+        self,
+        parent: Optional[str] = None,
+        nuts: Optional[int] = None,
+        lau: Optional[int] = None,
+    ) -> List[Json_Dict]:
+        regions = self.regions
+        if parent is not None:
+            regions = [
+                region
+                for region in regions
+                if region["id"].startswith(parent) and region["id"] != parent
+            ]
+        if nuts is not None:
+            regions = [region for region in regions if region["level"] == f"nuts{nuts}"]
+        if lau is not None:
+            regions = [region for region in regions if region["level"] == "lau"]
+        return regions
+
+    def _resolve_region(
+        self, region: Json_Dict, selections: List[Selection]
+    ) -> Json_Dict:
+        result: Json_Dict = dict()
+        for selection in selections:
+            if selection.name in ("id", "name"):
+                result[selection.alias] = region[selection.name]
+            elif selection.name in self.measures:
+                result[selection.alias] = list(self._records(region["id"], selection))
+            else:
+                raise _ExecutionError(
+                    f'Cannot query field "{selection.name}" on type "Region".'
+                )
+        return result
+
+    def _records(self, region_id: str, selection: Selection) -> Iterator[Json_Dict]:
+        statistic, measure = self.measures[selection.name]
+        if selection.args.get("statistics"):
+            statistic_name = self._as_list(selection.args["statistics"])[0].lstrip("R")
+            statistic = self.statistics.get(statistic_name, statistic)
+        years = self.years
+        if selection.args.get("year") is not None:
+            requested_years = set(self._as_list(selection.args["year"]))
+            years = [year for year in years if year in requested_years]
+        filters = selection.args.get("filter") or dict()
+        dimensions = list(measure["dimensions"])
+        for name in list(selection.args) + list(filters):
+            if name not in ("year", "statistics", "filter") + tuple(dimensions):
+                raise _ExecutionError(
+                    f'Unknown argument "{name}" on field "{selection.name}".'
+                )
+        # without arguments only the totals over a dimension are returned
+        dimension_values = [
+            self._selected_values(
+                dimension, selection.args.get(dimension), filters.get(dimension)
+            )
+            for dimension in dimensions
+        ]
+        for year in years:
+            for combination in itertools.product(*dimension_values):
+                enums = dict(zip(dimensions, combination))
+                yield self._record(region_id, selection, statistic, year, enums)
+
+    def _selected_values(
+        self, dimension: str, values: Any, value_filter: Optional[Json_Dict]
+    ) -> List[Optional[str]]:
+        if values is not None:
+            return self._as_list(values)
+        if value_filter is None:
+            return [None]
+        selected = list(self.enum_values[dimension])
+        if "in" in value_filter:
+            selected = [value for value in selected if value in value_filter["in"]]
+        if "nin" in value_filter:
+            selected = [value for value in selected if value not in value_filter["nin"]]
+        return selected
+
+    def _record(
+        self,
+        region_id: str,
+        selection: Selection,
+        statistic: Json_Dict,
+        year: int,
+        enums: Dict[str, Optional[str]],
+    ) -> Json_Dict:
+        record: Json_Dict = dict()
+        for field in selection.selections:
+            if field.name == "value":
+                record[field.alias] = self.value(region_id, selection.name, year, enums)
+            elif field.name == "year":
+                record[field.alias] = year
+            elif field.name == "id":
+                record[field.alias] = f"{region_id}:{selection.name}:{year}"
+            elif field.name == "source":
+                source = {"url": None, **statistic}
+                record[field.alias] = {
+                    source_field.alias: source.get(source_field.name)
+                    for source_field in field.selections
+                }
+            elif field.name in enums:
+                record[field.alias] = enums[field.name]
+            else:
+                raise _ExecutionError(
+                    f'Cannot query field "{field.name}" on type "{selection.name}".'
+                )
+        return record
+
+    @staticmethod
+    def value(
+        region_id: str, measure: str, year: int, enums: Dict[str, Optional[str]]
+    ) -> float:
+        """Deterministic synthetic value of a statistic.
+
+        :return: A value between 0 and 100000 with one decimal.
+        """
+        key = "|".join(
+            [region_id, measure, str(year)] + [str(v) for v in enums.values()]
+        )
+        return zlib.crc32(key.encode("utf-8")) % 1000000 / 10
+
+    @staticmethod
+    def _as_list(value: Any) -> List[Any]:
+        return value if isinstance(value, list) else [value]
+
+    def schema_info(self) -> Json_Dict:
+        """Introspection information of all types as returned by __schema."""
+        type_names = (
+            self.SCALAR_TYPES
+            + ["Query", "RegionsResult", "Region", "Source"]
+            + list(self.measures)
+            + list(self.enum_values)
+        )
+        return {
+            "queryType": {"name": "Query"},
+            "types": [self.type_info(name) for name in type_names],
+        }
+
+    def type_info(self, name: Optional[str]) -> Optional[Json_Dict]:
+        """Introspection information of a type as returned by __type.
+
+        :param name: Name of the type.
+        :return: The type information or None for unknown types.
+        """
+        if name in self.SCALAR_TYPES:
+            return {
+                "name": name,
+                "kind": "SCALAR",
+                "description": None,
+                "fields": None,
+                "enumValues": None,
+            }
+        if name in self.enum_values:
+            return {
+                "name": name,
+                "kind": "ENUM",
+                "description": None,
+                "fields": None,
+                "enumValues": [
+                    {"name": value, "description": description}
+                    for value, description in self.enum_values[name].items()
+                ],
+            }
+        fields = self._object_fields(name)
+        if fields is None:
+            return None
+        return {
+            "name": name,
+            "kind": "OBJECT",
+            "description": None,
+            "fields": fields,
+            "enumValues": None,
+        }
+
+    def _object_fields(self, name: Optional[str]) -> Optional[List[Json_Dict]]:
+        string = _type_ref("SCALAR", "String")
+        integer = _type_ref("SCALAR", "Int")
+        if name == "Query":
+            return [
+                _field(
+                    "region",
+                    _type_ref("OBJECT", "Region"),
+                    args=[_argument("id", string)],
+                ),
+                _field(
+                    "allRegions",
+                    _type_ref("OBJECT", "RegionsResult"),
+                    args=[
+                        _argument("page", integer),
+                        _argument("itemsPerPage", integer),
+                    ],
+                ),
+            ]
+        if name == "RegionsResult":
+            return [
+                _field(
+                    "regions",
+                    _type_ref("LIST", None, "Region", "OBJECT"),
+                    args=[
+                        _argument("parent", string),
+                        _argument("nuts", integer),
+                        _argument("lau", integer),
+                    ],
+                ),
+                _field("page", integer),
+                _field("itemsPerPage", integer),
+                _field("total", integer),
+            ]
+        if name == "Region":
+            return [_field("id", string), _field("name", string)] + [
+                _field(
+                    measure_name,
+                    _type_ref("LIST", None, measure_name, "OBJECT"),
+                    measure["title_de"],
+                    [
+                        _argument("year", _type_ref("LIST", None, "Int", "SCALAR")),
+                        _argument(
+                            "filter", _type_ref("INPUT_OBJECT", measure_name + "Filter")
+                        ),
+                    ]
+                    + [
+                        _argument(dimension, _type_ref("LIST", None, dimension, "ENUM"))
+                        for dimension in measure["dimensions"]
+                    ],
+                )
+                for measure_name, (_, measure) in self.measures.items()
+            ]
+        if name == "Source":
+            return [_field(field, string) for field in self.SOURCE_FIELDS]
+        if name in self.measures:
+            measure = self.measures[name][1]
+            return [
+                _field("id", string),
+                _field("year", integer),
+                _field("value", _type_ref("SCALAR", "Float")),
+                _field("source", _type_ref("OBJECT", "Source")),
+            ] + [
+                _field(
+                    dimension,
+                    _type_ref("ENUM", dimension),
+                    measure["dimensions"][dimension]["title_de"],
+                )
+                for dimension in measure["dimensions"]
+            ]
+        return None
+
+    @classmethod
+    def _project(cls, value: Any, selections: List[Selection]) -> Any:
+        """Restricts a json value to the selected fields."""
+        if not selections or value is None:
+            return value
+        if isinstance(value, list):
+            return [cls._project(item, selections) for item in value]
+        return {
+            selection.alias: cls._project(
+                value.get(selection.name), selection.selections
+            )
+            for selection in selections
+        }
+
+
+class SyntheticServer(LocalGraphQlServer):
+    """Serves SyntheticApi responses on localhost, see LocalGraphQlServer.
+
+    :param latency: Seconds added to every response, defaults to 0.0
+    :type latency: float, optional
+    :param error_rate: Fraction of requests answered with status code 503,
+        defaults to 0.0
+    :type error_rate: float, optional
+    :param years: Number of years of every statistic, defaults to 10
+    :type years: int, optional
+    :param regions: Number of regions, defaults to None, meaning all
+        regions of regions.csv, see SyntheticApi.
+    :type regions: Optional[int], optional
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        years: int = 10,
+        regions: Optional[int] = None,
+        bandwidth: Optional[float] = None,
+        compress: bool = True,
+        port: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(latency, bandwidth, compress, port, error_rate, seed)
+        self.api = SyntheticApi(years, regions)
+
+    def respond(self, query_json: Json_Dict) -> Optional[Tuple[bytes, float]]:
+        body_json = self.api.execute(query_json)
+        return (
+            json.dumps(body_json, separators=(",", ":")).encode("utf-8"),
+            self.latency or 0.0,
+        )
@@ -0,0 +1,72 @@
+from datenguidepy.query_execution import (
+    GraphQlSchemaMetaDataProvider,
+    Paginator,
+    TypeMetaDataCache,
+)
+
+from datenguidepy import query_helper, schema_store
+
+import pytest
+from collections import OrderedDict
+from unittest.mock import Mock
+
+
+@pytest.fixture(autouse=True)
+def meta_data_cache(monkeypatch):
+    """Gives every test an empty in memory type cache instead of the
+    persistent cache in the user's cache directory.
+    """
+    cache = TypeMetaDataCache()
+    monkeypatch.setattr(GraphQlSchemaMetaDataProvider, "meta_data_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def search_index_dir(monkeypatch):
+    """Keeps the search index of get_statistics out of the user's cache
+    directory.
+    """
+    monkeypatch.setattr(query_helper, "SEARCH_INDEX_DIR", None)
+
+
+@pytest.fixture(scope="session")
+def compiled_schema_store_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("schema_store"))
+
+
+@pytest.fixture(autouse=True)
+def schema_store_cache_dir(compiled_schema_store_dir, monkeypatch):
+    """Compiles the schema store once per test session instead of into
+    the user's cache directory.
+    """
+    monkeypatch.setattr(
+        schema_store, "SCHEMA_STORE_CACHE_DIR", compiled_schema_store_dir
+    )
+    return compiled_schema_store_dir
+
+
+@pytest.fixture
+def paginator_observations(monkeypatch):
+    """Starts a test without the page sizes observed by other tests."""
+    observations = OrderedDict()
+    monkeypatch.setattr(Paginator, "_observations", observations)
+    return observations
+
+
+@pytest.fixture
+def multi_region_query():
+    """Mocked query with one GraphQL document per region."""
+    query = Mock()
+    region_ids = [f"{i:02d}" for i in range(1, 9)]
+    query.get_graphql_query.return_value = [
+        '{region (id: "' + region_id + '"){id BEVMK3 {value year }}}'
+        for region_id in region_ids
+    ]
+    query._get_fields_with_types.return_value = [
+        ("region", "Region"),
+        ("id", "String"),
+        ("BEVMK3", "BEVMK3"),
+        ("value", "Float"),
+        ("year", "Int"),
+    ]
+    return query, region_ids
@@ -0,0 +1,167 @@
+from datenguidepy.async_execution import (
+    AsyncQueryExecutioner,
+    AsyncHttpTransport,
+    DEFAULT_ASYNC_SINGLE_FLIGHT,
+)
+from datenguidepy.query_execution import QueryExecutioner, GraphQlSchemaMetaDataProvider
+from datenguidepy.transport import DEFAULT_TRANSPORT
+
+import asyncio
+import threading
+from unittest.mock import Mock
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class FakeAsyncTransport(object):
+    def __init__(self, respond):
+        self.respond = respond
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+
+    async def post(self, endpoint, query_json, headers=None, transfer_stats=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return self.respond(query_json)
+
+    async def close(self):
+        self.closed = True
+
+
+def region_response(query_json):
+    region_id = query_json["query"].split('"')[1]
+    return {"data": {"region": {"id": region_id, "BEVMK3": []}}}
+
+
+def test_async_run_query_matches_sync_results(multi_region_query):
+    transport = FakeAsyncTransport(region_response)
+    executioner = AsyncQueryExecutioner(transport=transport, max_workers=2)
+    query, _ = multi_region_query
+    async_results = run(executioner.run_query(query))
+
+    sync_executioner = QueryExecutioner()
+    sync_executioner._send_request = region_response
+    sync_results = sync_executioner.run_query(query)
+
+    assert async_results == sync_results
+    assert transport.max_in_flight == 2
+
+
+def test_async_query_meta_is_created_outside_the_event_loop(multi_region_query):
+    query, _ = multi_region_query
+    provider = Mock()
+    threads = []
+    provider.get_query_stat_meta.side_effect = lambda fields: threads.append(
+        threading.current_thread()
+    )
+    executioner = AsyncQueryExecutioner(
+        transport=FakeAsyncTransport(region_response),
+        statistics_meta_data_provider=provider,
+    )
+    run(executioner.run_query(query))
+    assert len(threads) == 8
+    assert threading.current_thread() not in threads
+
+
+def test_async_all_regions_pagination():
+    query = Mock()
+    query.get_graphql_query.return_value = ["query allRegions"]
+    query._get_fields_with_types.return_value = [
+        ("allRegions", "RegionsResult"),
+        ("regions", "Region"),
+        ("id", "String"),
+    ]
+
+    def page_response(query_json):
+        page = query_json["variables"]["page"]
+        return {
+            "data": {
+                "allRegions": {
+                    "regions": [{"id": str(page)}],
+                    "page": page,
+                    "itemsPerPage": 1000,
+                    "total": 2500,
+                }
+            }
+        }
+
+    transport = FakeAsyncTransport(page_response)
+    executioner = AsyncQueryExecutioner(transport=transport, max_workers=3)
+    results = run(executioner.run_query(query))
+    pages = results[0].query_results
+    assert [p["data"]["allRegions"]["page"] for p in pages] == [0, 1, 2]
+
+
+def test_async_get_type_info_uses_schema_cache(meta_data_cache):
+    transport = FakeAsyncTransport(
+        lambda query_json: {
+            "data": {
+                "__type": {
+                    "kind": "ENUM",
+                    "enumValues": [{"name": "R12631", "description": "Urteile"}],
+                    "fields": None,
+                }
+            }
+        }
+    )
+
+    async def get_twice():
+        async with AsyncQueryExecutioner(transport=transport) as executioner:
+            first = await executioner.get_type_info("BEVMK3Statistics")
+            second = await executioner.get_type_info("BEVMK3Statistics")
+        return first, second
+
+    first, second = run(get_twice())
+    assert first.enum_values == {"R12631": "Urteile"}
+    assert first is second
+    assert (
+        meta_data_cache.get(GraphQlSchemaMetaDataProvider.endpoint, "BEVMK3Statistics")
+        == first
+    )
+    assert transport.closed
+
+
+def test_async_get_type_info_with_full_schema(meta_data_cache, monkeypatch):
+    monkeypatch.setattr(GraphQlSchemaMetaDataProvider, "full_schema", True)
+    types = [
+        {"name": "GES", "kind": "ENUM", "fields": None, "enumValues": []},
+        {"name": "Float", "kind": "SCALAR", "fields": None, "enumValues": None},
+    ]
+    transport = FakeAsyncTransport(
+        lambda query_json: {"data": {"__schema": {"types": types}}}
+    )
+
+    async def lookup():
+        executioner = AsyncQueryExecutioner(transport=transport)
+        return [await executioner.get_type_info(name) for name in ["GES", "Float", "X"]]
+
+    ges, float_type, missing = run(lookup())
+    assert ges.kind == "ENUM" and float_type.kind == "SCALAR"
+    assert missing is None
+
+
+def test_async_defaults_follow_query_executioner(monkeypatch):
+    monkeypatch.setattr(QueryExecutioner, "endpoint", "http://changed/graphql")
+    monkeypatch.setattr(QueryExecutioner, "page_size", 10)
+    executioner = AsyncQueryExecutioner(transport=FakeAsyncTransport(None))
+    assert executioner.endpoint == "http://changed/graphql"
+    assert executioner.paginator.page_size == 10
+    assert AsyncQueryExecutioner("http://other").endpoint == "http://other"
+
+
+def test_async_transport_is_configured_like_the_default_transport():
+    transport = AsyncQueryExecutioner().transport
+    assert isinstance(transport, AsyncHttpTransport)
+    assert transport.circuit_breaker is DEFAULT_TRANSPORT.circuit_breaker
+    assert transport.retry_policy == DEFAULT_TRANSPORT.retry_policy
+    assert transport.single_flight is DEFAULT_ASYNC_SINGLE_FLIGHT
+    assert AsyncQueryExecutioner().transport.single_flight is transport.single_flight
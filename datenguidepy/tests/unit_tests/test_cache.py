@@ -0,0 +1,176 @@
+from datenguidepy.cache import (
+    DiskResponseCache,
+    TransformedResultCache,
+    CacheInfo,
+    SqliteConnections,
+)
+from datenguidepy.transport import HttpTransport
+
+import sqlite3
+import threading
+import time
+import pytest
+import pandas as pd
+from unittest.mock import Mock
+
+ENDPOINT = "https://api-next.datengui.de/graphql"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskResponseCache(directory=str(tmp_path))
+
+
+def query_json(region_id, page=0):
+    return {
+        "query": '{region (id: "' + region_id + '"){id }}',
+        "variables": {"page": page, "itemsPerPage": 1000},
+    }
+
+
+def body(region_id):
+    return {"data": {"region": {"id": region_id, "name": "x" * 1000}}}
+
+
+def test_cache_roundtrip(cache):
+    assert cache.get(ENDPOINT, query_json("01")) is None
+    cache.set(ENDPOINT, query_json("01"), body("01"))
+    assert cache.get(ENDPOINT, query_json("01")) == body("01")
+    assert cache.get(ENDPOINT, query_json("01", page=1)) is None
+    assert cache.get("http://localhost/graphql", query_json("01")) is None
+
+
+def test_cache_key_ignores_variable_order():
+    reordered = {
+        "variables": {"itemsPerPage": 1000, "page": 0},
+        "query": query_json("01")["query"],
+    }
+    assert DiskResponseCache.request_key(
+        ENDPOINT, query_json("01")
+    ) == DiskResponseCache.request_key(ENDPOINT, reordered)
+
+
+def test_cache_is_persistent(tmp_path):
+    DiskResponseCache(directory=str(tmp_path)).set(
+        ENDPOINT, query_json("01"), body("01")
+    )
+    assert DiskResponseCache(directory=str(tmp_path)).get(
+        ENDPOINT, query_json("01")
+    ) == body("01")
+
+
+def test_cache_expires_entries(tmp_path, monkeypatch):
+    cache = DiskResponseCache(directory=str(tmp_path), ttl=60)
+    cache.set(ENDPOINT, query_json("01"), body("01"))
+    now = time.time()
+    monkeypatch.setattr("datenguidepy.cache.time.time", lambda: now + 120)
+    assert cache.get(ENDPOINT, query_json("01")) is None
+    assert cache.size() == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = DiskResponseCache(directory=str(tmp_path), max_size=None)
+    clock = iter(range(1000))
+    monkeypatch.setattr("datenguidepy.cache.time.time", lambda: next(clock))
+    for region_id in ["01", "02", "03"]:
+        cache.set(ENDPOINT, query_json(region_id), body(region_id))
+    entry_size = cache.size() // 3
+    # reading 01 makes 02 the least recently used entry
+    cache.get(ENDPOINT, query_json("01"))
+    cache.max_size = 3 * entry_size
+    cache.set(ENDPOINT, query_json("04"), body("04"))
+
+    assert cache.get(ENDPOINT, query_json("02")) is None
+    for region_id in ["01", "03", "04"]:
+        assert cache.get(ENDPOINT, query_json(region_id)) == body(region_id)
+
+
+def test_cache_concurrent_writers(cache):
+    def write(region_id):
+        for page in range(20):
+            cache.set(ENDPOINT, query_json(region_id, page), body(region_id))
+
+    threads = [threading.Thread(target=write, args=(f"{i:02d}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.get(ENDPOINT, query_json("03", 19)) == body("03")
+
+
+def test_sqlite_connections_per_thread(tmp_path):
+    connections = SqliteConnections(str(tmp_path / "sub" / "db.sqlite"))
+    connection = connections.get()
+    assert connections.get() is connection
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not connection
+
+    def failing_setup(connection):
+        raise ValueError("unsupported")
+
+    with pytest.raises(ValueError):
+        SqliteConnections(str(tmp_path / "db.sqlite"), failing_setup).get()
+    with pytest.raises(sqlite3.OperationalError):
+        SqliteConnections(str(tmp_path / "missing.sqlite"), read_only=True).get()
+
+
+def test_transport_uses_response_cache(cache):
+    transport = HttpTransport(response_cache=cache)
+    transport._session = Mock()
+    transport._session.post.return_value = Mock(
+        status_code=200, json=lambda: body("01")
+    )
+    assert transport.post(ENDPOINT, query_json("01")) == body("01")
+    assert transport.post(ENDPOINT, query_json("01")) == body("01")
+    transport._session.post.assert_called_once()
+
+
+def test_transport_does_not_cache_error_bodies(cache):
+    transport = HttpTransport(response_cache=cache)
+    transport._session = Mock()
+    transport._session.post.return_value = Mock(
+        status_code=200, json=lambda: {"errors": ["invalid"]}
+    )
+    transport.post(ENDPOINT, query_json("01"))
+    transport.post(ENDPOINT, query_json("01"))
+    assert transport._session.post.call_count == 2
+
+
+def test_result_cache_lru_and_counters():
+    result_cache = TransformedResultCache(maxsize=2)
+    frame = pd.DataFrame({"BEV001": [1, 2]})
+    result_cache.set("a", frame, {"statistics": {}})
+    result_cache.set("b", frame, {"statistics": {}})
+    assert result_cache.get("a") is not None
+    result_cache.set("c", frame, {"statistics": {}})
+
+    assert result_cache.get("b") is None
+    assert result_cache.get("c") is not None
+    assert result_cache.cache_info() == CacheInfo(
+        hits=2, misses=1, maxsize=2, currsize=2
+    )
+
+
+def test_result_cache_returns_copies():
+    result_cache = TransformedResultCache()
+    result_cache.set("a", pd.DataFrame({"BEV001": [1, 2]}), {"units": {}})
+    frame, meta = result_cache.get("a")
+    frame.loc[0, "BEV001"] = 100
+    meta["units"]["BEV001"] = "Anzahl"
+    frame, meta = result_cache.get("a")
+    assert frame.BEV001.tolist() == [1, 2]
+    assert meta == {"units": {}}
+
+
+def test_result_cache_fingerprint_depends_on_flags():
+    fingerprint = TransformedResultCache.fingerprint
+    queries = ['{region (id: "01"){BEV001 }}']
+    assert fingerprint(ENDPOINT, queries, "P", add_units=False) == fingerprint(
+        ENDPOINT, queries, "P", add_units=False
+    )
+    assert fingerprint(ENDPOINT, queries, "P", add_units=False) != fingerprint(
+        ENDPOINT, queries, "P", add_units=True
+    )
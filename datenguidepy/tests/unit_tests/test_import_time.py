@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+
+def run_python(*args, cache_dir=None):
+    env = dict(os.environ)
+    if cache_dir is not None:
+        # DEFAULT_CACHE_DIR of the subprocess
+        env["XDG_CACHE_HOME"] = cache_dir
+    return subprocess.run(
+        [sys.executable, *args],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+
+
+def test_import_does_not_load_package_data(tmp_path):
+    code = (
+        "import sys, datenguidepy\n"
+        "from datenguidepy.query_execution import "
+        "DEFAULT_STATISTICS_META_DATA_PROVIDER as stats\n"
+        "from datenguidepy.translation import DEFAULT_TRANSLATION_PROVIDER as trans\n"
+        "helper = sys.modules['datenguidepy.query_helper']\n"
+        "assert stats._statistics_schema is None, 'the schema was loaded'\n"
+        "assert trans._translated_schema is None, 'translated_schema.json was loaded'\n"
+        "assert 'ALL_REGIONS' not in vars(helper), 'regions.csv was loaded'\n"
+        "assert helper.federal_states.Berlin == '11'\n"
+        "assert stats.is_statistic('BEV001')\n"
+        "assert 'aiohttp' not in sys.modules, 'aiohttp was loaded'\n"
+    )
+    run_python("-c", code, cache_dir=str(tmp_path))
+
+
+def test_import_loads_no_other_modules():
+    # modules loaded by datenguidepy besides pandas and requests, which it
+    # always needs, e.g. pandas submodules or aiohttp would show up here
+    code = (
+        "import sys, pandas, requests\n"
+        "loaded = set(sys.modules)\n"
+        "import datenguidepy\n"
+        "print(*{name.split('.')[0] for name in set(sys.modules) - loaded})\n"
+    )
+    packages = set(run_python("-c", code).stdout.decode("utf-8").split())
+    assert packages <= {"datenguidepy", "sqlite3", "_sqlite3", "typing_extensions"}
@@ -0,0 +1,132 @@
+from datenguidepy.json_stream import JsonArrayStream
+from datenguidepy.query_execution import QueryExecutioner
+from datenguidepy.transport import HttpTransport
+
+import json
+import pytest
+from unittest.mock import Mock
+
+REGIONS_PATH = ["data", "allRegions", "regions"]
+
+
+def chunked(document, size):
+    raw = json.dumps(document, ensure_ascii=False, indent=1).encode("utf-8")
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+def all_regions_page(page, items_per_page, total):
+    first, last = page * items_per_page, min((page + 1) * items_per_page, total)
+    return {
+        "data": {
+            "allRegions": {
+                "regions": [
+                    {"id": str(i), "name": "Lübeck", "BEVMK3": [{"value": i * 0.5}]}
+                    for i in range(first, last)
+                ],
+                "page": page,
+                "itemsPerPage": items_per_page,
+                "total": total,
+            }
+        }
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, 100000])
+def test_stream_yields_regions_and_rest_of_document(chunk_size):
+    document = all_regions_page(0, 20, 50)
+    stream = JsonArrayStream(chunked(document, chunk_size), REGIONS_PATH)
+    assert list(stream) == document["data"]["allRegions"]["regions"]
+    assert stream.item_count == 20
+    assert stream.document == {
+        "data": {
+            "allRegions": {"regions": [], "page": 0, "itemsPerPage": 20, "total": 50}
+        }
+    }
+
+
+def test_stream_is_lazy():
+    chunks = iter(chunked(all_regions_page(0, 100, 100), 16))
+    stream = iter(JsonArrayStream(chunks, REGIONS_PATH))
+    assert next(stream)["id"] == "0"
+    assert len(list(chunks)) > 0
+
+
+def test_stream_of_error_response():
+    document = {"errors": [{"message": "invalid"}], "data": None}
+    stream = JsonArrayStream(chunked(document, 7), REGIONS_PATH)
+    assert list(stream) == []
+    assert stream.document == document
+
+
+@pytest.mark.parametrize("raw", [b'{"data": {"allRegions": {"regions": [{"id"', b"[]"])
+def test_stream_of_malformed_document(raw):
+    with pytest.raises(ValueError):
+        list(JsonArrayStream([raw], REGIONS_PATH))
+
+
+def test_stream_can_only_be_iterated_once():
+    stream = JsonArrayStream(chunked(all_regions_page(0, 1, 1), 10), REGIONS_PATH)
+    list(stream)
+    with pytest.raises(RuntimeError):
+        iter(stream)
+
+
+def test_transport_post_stream_releases_connection():
+    transport = HttpTransport()
+    transport._session = Mock()
+    resp = Mock(status_code=200)
+    resp.iter_content.return_value = chunked(all_regions_page(0, 3, 3), 8)
+    transport._session.post.return_value = resp
+    stream = transport.post_stream("http://endpoint", {"query": "{}"}, REGIONS_PATH)
+    assert [r["id"] for r in stream] == ["0", "1", "2"]
+    assert transport._session.post.call_args[1]["stream"] is True
+    resp.close.assert_called_once()
+
+
+@pytest.fixture
+def all_regions_query():
+    query = Mock()
+    query.get_graphql_query.return_value = ["query allRegions"]
+    query._get_fields_with_types.return_value = [
+        ("allRegions", "RegionsResult"),
+        ("regions", "Region"),
+        ("id", "String"),
+    ]
+    return query
+
+
+@pytest.fixture
+def streaming_executioner():
+    def post_stream(endpoint, query_json, path, headers=None, transfer_stats=None):
+        variables = query_json["variables"]
+        page = all_regions_page(variables["page"], variables["itemsPerPage"], 2500)
+        return JsonArrayStream(chunked(page, 512), path)
+
+    transport = Mock()
+    transport.post_stream.side_effect = post_stream
+    return QueryExecutioner(transport=transport, stream=True), transport
+
+
+def test_executioner_streams_pages_lazily(streaming_executioner, all_regions_query):
+    executioner, transport = streaming_executioner
+    results = executioner.run_query(all_regions_query)
+    assert transport.post_stream.call_count == 0
+
+    region_ids = []
+    for page in results[0].query_results:
+        region_ids.extend(r["id"] for r in page["data"]["allRegions"]["regions"])
+    assert region_ids == [str(i) for i in range(2500)]
+    assert transport.post_stream.call_count == 3
+
+
+def test_executioner_stream_raises_body_errors(all_regions_query):
+    transport = Mock()
+    transport.post_stream.return_value = JsonArrayStream(
+        chunked({"errors": ["invalid"], "data": None}, 4), REGIONS_PATH
+    )
+    results = QueryExecutioner(transport=transport, stream=True).run_query(
+        all_regions_query
+    )
+    page = next(iter(results[0].query_results))
+    with pytest.raises(RuntimeError, match="error content"):
+        list(page["data"]["allRegions"]["regions"])
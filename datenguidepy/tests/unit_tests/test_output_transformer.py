@@ -3,6 +3,10 @@ import pytest
 import os
 
 from datenguidepy.output_transformer import QueryOutputTransformer
+from datenguidepy.query_execution import ExecutionResults, QueryExecutioner
+from datenguidepy.query_builder import Query, Field
+from datenguidepy.cache import TransformedResultCache
+from unittest.mock import Mock
 from datenguidepy.tests.case_construction import construct_execution_results
 
 
@@ -213,3 +217,45 @@ def test_dumplicate_removal_multi(query_duplicates_for_states_multi_stat):
 
     data_transformed = qOutTrans.transform(remove_duplicates=True)
     assert all(data_transformed.name.value_counts() == 1)
+
+
+def test_output_transformer_aliased_regions(query_result):
+    region_json = query_result[0].query_results[0]["data"]["region"]
+    second_region_json = dict(region_json, id="05913", name="Dortmund")
+    aliased_page = {"data": {"r0": region_json, "r1": second_region_json}}
+    aliased_result = [ExecutionResults([aliased_page], query_result[0].meta_data)]
+
+    output = QueryOutputTransformer(aliased_result).transform()
+    single_output = QueryOutputTransformer(query_result).transform()
+
+    assert list(output.id.unique()) == ["05911", "05913"]
+    assert output.shape[0] == 2 * single_output.shape[0]
+    assert list(output.columns) == list(single_output.columns)
+    assert not aliased_result[0].contains_undefined_region_result()
+
+
+def test_undefined_aliased_region_is_detected(query_result):
+    region_json = query_result[0].query_results[0]["data"]["region"]
+    aliased_page = {"data": {"r0": region_json, "r1": None}}
+    assert ExecutionResults(
+        [aliased_page], query_result[0].meta_data
+    ).contains_undefined_region_result()
+
+
+def test_query_results_use_result_cache(query_result, monkeypatch):
+    run_query = Mock(return_value=query_result)
+    monkeypatch.setattr(QueryExecutioner, "run_query", run_query)
+    monkeypatch.setattr(Query, "result_cache", TransformedResultCache())
+    monkeypatch.setattr(Field, "_get_return_type", lambda self, name: name)
+    query = Query.region("05911", fields=["BEVMK3"])
+
+    first = query.results(use_cache=True)
+    first["BEVMK3"] = 0
+    second = query.results(use_cache=True)
+    verbose = query.results(verbose_statistics=True, use_cache=True)
+
+    assert run_query.call_count == 2
+    assert (second["BEVMK3"] != 0).all()
+    assert "BEVMK3" not in verbose
+    assert query.result_meta_data == query_result[0].meta_data
+    assert Query.result_cache.cache_info().hits == 1
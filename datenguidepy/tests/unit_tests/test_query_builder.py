@@ -556,3 +556,24 @@ def test_missing_statistic_field_raises_exception():
     q = Query.region("09162000")
     with pytest.raises(Exception, match=r"add .* field"):
         q.results()
+
+
+def test_batched_regions_use_aliases(patch_return_types):
+    query = Query.region(
+        ["01", "02", "03"], fields=["BEV001"], default_fields=False, batch_size=2
+    )
+    assert query.get_graphql_query() == [
+        '{r0: region (id: "01"){BEV001 } r1: region (id: "02"){BEV001 }}',
+        '{r0: region (id: "03"){BEV001 }}',
+    ]
+
+
+def test_invalid_batch_size_raises_error(patch_return_types):
+    with pytest.raises(ValueError):
+        Query.region(["01", "02"], default_fields=False, batch_size=0)
+
+
+def test_all_regions_page_size(patch_return_types):
+    assert Query.all_regions(page_size=250).page_size == 250
+    with pytest.raises(ValueError):
+        Query.all_regions(page_size=0)
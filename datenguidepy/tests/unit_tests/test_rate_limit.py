@@ -0,0 +1,131 @@
+from datenguidepy.rate_limit import TokenBucket, AdaptiveConcurrencyLimiter
+from datenguidepy.transport import HttpTransport, NO_RETRY
+
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("datenguidepy.rate_limit.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_allows_burst_then_spaces_requests(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    clock[0] += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_is_shared_by_threads_and_tasks():
+    bucket = TokenBucket(rate=200, burst=1)
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(5)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+
+    async def acquire_all():
+        await asyncio.gather(*[bucket.acquire_async() for _ in range(5)])
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(acquire_all())
+    loop.close()
+    for thread in threads:
+        thread.join()
+    # 10 requests with a burst of one need at least 9 refills
+    assert time.monotonic() - started >= 9 / 200 * 0.9
+
+
+def test_invalid_token_bucket():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0)
+
+
+def test_limiter_grows_additively_while_latency_is_stable():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(latency=0.1, success=True)
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_limiter_shrinks_on_errors_and_latency_spikes(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16)
+    limiter.acquire()
+    limiter.release(latency=0.1, success=True)
+    limiter.acquire()
+    limiter.release(latency=0.5, success=True)
+    assert limiter.limit == 8
+
+    # errors of the same window only count once
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(latency=0.1, success=False)
+    assert limiter.limit == 8
+    clock[0] += 1
+    limiter.acquire()
+    limiter.release(latency=0.1, success=False)
+    assert limiter.limit == 4
+
+
+def test_limiter_bounds_requests_in_flight():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    in_flight = []
+    lock = threading.Lock()
+    running = [0]
+
+    def request():
+        limiter.acquire()
+        with lock:
+            running[0] += 1
+            in_flight.append(running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        limiter.release(latency=0.01, success=True)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(in_flight) == 2
+
+
+def test_limiter_wakes_up_async_waiters():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    order = []
+
+    async def request(i):
+        await limiter.acquire_async()
+        order.append(i)
+        await asyncio.sleep(0.001)
+        limiter.release(latency=0.001, success=True)
+
+    async def request_all():
+        await asyncio.gather(*[request(i) for i in range(3)])
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(request_all())
+    loop.close()
+    assert sorted(order) == [0, 1, 2]
+    assert limiter.in_flight == 0
+
+
+def test_transport_releases_limiter_on_failure():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+    transport = HttpTransport(retry_policy=NO_RETRY, concurrency_limiter=limiter)
+    transport._session = Mock()
+    transport._session.post.return_value = Mock(status_code=503, headers={})
+    with pytest.raises(RuntimeError):
+        transport.post("http://endpoint", {"query": "{}"})
+    assert limiter.in_flight == 0
+    assert limiter.limit == 2
@@ -0,0 +1,105 @@
+from datenguidepy.region_hierarchy import RegionHierarchy
+from datenguidepy.query_helper import (
+    get_region_hierarchy,
+    hirachy_up,
+    hirachy_down,
+    siblings,
+)
+
+import pandas as pd
+import pytest
+
+REGIONS = pd.DataFrame(
+    [
+        ("05", "Nordrhein-Westfalen", "nuts1", "DG"),
+        ("09", "Bayern", "nuts1", "DG"),
+        ("051", "Düsseldorf, Regierungsbezirk", "nuts2", "05"),
+        ("053", "Köln, Regierungsbezirk", "nuts2", "05"),
+        ("091", "Oberbayern", "nuts2", "09"),
+        ("05111", "Düsseldorf, Kreisfreie Stadt", "nuts3", "051"),
+        ("05315", "Köln, Kreisfreie Stadt", "nuts3", "053"),
+        ("05111000", "Düsseldorf, krsfr. Stadt", "lau", "05111"),
+        ("091000", "Gemeinde ohne Kreis", "lau", "091"),
+    ],
+    columns=["region_id", "name", "level", "parent"],
+).set_index("region_id")
+
+
+def ids(frame):
+    return list(frame.index)
+
+
+def test_hierarchy_layout():
+    hierarchy = RegionHierarchy(REGIONS)
+    assert list(hierarchy.codes) == list(REGIONS.index) + ["DG"]
+    dg = len(REGIONS)
+    children = hierarchy.children[
+        hierarchy.child_offsets[dg] : hierarchy.child_offsets[dg + 1]
+    ]
+    assert list(children) == [0, 1]
+    assert hierarchy.parents[0] == dg
+    with pytest.raises(ValueError):
+        RegionHierarchy(pd.concat([REGIONS, REGIONS]))
+
+
+def test_hirachy_functions():
+    assert ids(hirachy_up(["05111000"], REGIONS)) == [
+        "05",
+        "051",
+        "05111",
+        "05111000",
+    ]
+    # like before, regions reached on several levels are listed repeatedly
+    assert ids(hirachy_up(["05111", "051"], REGIONS)) == [
+        "05",
+        "05",
+        "051",
+        "051",
+        "05111",
+    ]
+    assert ids(hirachy_down(["05"], "nuts3", REGIONS)) == [
+        "05",
+        "051",
+        "05111",
+        "053",
+        "05315",
+    ]
+    # lau regions directly below nuts2 end the descent early
+    assert ids(hirachy_down(["09"], "lau", REGIONS)) == ["09", "091", "091000"]
+    assert ids(hirachy_down(["DG"], "nuts1", REGIONS)) == ["05", "09"]
+    # a single id is not taken as a list of its characters
+    assert ids(hirachy_up("05111", REGIONS)) == ids(hirachy_up(["05111"], REGIONS))
+    assert ids(hirachy_down("09", "lau", REGIONS)) == ["09", "091", "091000"]
+    assert ids(siblings("053", REGIONS)) == ["051", "053"]
+    assert ids(siblings("unknown", REGIONS)) == []
+
+
+def test_batch_lookups():
+    hierarchy = RegionHierarchy(REGIONS)
+    ancestors = hierarchy.ancestors([["05111000"], ["091000", "053"], [], ["x"]])
+    assert [list(region_ids) for region_ids in ancestors] == [
+        ["05", "051", "05111", "05111000"],
+        ["05", "09", "053", "091", "091000"],
+        [],
+        [],
+    ]
+    descendants = hierarchy.descendants([["051"], ["09"]], lowest_level=None)
+    assert [list(region_ids) for region_ids in descendants] == [
+        ["051", "05111", "05111000"],
+        ["09", "091", "091000"],
+    ]
+    assert [list(region_ids) for region_ids in hierarchy.siblings(["05", "091"])] == [
+        ["05", "09"],
+        ["091"],
+    ]
+    assert [list(region_ids) for region_ids in hierarchy.ancestors(["051"])] == [
+        ["05", "051"]
+    ]
+
+
+def test_default_hierarchy():
+    hierarchy = get_region_hierarchy()
+    assert hierarchy is get_region_hierarchy()
+    ancestors = hierarchy.ancestors([["09162000"]])[0]
+    assert sorted(ancestors) == ["09", "091", "09162", "09162000", "DG"]
+    assert len(siblings("11")) == 16
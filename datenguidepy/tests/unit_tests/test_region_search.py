@@ -0,0 +1,68 @@
+from datenguidepy.region_search import RegionIndex, normalize_words
+from datenguidepy.query_helper import get_region_index, search_regions
+
+import time
+
+REGIONS = [
+    ("09", "Bayern", "nuts1"),
+    ("09162", "München, Landeshauptstadt", "nuts3"),
+    ("09184", "München, Landkreis", "nuts3"),
+    ("09162000", "München, Landeshauptstadt", "lau"),
+    ("09175122", "Grafing b.München, St", "lau"),
+    ("06412", "Frankfurt am Main, Kreisfreie Stadt", "nuts3"),
+    ("12053", "Frankfurt (Oder), Kreisfreie Stadt", "nuts3"),
+    ("05111", "Düsseldorf, Kreisfreie Stadt", "nuts3"),
+    ("02", "Hamburg", "nuts1"),
+    ("05315", "Köln, Kreisfreie Stadt", "nuts3"),
+]
+
+
+def ids(matches):
+    return [match.region_id for match in matches]
+
+
+def test_normalize_words():
+    assert normalize_words("München") == normalize_words("MUENCHEN")
+    assert normalize_words("Gießen, Landkreis") == ["giessen", "landkreis"]
+    assert normalize_words("Frankfurt am Main") == ["frankfurt", "main"]
+    assert normalize_words("Gießen, Köln", False) == ["giessen", "koln"]
+
+
+def test_region_index_ranking():
+    index = RegionIndex(REGIONS)
+    assert ids(index.search("Muenchen")) == ["09162", "09184", "09162000", "09175122"]
+    assert ids(index.search("Landkreis München"))[0] == "09184"
+    assert ids(index.search("Frankfurt Main")) == ["06412", "12053"]
+    assert ids(index.search("frankfurt o"))[0] == "12053"
+    assert ids(index.search("Mü", limit=2)) == ["09162", "09184"]
+    assert ids(index.search("München", levels=["lau"])) == ["09162000", "09175122"]
+    assert index.search("") == []
+    assert index.search("Paris") == []
+
+
+def test_region_index_typos():
+    index = RegionIndex(REGIONS)
+    assert ids(index.search("Dusseldorf"))[0] == "05111"
+    assert ids(index.search("Hamburgg "))[0] == "02"
+    assert ids(index.search("Muenchn"))[0] == "09162"
+    # umlauts without dots
+    assert ids(index.search("Koln")) == ["05315"]
+    assert ids(index.search("Dusseldorf ")) == ["05111"]
+    assert ids(index.search("Munchen", limit=1)) == ["09162"]
+    match = index.search("Muenchn")[0]
+    assert match.level == "nuts3"
+    assert 0 < match.score < index.search("Muenchen")[0].score
+
+
+def test_search_regions():
+    regions = search_regions("Frankfurt Main", limit=3)
+    assert regions.index[0] == "06412"
+    assert list(regions.columns) == ["name", "level", "score"]
+    assert search_regions("Bayern", levels=["nuts1"]).index.tolist() == ["09"]
+
+    index = get_region_index()
+    start = time.perf_counter()
+    for query in ["M", "Mü", "Mün", "Münc", "Münch", "Münche", "München"]:
+        index.search(query)
+    # autocompletion over all regions, generous bound for slow machines
+    assert (time.perf_counter() - start) / 7 < 0.01
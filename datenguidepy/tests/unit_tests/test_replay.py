@@ -0,0 +1,135 @@
+from datenguidepy.replay import (
+    Cassette,
+    RecordingTransport,
+    ReplayTransport,
+    ReplayServer,
+    LocalGraphQlServer,
+)
+from datenguidepy.query_execution import QueryExecutioner
+from datenguidepy.transport import HttpTransport, TransferStats, NO_RETRY
+
+from decimal import Decimal
+import gzip
+import json
+import pytest
+from unittest.mock import Mock
+
+
+def page_json(page):
+    return {"query": "query ($page: Int) {...}", "variables": {"page": page}}
+
+
+def page_response(page):
+    return {
+        "data": {"allRegions": {"regions": [{"id": f"{page}1"}, {"id": f"{page}2"}]}}
+    }
+
+
+@pytest.fixture
+def cassette():
+    cassette = Cassette()
+    for page in range(3):
+        cassette.record(page_json(page), page_response(page), 0.25)
+    return cassette
+
+
+def test_cassette_round_trip(cassette, tmp_path):
+    path = str(tmp_path / "cassette.json.gz")
+    cassette.save(path)
+    with gzip.open(path, "rt") as cassette_file:
+        content = json.load(cassette_file)
+    # the query string is stored once for all pages
+    assert content["queries"] == ["query ($page: Int) {...}"]
+
+    loaded = Cassette.load(path)
+    assert len(loaded) == 3
+    response, latency = loaded.response(page_json(1))
+    assert json.loads(response) == page_response(1)
+    assert latency == 0.25
+    assert loaded.response(page_json(3)) is None
+
+
+def test_failed_save_keeps_the_cassette_file(cassette, tmp_path):
+    path = tmp_path / "cassette.json.gz"
+    cassette.save(str(path))
+    saved = path.read_bytes()
+    # the latency can not be encoded as json
+    cassette.record(page_json(3), page_response(3), Decimal("0.25"))
+    with pytest.raises(TypeError):
+        cassette.save(str(path))
+    assert path.read_bytes() == saved
+    assert [p.name for p in tmp_path.iterdir()] == ["cassette.json.gz"]
+
+
+def test_recording_transport_records_responses():
+    transport = Mock()
+    transport.post.side_effect = lambda endpoint, query_json, *args: page_response(
+        query_json["variables"]["page"]
+    )
+    cassette = Cassette()
+    recorder = RecordingTransport(cassette, transport)
+    assert recorder.post("http://endpoint", page_json(0)) == page_response(0)
+    regions = list(
+        recorder.post_stream(
+            "http://endpoint", page_json(1), ["data", "allRegions", "regions"]
+        )
+    )
+    assert regions == page_response(1)["data"]["allRegions"]["regions"]
+    assert len(cassette) == 2
+
+
+def test_replay_transport(cassette, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("datenguidepy.replay.time.sleep", sleeps.append)
+    stats = TransferStats()
+    transport = ReplayTransport(cassette, latency=None, bandwidth=1000)
+    # the endpoint does not matter for replays
+    assert transport.post("http://other", page_json(2), None, stats) == page_response(2)
+    size = len(json.dumps(page_response(2), separators=(",", ":")))
+    assert sleeps == [0.25 + size / 1000]
+    assert stats.requests == 1
+    assert stats.received_bytes == size
+    with pytest.raises(RuntimeError):
+        transport.post("http://other", page_json(5))
+
+
+def test_replay_transport_streams(cassette):
+    transport = ReplayTransport(cassette)
+    transport.STREAM_CHUNK_SIZE = 7
+    stream = transport.post_stream(
+        "http://other", page_json(0), ["data", "allRegions", "regions"]
+    )
+    assert list(stream) == [{"id": "01"}, {"id": "02"}]
+
+
+def test_executioner_uses_replay_transport(cassette):
+    executioner = QueryExecutioner(transport=ReplayTransport(cassette))
+    assert executioner._send_request(page_json(1)) == page_response(1)
+    assert (
+        executioner.graph_ql_schema_meta_data_provider.transport
+        is executioner.transport
+    )
+    assert QueryExecutioner().transport is not executioner.transport
+
+
+def test_replay_server(cassette):
+    transport = HttpTransport(retry_policy=NO_RETRY)
+    with ReplayServer(cassette, bandwidth=10**6) as server:
+        stats = TransferStats()
+        assert transport.post(
+            server.endpoint, page_json(0), None, stats
+        ) == page_response(0)
+        assert stats.requests == 1
+        stream = transport.post_stream(
+            server.endpoint, page_json(1), ["data", "allRegions", "regions"]
+        )
+        assert list(stream) == page_response(1)["data"]["allRegions"]["regions"]
+        with pytest.raises(RuntimeError, match="404"):
+            transport.post(server.endpoint, page_json(7))
+    transport.close()
+
+
+def test_local_server_needs_respond(cassette):
+    with pytest.raises(TypeError):
+        LocalGraphQlServer()
+    assert ReplayServer(cassette, latency=None).latency is None
@@ -0,0 +1,130 @@
+from datenguidepy.schema_snapshot import (
+    SchemaSnapshot,
+    load_snapshot,
+    save_snapshot,
+    schema_hash,
+)
+from datenguidepy.query_execution import (
+    GraphQlSchemaMetaDataProvider,
+    TypeMetaDataCache,
+)
+
+import gzip
+import os
+import pytest
+from unittest.mock import Mock
+
+ENDPOINT = "http://snapshot.endpoint/graphql"
+
+SCHEMA_TYPES = [
+    {
+        "name": "GES",
+        "kind": "ENUM",
+        "fields": None,
+        "enumValues": [{"name": "GESM", "description": "männlich"}],
+    },
+    {
+        "name": "Source",
+        "kind": "OBJECT",
+        "enumValues": None,
+        "fields": [{"name": "url", "type": {"kind": "SCALAR", "name": "String"}}],
+    },
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "graphql_schema.json.gz")
+    save_snapshot(SchemaSnapshot.create(ENDPOINT, SCHEMA_TYPES), path)
+    monkeypatch.setattr(GraphQlSchemaMetaDataProvider, "schema_snapshot", path)
+    return path
+
+
+def test_snapshot_round_trip(snapshot_path, tmp_path):
+    snapshot = load_snapshot(snapshot_path)
+    assert snapshot.endpoint == ENDPOINT
+    assert snapshot.types == SCHEMA_TYPES
+    assert snapshot.schema_hash == schema_hash(list(reversed(SCHEMA_TYPES)))
+    assert snapshot.age().total_seconds() < 60
+    assert load_snapshot(str(tmp_path / "missing.json.gz")) is None
+
+
+def test_provider_answers_from_snapshot(snapshot_path):
+    transport = Mock()
+    provider = GraphQlSchemaMetaDataProvider(ENDPOINT, transport=transport)
+    assert provider.get_type_info("GES").enum_values == {"GESM": "männlich"}
+    assert provider.get_type_info("Source").fields["url"].get_return_type() == "String"
+    transport.post.assert_not_called()
+
+    # types missing in the snapshot are still requested
+    transport.post.return_value = {
+        "data": {"__type": {"kind": "SCALAR", "fields": None, "enumValues": None}}
+    }
+    assert provider.get_type_info("Float").kind == "SCALAR"
+    transport.post.assert_called_once()
+
+
+def test_newer_schemas_replace_the_cached_types(snapshot_path, tmp_path):
+    transport = Mock()
+    transport.post.return_value = {"data": {"__schema": {"types": SCHEMA_TYPES[1:]}}}
+    provider = GraphQlSchemaMetaDataProvider(
+        ENDPOINT,
+        transport=transport,
+        full_schema=True,
+        meta_data_cache=TypeMetaDataCache(str(tmp_path)),
+    )
+    assert provider.get_type_info("GES") is not None
+    # the schema fetched after the snapshot was taken replaces its types
+    provider.load_schema()
+    assert provider.get_type_info("GES") is None
+    assert provider.get_type_info("Source") is not None
+    transport.post.assert_called_once()
+
+    # a snapshot taken later replaces the fetched schema
+    snapshot = SchemaSnapshot.create(ENDPOINT, SCHEMA_TYPES[:1])
+    save_snapshot(snapshot._replace(created="2100-01-01T00:00:00Z"), snapshot_path)
+    provider.meta_data_cache = TypeMetaDataCache(str(tmp_path))
+    assert provider.get_type_info("GES") is not None
+    assert provider.meta_data_cache.get(ENDPOINT, "Source") is None
+
+
+@pytest.mark.parametrize(
+    "content", [None, b"not gzip", gzip.compress(b'{"version": 1'), b""]
+)
+def test_unreadable_snapshot_falls_back_to_requests(snapshot_path, content):
+    if content is None:
+        os.remove(snapshot_path)
+    else:
+        with open(snapshot_path, "wb") as snapshot_file:
+            snapshot_file.write(content)
+    transport = Mock()
+    transport.post.return_value = {
+        "data": {"__type": {"kind": "ENUM", "fields": None, "enumValues": []}}
+    }
+    provider = GraphQlSchemaMetaDataProvider(ENDPOINT, transport=transport)
+    with pytest.warns(UserWarning, match="Could not read the GraphQL schema"):
+        assert provider.get_type_info("GES").enum_values == {}
+    transport.post.assert_called_once()
+
+
+def test_snapshot_of_other_endpoint_is_ignored(snapshot_path):
+    transport = Mock()
+    transport.post.return_value = {
+        "data": {"__type": {"kind": "ENUM", "fields": None, "enumValues": []}}
+    }
+    provider = GraphQlSchemaMetaDataProvider("http://other", transport=transport)
+    assert provider.get_type_info("GES").enum_values == {}
+    transport.post.assert_called_once()
+
+
+def test_staleness_check(snapshot_path):
+    transport = Mock()
+    provider = GraphQlSchemaMetaDataProvider(ENDPOINT, transport=transport)
+    snapshot = load_snapshot(snapshot_path)
+
+    transport.post.return_value = {"data": {"__schema": {"types": SCHEMA_TYPES}}}
+    assert not provider.check_snapshot_staleness(snapshot)
+
+    transport.post.return_value = {"data": {"__schema": {"types": SCHEMA_TYPES[:1]}}}
+    with pytest.warns(UserWarning, match="outdated"):
+        assert provider.check_snapshot_staleness(snapshot)
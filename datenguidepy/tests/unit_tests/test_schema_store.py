@@ -0,0 +1,78 @@
+from datenguidepy.schema_json_meta import SCHEMA_JSON_PATH, get_schema_json
+from datenguidepy.schema_store import (
+    SchemaIndex,
+    SchemaStore,
+    compile_schema_store,
+    open_statistics_schema,
+    schema_json_hash,
+)
+from datenguidepy import schema_store
+
+import json
+import os
+import sqlite3
+import pytest
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SchemaIndex(get_schema_json())
+
+
+def test_outdated_store_is_compiled_again(tmp_path, schema_store_cache_dir):
+    other_json_path = str(tmp_path / "schema.json")
+    with open(other_json_path, "w") as schema_file:
+        json.dump({}, schema_file)
+    path = str(tmp_path / "schema.sqlite")
+    compile_schema_store(other_json_path, path)
+    with pytest.warns(UserWarning, match="not compiled from the bundled"):
+        store = open_statistics_schema(path)
+    assert store.path.startswith(schema_store_cache_dir)
+    assert store.source_hash() == schema_json_hash()
+    assert store.is_statistic("BEV001")
+
+    compile_schema_store(SCHEMA_JSON_PATH, path)
+    assert open_statistics_schema(path).path == path
+    assert os.listdir(str(tmp_path)) == ["schema.json", "schema.sqlite"]
+
+
+def test_store_matches_index(index, tmp_path):
+    path = str(tmp_path / "schema.sqlite")
+    compile_schema_store(SCHEMA_JSON_PATH, path)
+    store = SchemaStore(path)
+    assert store.stat_names() == index.stat_names()
+    assert store.stat_descriptions() == index.stat_descriptions()
+    assert store.stat_units() == index.stat_units()
+    assert store.all_enum_values() == index.all_enum_values()
+    for name in ["BEV001", "AI-Z08", "AI_Z08", "PART04", "unknown"]:
+        assert store.is_statistic(name) == index.is_statistic(name)
+        assert store.stat_description(name) == index.stat_description(name)
+        assert store.stat_unit(name) == index.stat_unit(name)
+        assert store.enum_values(name) == index.enum_values(name)
+
+
+def test_store_keeps_full_tables(tmp_path):
+    path = str(tmp_path / "schema.sqlite")
+    compile_schema_store(SCHEMA_JSON_PATH, path)
+    store = SchemaStore(path)
+    descriptions = store.stat_descriptions()
+    assert store.is_statistic("BEV001")
+    store._connection().close()
+    # the kept tables are answered without the (closed) connection
+    assert store.stat_descriptions() == descriptions
+    assert store.is_statistic("BEV001")
+    store.stat_descriptions().clear()
+    assert store.stat_descriptions() == descriptions
+
+
+def test_open_falls_back_to_schema_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_store, "SCHEMA_STORE_CACHE_DIR", None)
+    assert isinstance(open_statistics_schema(str(tmp_path / "missing")), SchemaIndex)
+    path = str(tmp_path / "schema.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    connection.execute("INSERT INTO meta VALUES ('format_version', '0')")
+    connection.commit()
+    connection.close()
+    with pytest.warns(UserWarning, match="version 0"):
+        assert isinstance(open_statistics_schema(path), SchemaIndex)
@@ -0,0 +1,106 @@
+from datenguidepy.search import SearchIndex, tokenize
+from datenguidepy.query_helper import get_statistics, _statistics_search_index
+from datenguidepy import query_helper
+
+import gzip
+import json
+import pytest
+
+DOCUMENTS = {
+    "BEV004": {"code": "BEV004", "short": "Ehescheidungen", "long": "Gerichtliche"},
+    "BEVMK3": {"code": "BEVMK3", "short": "Von der Scheidung betroffene Kinder"},
+    "AI-Z08": {"code": "AI-Z08", "short": "Erwerbslosenquote"},
+    "AI-Z09": {"code": "AI-Z09", "short": "Erwerbstätigenquote"},
+    "BEV001": {"code": "BEV001", "short": "Geborene", "long": "ohne Scheidung"},
+}
+WEIGHTS = {"code": 4.0, "short": 2.0, "long": 1.0}
+
+
+def test_tokenize():
+    assert tokenize("Die Ehescheidungen") == tokenize("ehescheidung")
+    assert tokenize("Bevölkerung") == tokenize("BEVOELKERUNG".replace("OE", "O"))
+    assert tokenize("Einwohner je qkm, BEV001") == ["einwoh", "qkm", "bev001"]
+
+
+def test_search_index_ranking():
+    index = SearchIndex.build(DOCUMENTS, WEIGHTS)
+    # matches in the short description rank before the long description
+    ranked = [key for key, _ in index.search("scheidung")]
+    assert set(ranked[:2]) == {"BEV004", "BEVMK3"}
+    assert ranked[2:] == ["BEV001"]
+    assert index.search("AI-Z08")[0][0] == "AI-Z08"
+    assert len(index.search("AI-Z08")) == 2
+    assert index.search("unbekannt") == []
+    assert len(index.search("scheidung", limit=1)) == 1
+
+
+def test_compounds_count_for_their_parts():
+    documents = {
+        "GAST01": {"code": "GAST01", "short": "Gästeankünfte", "long": "Gäste"},
+        "GES033": {"code": "GES033", "short": "Ärzte", "long": "ohne Gast-Ärzte"},
+        "KIN001": {"code": "KIN001", "short": "Kinderbetreuung", "long": ""},
+    }
+    index = SearchIndex.build(documents, WEIGHTS)
+    assert [key for key, _ in index.search("Gäste")] == ["GAST01", "GES033"]
+    # terms that are not indexed match the compounds starting or ending with them
+    assert [key for key, _ in index.search("Betreuung")] == ["KIN001"]
+    assert [key for key, _ in index.search("Kinder")] == ["KIN001"]
+    assert index.search("Ankünfte")[0][0] == "GAST01"
+
+
+def test_search_index_persistence(tmp_path):
+    path = str(tmp_path / "index.json.gz")
+    index = SearchIndex.build(DOCUMENTS, WEIGHTS)
+    index.save(path)
+    loaded = SearchIndex.load(path)
+    assert loaded.fingerprint == SearchIndex.document_fingerprint(DOCUMENTS)
+    assert loaded.search("Kinder Scheidung") == index.search("Kinder Scheidung")
+    # save replaces the file without leaving temporary files behind
+    index.save(path)
+    assert [p.name for p in tmp_path.iterdir()] == ["index.json.gz"]
+
+    with gzip.open(path, "wt") as index_file:
+        json.dump({"version": 0}, index_file)
+    with pytest.raises(ValueError):
+        SearchIndex.load(path)
+
+
+def test_get_statistics_search(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_helper, "SEARCH_INDEX_DIR", str(tmp_path))
+    _statistics_search_index.cache_clear()
+    statistics = get_statistics("scheidung")
+    assert list(statistics.columns) == ["short_description", "long_description"]
+    assert 0 < statistics.shape[0] < 50
+    assert statistics.index[0] == "BEV004"
+    assert get_statistics("divorce").index[0] == "BEV004"
+    assert get_statistics("Ehescheidungen", target_language="en").shape[0] > 0
+    assert (tmp_path / query_helper.SEARCH_INDEX_FILE).exists()
+
+    _statistics_search_index.cache_clear()
+    assert get_statistics("scheidung").equals(statistics)
+
+    # a truncated index file, e.g. from an interrupted write, is rebuilt
+    index_path = tmp_path / query_helper.SEARCH_INDEX_FILE
+    index_path.write_bytes(index_path.read_bytes()[:100])
+    _statistics_search_index.cache_clear()
+    assert get_statistics("scheidung").equals(statistics)
+    SearchIndex.load(str(index_path))
+    _statistics_search_index.cache_clear()
+
+
+def test_get_statistics_ranking_and_fallback():
+    statistics = get_statistics()
+    assert get_statistics("").equals(statistics)
+    assert get_statistics("  ").equals(statistics)
+
+    ranked = list(get_statistics("Gäste").index)
+    assert ranked.index("GAST01") < ranked.index("GES033")
+
+    # statistics containing the search follow the ranked matches
+    found = get_statistics("bev")
+    contained = statistics["short_description"].str.contains("bev", case=False)
+    assert set(statistics.index[contained]) <= set(found.index)
+    assert set(statistics.index[statistics.index.str.startswith("BEV")]) <= set(
+        found.index
+    )
+    assert found.index.is_unique
@@ -0,0 +1,186 @@
+from datenguidepy.single_flight import SingleFlight, AsyncSingleFlight
+from datenguidepy.transport import HttpTransport, TransferStats
+
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+
+
+def run_in_threads(function, count):
+    results = [None] * count
+    errors = [None] * count
+
+    def target(i):
+        try:
+            results[i] = function()
+        except Exception as error:
+            errors[i] = error
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"data": {"region": {"id": "01"}}}
+
+    results, errors = run_in_threads(lambda: single_flight.do("key", slow_call), 5)
+    assert len(calls) == 1
+    assert all(result[0] == {"data": {"region": {"id": "01"}}} for result in results)
+    assert sorted(result[1] for result in results) == [False] + [True] * 4
+    # waiters receive copies
+    assert len({id(result[0]) for result in results}) == 5
+
+
+def test_errors_propagate_to_all_waiters():
+    single_flight = SingleFlight()
+
+    def failing_call():
+        time.sleep(0.05)
+        raise RuntimeError("No result")
+
+    results, errors = run_in_threads(lambda: single_flight.do("key", failing_call), 4)
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+
+def test_finished_calls_are_not_cached():
+    single_flight = SingleFlight()
+    function = Mock(return_value=1)
+    single_flight.do("key", function)
+    single_flight.do("key", function)
+    assert function.call_count == 2
+
+
+def test_async_calls_are_coalesced():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"data": None}
+
+    async def call_all():
+        return await asyncio.gather(
+            *[single_flight.do("key", slow_call) for _ in range(3)],
+            single_flight.do("other", slow_call),
+        )
+
+    loop = asyncio.new_event_loop()
+    results = loop.run_until_complete(call_all())
+    loop.close()
+    assert len(calls) == 2
+    assert [shared for _, shared in results] == [False, True, True, False]
+
+
+def test_async_calls_are_coalesced_per_event_loop():
+    single_flight = AsyncSingleFlight()
+    calls = []
+    both_started = threading.Barrier(2)
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"data": None}
+
+    def call_in_new_loop(results):
+        loop = asyncio.new_event_loop()
+        both_started.wait()
+        results.append(loop.run_until_complete(single_flight.do("key", slow_call)))
+        loop.close()
+
+    results = []
+    threads = [
+        threading.Thread(target=call_in_new_loop, args=(results,)) for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 2
+    assert [shared for _, shared in results] == [False, False]
+
+
+def test_async_errors_propagate_to_all_waiters():
+    single_flight = AsyncSingleFlight()
+
+    async def failing_call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("No result")
+
+    async def call_all():
+        return await asyncio.gather(
+            *[single_flight.do("key", failing_call) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+    loop = asyncio.new_event_loop()
+    results = loop.run_until_complete(call_all())
+    loop.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_transport_coalesces_identical_requests():
+    transport = HttpTransport(single_flight=SingleFlight())
+    transport._session = Mock()
+
+    def post(*args, **kwargs):
+        time.sleep(0.05)
+        return Mock(
+            status_code=200,
+            json=lambda: {"data": {}},
+            content=b'{"data": {}}',
+            raw=Mock(tell=lambda: 12),
+        )
+
+    transport._session.post.side_effect = post
+    stats = TransferStats()
+    results, errors = run_in_threads(
+        lambda: transport.post(
+            "http://endpoint", {"query": "{}", "variables": {"page": 0}}, None, stats
+        ),
+        4,
+    )
+    assert results == [{"data": {}}] * 4
+    assert transport._session.post.call_count == 1
+    assert stats.requests == 1
+    assert stats.shared_responses == 3
+
+
+def test_transport_does_not_coalesce_different_variables():
+    transport = HttpTransport(single_flight=SingleFlight())
+    transport._session = Mock()
+    transport._session.post.return_value = Mock(
+        status_code=200, json=lambda: {"data": {}}
+    )
+    for page in range(2):
+        transport.post("http://endpoint", {"query": "{}", "variables": {"page": page}})
+    assert transport._session.post.call_count == 2
+
+
+@pytest.mark.parametrize("count", [2, 8])
+def test_transport_propagates_errors_to_waiters(count):
+    transport = HttpTransport(single_flight=SingleFlight())
+    transport._session = Mock()
+
+    def post(*args, **kwargs):
+        time.sleep(0.05)
+        return Mock(status_code=400)
+
+    transport._session.post.side_effect = post
+    results, errors = run_in_threads(
+        lambda: transport.post("http://endpoint", {"query": "{}"}), count
+    )
+    assert all("status code 400" in str(error) for error in errors)
+    assert transport._session.post.call_count == 1
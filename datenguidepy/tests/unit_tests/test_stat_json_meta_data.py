@@ -1,4 +1,12 @@
 from datenguidepy.query_execution import StatisticsSchemaJsonMetaDataProvider
+from datenguidepy.schema_json_meta import (
+    compile_json_path,
+    get_json_path,
+    get_schema_json,
+)
+from datenguidepy.schema_store import DEFAULT_SCHEMA_STORE_PATH, SchemaStore
+
+import pytest
 
 
 def test_get_query_specific_stat_meta():
@@ -62,3 +70,50 @@ def test_get_query_specific_unit_meta():
 
     expected_stat_meta = {"WAHL09": "Anzahl"}
     assert query_stat_meta == expected_stat_meta
+
+
+@pytest.mark.parametrize(
+    "schema_store, use_schema_store",
+    [(DEFAULT_SCHEMA_STORE_PATH, True), ("missing", True), (None, False)],
+)
+def test_indexes_match_schema(schema_store, use_schema_store):
+    provider = StatisticsSchemaJsonMetaDataProvider(
+        schema_store=schema_store, use_schema_store=use_schema_store
+    )
+    # without a compiled store at schema_store it is compiled on first use
+    assert isinstance(provider._schema, SchemaStore) == use_schema_store
+    full_data_json = [get_schema_json()]
+    stat_names = get_json_path(full_data_json, ["..", "measures", "..", "name"])
+    units = get_json_path(full_data_json, ["..", "measures", "..", "units"])
+    assert provider.is_statistic("WAHL09")
+    assert not provider.is_statistic("PART04")
+    assert set(provider.stat_names) == set(provider.get_stat_descriptions())
+    assert provider.get_stat_units() == {
+        name: unit[0]["measure_name_de"] for name, unit in zip(stat_names, units)
+    }
+    assert provider.get_enum_values()["PART04"]["GESAMT"] == "Gesamt"
+
+
+def test_json_path():
+    json = [
+        {
+            "a": {"measures": {"X": {"name": "x", "dims": {"G": {"v": 1}}}}},
+            "b": {"measures": None},
+            "c": {"measures": {"Y": {"dims": {"H": {"v": 2}, "G": {"v": 3}}}}},
+        }
+    ]
+    assert get_json_path(json, ["..", "measures", "..", "name"]) == ["x", "Missing"]
+    assert get_json_path(json, ["..", "measures", "..", "dims", "G", "v"]) == [1, 3]
+    assert get_json_path(json, ["..", "measures", "..", "dims", ".."]) == [
+        {"v": 1},
+        {"v": 2},
+        {"v": 3},
+    ]
+    assert get_json_path([], ["..", "name"]) == []
+
+    measures = compile_json_path(("..", "measures", ".."))
+    assert measures is compile_json_path(("..", "measures", ".."))
+    assert list(measures.project(json, ["name", "dims"], default=None)) == [
+        ("x", {"G": {"v": 1}}),
+        (None, {"H": {"v": 2}, "G": {"v": 3}}),
+    ]
@@ -0,0 +1,120 @@
+from datenguidepy.synthetic import SyntheticApi, SyntheticServer, parse_query, Selection
+from datenguidepy.query_execution import GraphQlSchemaMetaDataProvider
+from datenguidepy.transport import HttpTransport, NO_RETRY
+
+import pytest
+
+ALL_REGIONS_QUERY = (
+    "query ($page : Int, $itemsPerPage : Int) "
+    "{allRegions (page: $page, itemsPerPage: $itemsPerPage){"
+    'regions (parent: "09", nuts: 3){id name BEVSTD (year: [2018, 2019], '
+    "filter:{ GES: { nin: []}}){value year GES }}page itemsPerPage total }}"
+)
+
+
+@pytest.fixture(scope="module")
+def api():
+    return SyntheticApi(years=3)
+
+
+def test_parse_query():
+    selections = parse_query(
+        'query ($page : Int) {r0: region (id: "09"){BEV (GES: [GESM], year: $page)'
+        "{value }}}",
+        {"page": 2017},
+    )
+    assert selections == [
+        Selection(
+            "region",
+            "r0",
+            {"id": "09"},
+            [
+                Selection(
+                    "BEV",
+                    "BEV",
+                    {"GES": ["GESM"], "year": 2017},
+                    [Selection("value", "value", {}, [])],
+                )
+            ],
+        )
+    ]
+
+
+def test_all_regions_pages(api):
+    regions = []
+    for page in range(3):
+        body = api.execute(
+            {
+                "query": ALL_REGIONS_QUERY,
+                "variables": {"page": page, "itemsPerPage": 40},
+            }
+        )
+        result = body["data"]["allRegions"]
+        regions.extend(region["id"] for region in result["regions"])
+    assert result["total"] == len(regions) == len(set(regions))
+    assert all(region_id.startswith("09") for region_id in regions)
+
+
+def test_enum_combinations(api):
+    body = api.execute(
+        {"query": ALL_REGIONS_QUERY, "variables": {"page": 0, "itemsPerPage": 1}}
+    )
+    records = body["data"]["allRegions"]["regions"][0]["BEVSTD"]
+    assert {(record["year"], record["GES"]) for record in records} == {
+        (year, sex) for year in [2018, 2019] for sex in api.enum_values["GES"]
+    }
+    assert (
+        records
+        == SyntheticApi(years=3).execute(
+            {"query": ALL_REGIONS_QUERY, "variables": {"page": 0, "itemsPerPage": 1}}
+        )["data"]["allRegions"]["regions"][0]["BEVSTD"]
+    )
+
+    body = api.execute({"query": '{region (id: "11"){BEVSTD {value GES }}}'})
+    assert [record["GES"] for record in body["data"]["region"]["BEVSTD"]] == [None] * 3
+
+
+def test_invalid_queries(api):
+    assert "errors" in api.execute({"query": '{region (id: "11"){XYZ {value }}}'})
+    assert "errors" in api.execute({"query": '{region (id: "11"){'})
+    assert api.execute({"query": '{region (id: "XX"){id }}'}) == {
+        "data": {"region": None}
+    }
+
+
+def test_regions_knob():
+    assert len(SyntheticApi(regions=5).regions) == 5
+    regions = SyntheticApi(regions=20000).regions
+    assert len({region["id"] for region in regions}) == 20000
+
+
+def test_type_introspection(api):
+    provider = GraphQlSchemaMetaDataProvider()
+    query_json = provider._type_info_query_json("Region")
+    meta = provider._process_type_info("Region", api.execute(query_json))
+    assert meta.fields["BEVSTD"].get_return_type() == "BEVSTD"
+    enum_meta = provider._process_type_info(
+        "GES", api.execute(provider._type_info_query_json("GES"))
+    )
+    assert enum_meta.kind == "ENUM"
+    assert set(enum_meta.enum_values) == set(api.enum_values["GES"])
+
+
+def test_server_errors():
+    transport = HttpTransport(retry_policy=NO_RETRY)
+    with SyntheticServer(error_rate=1.0, regions=10) as server:
+        with pytest.raises(RuntimeError, match="503"):
+            transport.post(server.endpoint, {"query": '{region (id: "11"){id }}'})
+    with SyntheticServer(regions=10) as server:
+        body = transport.post(server.endpoint, {"query": '{region (id: "11"){id }}'})
+        assert body == {"data": {"region": {"id": "11"}}}
+    transport.close()
+
+
+def test_schema_introspection(api):
+    provider = GraphQlSchemaMetaDataProvider(full_schema=True)
+    provider._process_schema_info(api.execute(provider._schema_info_query_json()))
+    assert provider.get_type_info("Region").fields["BEVSTD"].get_return_type() == (
+        "BEVSTD"
+    )
+    assert provider.get_type_info("GES").kind == "ENUM"
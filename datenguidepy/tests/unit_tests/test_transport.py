@@ -0,0 +1,332 @@
+from datenguidepy.transport import (
+    HttpTransport,
+    TransportConfig,
+    RetryPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    NO_RETRY,
+    DEFAULT_TRANSPORT,
+    TransferStats,
+    parse_retry_after,
+)
+from datenguidepy.query_execution import (
+    QueryExecutioner,
+    GraphQlSchemaMetaDataProvider,
+)
+from datenguidepy.single_flight import SingleFlight
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import asyncio
+import gzip
+import json
+import pytest
+import requests
+import threading
+import time
+from email.utils import formatdate
+from unittest.mock import Mock
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    # http.server.ThreadingHTTPServer only exists from Python 3.7 on
+    daemon_threads = True
+
+
+@pytest.fixture
+def mocked_session_transport():
+    transport = HttpTransport(retry_policy=NO_RETRY)
+    session = Mock()
+    transport._session = session
+    return transport, session
+
+
+def test_default_transport_is_shared():
+    qe1 = QueryExecutioner()
+    qe2 = QueryExecutioner(alternative_endpoint="http://localhost:8080/graphql")
+    mdp = GraphQlSchemaMetaDataProvider()
+    assert qe1.transport is DEFAULT_TRANSPORT
+    assert qe2.transport is DEFAULT_TRANSPORT
+    assert mdp.transport is DEFAULT_TRANSPORT
+    assert qe1.graph_ql_schema_meta_data_provider.transport is DEFAULT_TRANSPORT
+
+
+def test_default_transport_resilience_settings():
+    # transient failures are retried and identical concurrent requests are
+    # coalesced by default, see docs/large_queries.rst
+    assert DEFAULT_TRANSPORT.retry_policy == RetryPolicy()
+    assert DEFAULT_TRANSPORT.retry_policy.max_attempts == 4
+    assert isinstance(DEFAULT_TRANSPORT.circuit_breaker, CircuitBreaker)
+    assert isinstance(DEFAULT_TRANSPORT.single_flight, SingleFlight)
+    assert HttpTransport().circuit_breaker is None
+    assert HttpTransport().single_flight is None
+
+
+def test_custom_transport_is_passed_to_schema_provider():
+    transport = HttpTransport(TransportConfig(pool_maxsize=2))
+    qe = QueryExecutioner(transport=transport)
+    assert qe.transport is transport
+    assert qe.graph_ql_schema_meta_data_provider.transport is transport
+
+
+def test_session_is_created_once_with_pool_config():
+    transport = HttpTransport(
+        TransportConfig(pool_connections=3, pool_maxsize=7, keep_alive=False)
+    )
+    session = transport.session
+    assert transport.session is session
+    adapter = session.get_adapter("https://api-next.datengui.de/graphql")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+    assert session.headers["Connection"] == "close"
+
+
+def test_post_returns_body(mocked_session_transport):
+    transport, session = mocked_session_transport
+    session.post.return_value = Mock(status_code=200, json=lambda: {"data": {}})
+    body = transport.post("http://endpoint", {"query": "{}"})
+    assert body == {"data": {}}
+    session.post.assert_called_once()
+
+
+def test_post_raises_on_non_200(mocked_session_transport):
+    transport, session = mocked_session_transport
+    session.post.return_value = Mock(status_code=500)
+    with pytest.raises(RuntimeError, match="status code 500"):
+        transport.post("http://endpoint", {"query": "{}"})
+
+
+def test_executioner_checks_body_errors(mocked_session_transport):
+    transport, session = mocked_session_transport
+    session.post.return_value = Mock(
+        status_code=200,
+        json=lambda: {"errors": ["invalid"]},
+        content=b'{"errors": ["invalid"]}',
+        raw=Mock(tell=lambda: 23),
+    )
+    qe = QueryExecutioner(transport=transport)
+    with pytest.raises(RuntimeError, match="error content"):
+        qe._send_request({"query": "{}"})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("datenguidepy.transport.time.sleep", sleeps.append)
+    return sleeps
+
+
+def response(status_code, headers=None):
+    return Mock(
+        status_code=status_code, headers=headers or {}, json=lambda: {"data": {}}
+    )
+
+
+def test_retries_transient_status_codes(sleeps):
+    transport = HttpTransport(retry_policy=RetryPolicy(jitter=False))
+    transport._session = Mock()
+    transport._session.post.side_effect = [
+        response(503),
+        requests.ConnectionError(),
+        response(200),
+    ]
+    assert transport.post("http://endpoint", {"query": "{}"}) == {"data": {}}
+    assert sleeps == [0.5, 1.0]
+
+
+def test_responses_are_closed(sleeps):
+    transport = HttpTransport(retry_policy=RetryPolicy(max_attempts=2))
+    transport._session = Mock()
+    responses = [response(503), response(503)]
+    transport._session.post.side_effect = responses
+    with pytest.raises(RuntimeError, match="status code 503"):
+        transport.post("http://endpoint", {"query": "{}"})
+    assert all(resp.close.call_count == 1 for resp in responses)
+
+    responses = [response(429), response(200)]
+    transport._session.post.side_effect = responses
+    transport.post_stream("http://endpoint", {"query": "{}"}, ["data"])
+    assert responses[0].close.call_count == 1
+    assert responses[1].close.call_count == 0
+
+    # the circuit opens after the first failure and stops the retries
+    transport.circuit_breaker = CircuitBreaker(failure_threshold=1)
+    responses = [response(503)]
+    transport._session.post.side_effect = responses
+    with pytest.raises(CircuitOpenError):
+        transport.post("http://endpoint", {"query": "{}"})
+    assert responses[0].close.call_count == 1
+
+
+def test_gives_up_after_max_attempts(sleeps):
+    transport = HttpTransport(retry_policy=RetryPolicy(max_attempts=3))
+    transport._session = Mock()
+    transport._session.post.return_value = response(502)
+    with pytest.raises(RuntimeError, match="status code 502"):
+        transport.post("http://endpoint", {"query": "{}"})
+    assert transport._session.post.call_count == 3
+    assert all(0 <= s <= 0.5 * 2 ** i for i, s in enumerate(sleeps))
+
+
+def test_does_not_retry_other_status_codes(sleeps):
+    transport = HttpTransport()
+    transport._session = Mock()
+    transport._session.post.return_value = response(400)
+    with pytest.raises(RuntimeError, match="status code 400"):
+        transport.post("http://endpoint", {"query": "{}"})
+    assert transport._session.post.call_count == 1
+
+
+def test_retry_after_is_respected(sleeps):
+    transport = HttpTransport()
+    transport._session = Mock()
+    transport._session.post.side_effect = [
+        response(429, {"Retry-After": "7"}),
+        response(200),
+    ]
+    transport.post("http://endpoint", {"query": "{}"})
+    assert sleeps == [7.0]
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 0 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert RetryPolicy(max_backoff=10).delay(0, "120") == 10
+
+
+def test_circuit_breaker_fails_fast_and_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("datenguidepy.transport.time.time", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    transport = HttpTransport(retry_policy=NO_RETRY, circuit_breaker=breaker)
+    transport._session = Mock()
+    transport._session.post.return_value = response(503)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="status code 503"):
+            transport.post("http://endpoint", {"query": "{}"})
+
+    with pytest.raises(CircuitOpenError):
+        transport.post("http://endpoint", {"query": "{}"})
+    assert transport._session.post.call_count == 2
+
+    now[0] += 31
+    transport._session.post.return_value = response(200)
+    assert transport.post("http://endpoint", {"query": "{}"}) == {"data": {}}
+    assert breaker.state("http://endpoint") == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_is_kept_per_endpoint(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2)
+    transport = HttpTransport(retry_policy=NO_RETRY, circuit_breaker=breaker)
+    transport._session = Mock()
+    transport._session.post.side_effect = lambda endpoint, **kwargs: response(
+        503 if endpoint == "http://failing" else 200
+    )
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="status code 503"):
+            transport.post("http://failing", {"query": "{}"})
+    with pytest.raises(CircuitOpenError):
+        transport.post("http://failing", {"query": "{}"})
+    assert transport.post("http://healthy", {"query": "{}"}) == {"data": {}}
+    assert breaker.state("http://failing") == CircuitBreaker.OPEN
+    assert breaker.state("http://healthy") == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_request_reopens_circuit(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("datenguidepy.transport.time.time", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure("http://endpoint")
+    now[0] += 31
+    breaker.before_request("http://endpoint")
+    assert breaker.state("http://endpoint") == CircuitBreaker.HALF_OPEN
+    breaker.record_failure("http://endpoint")
+    assert breaker.state("http://endpoint") == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request("http://endpoint")
+
+
+@pytest.fixture
+def compressing_server():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            requests_seen.append((dict(self.headers), json.loads(body)))
+            response = json.dumps(
+                {"data": {"allRegions": {"regions": [{"id": "01"}] * 500}}}
+            ).encode("utf-8")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                response = gzip.compress(response)
+                self.send_response(200)
+                self.send_header("Content-Encoding", "gzip")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/graphql", requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_compressed_responses_are_counted(compressing_server):
+    endpoint, requests_seen = compressing_server
+    transport = HttpTransport()
+    stats = TransferStats()
+    body = transport.post(endpoint, {"query": "{}"}, transfer_stats=stats)
+    transport.close()
+
+    assert len(body["data"]["allRegions"]["regions"]) == 500
+    assert "gzip" in requests_seen[0][0]["Accept-Encoding"]
+    assert stats.requests == 1
+    assert stats.decoded_bytes == len(json.dumps(body))
+    assert stats.compression_ratio > 10
+
+
+def test_large_request_bodies_are_compressed(compressing_server):
+    endpoint, requests_seen = compressing_server
+    transport = HttpTransport(TransportConfig(compress_requests_above=100))
+    stats = TransferStats()
+    query_json = {"query": "{" + "id " * 1000 + "}"}
+    transport.post(endpoint, query_json, transfer_stats=stats)
+    transport.post(endpoint, {"query": "{}"}, transfer_stats=stats)
+    transport.close()
+
+    assert requests_seen[0][0]["Content-Encoding"] == "gzip"
+    assert requests_seen[0][1] == query_json
+    assert "Content-Encoding" not in requests_seen[1][0]
+    assert stats.sent_bytes < len(json.dumps(query_json))
+
+
+def test_async_transport_decompresses_and_counts(compressing_server):
+    pytest.importorskip("aiohttp")
+    from datenguidepy.async_execution import AsyncHttpTransport
+
+    endpoint, requests_seen = compressing_server
+    stats = TransferStats()
+
+    async def post():
+        transport = AsyncHttpTransport()
+        try:
+            return await transport.post(endpoint, {"query": "{}"}, transfer_stats=stats)
+        finally:
+            await transport.close()
+
+    loop = asyncio.new_event_loop()
+    body = loop.run_until_complete(post())
+    loop.close()
+    assert len(body["data"]["allRegions"]["regions"]) == 500
+    assert stats.compression_ratio > 10
@@ -4,7 +4,10 @@ from datenguidepy.query_execution import (
     TypeMetaData,
     StatisticsGraphQlMetaDataProvider,
     GraphQlSchemaMetaDataProvider,
+    TypeMetaDataCache,
     StatisticsSchemaJsonMetaDataProvider,
+    AdaptivePaging,
+    Paginator,
 )
 from datenguidepy.output_transformer import QueryOutputTransformer
 from datenguidepy.query_helper import (
@@ -19,6 +22,9 @@ import pytest
 from unittest.mock import Mock
 from collections import namedtuple
 import pandas as pd
+import threading
+import time
+import re
 
 
 @pytest.fixture
@@ -236,16 +242,14 @@ def test_get_type_info_caches_results(type_request_response):
     req_mock, expected_result = type_request_response
     mdp = GraphQlSchemaMetaDataProvider()
     mdp._send_request = req_mock
-    mdp.__class__._META_DATA_CACHE = dict()  # clear cache
     assert (
-        "BEVMK3Statistics" not in mdp.__class__._META_DATA_CACHE
+        mdp.meta_data_cache.get(mdp.endpoint, "BEVMK3Statistics") is None
     ), "statistics should not be in cache"
     res = mdp.get_type_info("BEVMK3Statistics")
     assert res == expected_result, "incorrect response processing"
     mdp._send_request.assert_called_once()
-    assert "BEVMK3Statistics" in mdp.__class__._META_DATA_CACHE
     assert (
-        mdp.__class__._META_DATA_CACHE["BEVMK3Statistics"] == expected_result
+        mdp.meta_data_cache.get(mdp.endpoint, "BEVMK3Statistics") == expected_result
     ), "cache results are wrong"
 
 
@@ -253,12 +257,135 @@ def test_get_type_info_uses_cached_results(type_request_response):
     req_mock, expected_result = type_request_response
     mdp = GraphQlSchemaMetaDataProvider()
     mdp._send_request = req_mock
-    mdp.__class__._META_DATA_CACHE = {"BEVMK3Statistics": expected_result}
+    mdp.meta_data_cache.set(mdp.endpoint, "BEVMK3Statistics", expected_result)
     res = mdp.get_type_info("BEVMK3Statistics")
     assert res == expected_result
     mdp._send_request.assert_not_called()
 
 
+def test_get_type_info_loads_full_schema_once(type_request_response):
+    _, expected_result = type_request_response
+    transport = Mock()
+    schema_types = [
+        {
+            "kind": "ENUM",
+            "name": "BEVMK3Statistics",
+            "enumValues": [
+                {
+                    "name": "R12631",
+                    "description": "Statistik rechtskräftiger Urteile in Ehesachen",
+                }
+            ],
+            "fields": None,
+        },
+        {
+            "kind": "OBJECT",
+            "name": "Source",
+            "enumValues": None,
+            "fields": [{"name": "url", "type": {"kind": "SCALAR", "name": "String"}}],
+        },
+    ]
+
+    def post(*args, **kwargs):
+        time.sleep(0.05)
+        return {"data": {"__schema": {"types": schema_types}}}
+
+    transport.post.side_effect = post
+    mdp = GraphQlSchemaMetaDataProvider(transport=transport, full_schema=True)
+    threads = [
+        threading.Thread(target=mdp.get_type_info, args=("Source",)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mdp.get_type_info("BEVMK3Statistics") == expected_result
+    assert mdp.get_type_info("Source").fields["url"].get_return_type() == "String"
+    assert mdp.get_type_info("Unknown") is None
+    transport.post.assert_called_once()
+    assert "__schema" in transport.post.call_args[0][1]["query"]
+
+
+def test_type_meta_data_cache_is_persistent(type_request_response, tmp_path):
+    _, expected_result = type_request_response
+    cache = TypeMetaDataCache(str(tmp_path))
+    cache.set_schema("http://a", "hash1", 100.0)
+    cache.set("http://a", "BEVMK3Statistics", expected_result)
+    cache.add_marker("http://a", "schema")
+
+    reopened = TypeMetaDataCache(str(tmp_path))
+    assert reopened.get("http://a", "BEVMK3Statistics") == expected_result
+    assert reopened.has_marker("http://a", "schema")
+    assert reopened.get("http://b", "BEVMK3Statistics") is None
+    assert not reopened.has_marker("http://b", "schema")
+
+    expired = TypeMetaDataCache(str(tmp_path), ttl=-1)
+    assert expired.get("http://a", "BEVMK3Statistics") is None
+
+
+def test_type_meta_data_cache_is_keyed_by_schema(type_request_response, tmp_path):
+    _, expected_result = type_request_response
+    cache = TypeMetaDataCache(str(tmp_path))
+    cache.set("http://a", "BEVMK3Statistics", expected_result)
+    cache.add_marker("http://a", "schema")
+    assert cache.set_schema("http://a", "hash1", 100.0)
+    # types of an unknown or previous schema are dropped
+    assert cache.get("http://a", "BEVMK3Statistics") is None
+    assert not cache.has_marker("http://a", "schema")
+    cache.set("http://a", "BEVMK3Statistics", expected_result)
+    cache.set("http://b", "BEVMK3Statistics", expected_result)
+    cache.set_schema("http://c", "hash1", 100.0)
+    cache.set("http://c", "BEVMK3Statistics", expected_result)
+
+    reopened = TypeMetaDataCache(str(tmp_path))
+    assert reopened.get("http://a", "BEVMK3Statistics") == expected_result
+    # types of an unknown schema are never persisted, as they could be outdated
+    assert reopened.get("http://b", "BEVMK3Statistics") is None
+    # older schemas are ignored, the same schema keeps the types
+    assert not reopened.set_schema("http://a", "hash0", 50.0)
+    assert reopened.set_schema("http://a", "hash1", 200.0)
+    assert reopened.get("http://a", "BEVMK3Statistics") == expected_result
+    assert reopened.set_schema("http://a", "hash2", 200.0)
+    assert reopened.get("http://a", "BEVMK3Statistics") is None
+    assert reopened.get("http://c", "BEVMK3Statistics") == expected_result
+    assert TypeMetaDataCache(str(tmp_path)).get("http://a", "BEVMK3Statistics") is None
+
+
+def test_type_meta_data_cache_drops_least_recently_used(type_request_response):
+    _, expected_result = type_request_response
+    cache = TypeMetaDataCache(maxsize=2)
+    cache.add_marker("http://a", "schema")
+    for name in ["A", "B"]:
+        cache.set("http://a", name, expected_result)
+    assert cache.get("http://a", "A") == expected_result
+    cache.set("http://a", "C", expected_result)
+    assert cache.get("http://a", "B") is None
+    assert cache.get("http://a", "A") == cache.get("http://a", "C") == expected_result
+    assert not cache.has_marker("http://a", "schema")
+
+
+def test_type_meta_data_cache_threads(type_request_response, tmp_path):
+    _, expected_result = type_request_response
+    cache = TypeMetaDataCache(str(tmp_path))
+    cache.set_schema("http://a", "hash1", 100.0)
+
+    def fill(thread_id):
+        for i in range(50):
+            cache.set("http://a", f"T{thread_id}_{i}", expected_result)
+
+    threads = [threading.Thread(target=fill, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reopened = TypeMetaDataCache(str(tmp_path))
+    assert all(
+        reopened.get("http://a", f"T{thread_id}_{i}") == expected_result
+        for thread_id in range(4)
+        for i in range(50)
+    )
+
+
 def test_federal_states():
     state_mappings = [
         ("Schleswig_Holstein", "01"),
@@ -433,3 +560,235 @@ def test_get_query_specific_enum_meta():
     }
     print(query_stat_meta, expected_stat_meta)
     assert query_stat_meta == expected_stat_meta
+
+
+def test_run_query_concurrently_keeps_input_order(multi_region_query):
+    query, region_ids = multi_region_query
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def send_request(query_json):
+        with lock:
+            in_flight.append(1)
+            max_in_flight.append(len(in_flight))
+        # later regions answer first
+        region_id = re.search(r'id: "(\d+)"', query_json["query"]).group(1)
+        time.sleep(0.01 * (len(region_ids) - int(region_id)))
+        with lock:
+            in_flight.pop()
+        return {"data": {"region": {"id": region_id, "BEVMK3": []}}}
+
+    qe = QueryExecutioner(max_workers=4)
+    qe._send_request = send_request
+    results = qe.run_query(query)
+
+    assert [r.query_results[0]["data"]["region"]["id"] for r in results] == region_ids
+    assert 1 < max(max_in_flight) <= 4
+
+
+def test_run_query_propagates_worker_errors(multi_region_query):
+    query, _ = multi_region_query
+    qe = QueryExecutioner(max_workers=4)
+    qe._send_request = Mock(side_effect=RuntimeError("No result"))
+    with pytest.raises(RuntimeError, match="No result"):
+        qe.run_query(query)
+
+
+def test_invalid_max_workers_raises_error():
+    with pytest.raises(ValueError):
+        QueryExecutioner(max_workers=0)
+
+
+@pytest.fixture
+def all_regions_query():
+    query = Mock()
+    query.get_graphql_query.return_value = [
+        "query ($page : Int, $itemsPerPage : Int) "
+        "{allRegions (page: $page, itemsPerPage: $itemsPerPage)"
+        "{regions {id } page itemsPerPage total }}"
+    ]
+    query._get_fields_with_types.return_value = [
+        ("allRegions", "RegionsResult"),
+        ("regions", "Region"),
+        ("id", "String"),
+        ("page", "Int"),
+        ("itemsPerPage", "Int"),
+        ("total", "Int"),
+    ]
+    return query
+
+
+def paged_response(total):
+    requested_pages = []
+
+    def send_request(query_json):
+        page = query_json["variables"]["page"]
+        items_per_page = query_json["variables"]["itemsPerPage"]
+        requested_pages.append(page)
+        # later pages answer first
+        time.sleep(0.005 * (total // items_per_page - page))
+        first, last = page * items_per_page, min((page + 1) * items_per_page, total)
+        return {
+            "data": {
+                "allRegions": {
+                    "regions": [{"id": str(i)} for i in range(first, last)],
+                    "page": page,
+                    "itemsPerPage": items_per_page,
+                    "total": total,
+                }
+            }
+        }
+
+    return send_request, requested_pages
+
+
+@pytest.mark.parametrize("total,pages", [(0, 1), (1000, 1), (1001, 2), (3500, 4)])
+def test_remaining_pages(total, pages):
+    first_page = {"data": {"allRegions": {"page": 0, "itemsPerPage": 1000}}}
+    first_page["data"]["allRegions"]["total"] = total
+    assert QueryExecutioner._remaining_pages(first_page) == list(range(1, pages))
+
+
+def test_all_regions_pages_are_prefetched_in_order(all_regions_query):
+    send_request, requested_pages = paged_response(3500)
+    qe = QueryExecutioner(max_workers=3)
+    qe._send_request = send_request
+    results = qe.run_query(all_regions_query)
+
+    pages = results[0].query_results
+    assert [p["data"]["allRegions"]["page"] for p in pages] == [0, 1, 2, 3]
+    assert sorted(requested_pages) == [0, 1, 2, 3]
+    region_ids = [r["id"] for p in pages for r in p["data"]["allRegions"]["regions"]]
+    assert region_ids == [str(i) for i in range(3500)]
+
+
+def test_concurrent_queries_and_pages_share_max_workers(multi_region_query):
+    query, _ = multi_region_query
+    query.get_graphql_query.return_value = [
+        "query ($page : Int, $itemsPerPage : Int) "
+        "{allRegions (page: $page, itemsPerPage: $itemsPerPage)"
+        "{regions {id } page itemsPerPage total }}"
+    ] * 4
+    query._get_fields_with_types.return_value = [("allRegions", "RegionsResult")]
+    send_request, _ = paged_response(4000)
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def post(endpoint, query_json, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return send_request(query_json)
+
+    transport = Mock()
+    transport.post.side_effect = post
+    qe = QueryExecutioner(transport=transport, max_workers=3)
+    qe.stat_meta_data_provider = Mock()
+    results = qe.run_query(query)
+    assert len(results) == 4
+    assert transport.post.call_count == 16
+    assert in_flight[1] == 3
+
+
+def region_pages(total, region_bytes=100):
+    requested_pages = []
+
+    def send_request(query_json):
+        page = query_json["variables"]["page"]
+        items_per_page = query_json["variables"]["itemsPerPage"]
+        requested_pages.append((page, items_per_page))
+        first, last = page * items_per_page, min((page + 1) * items_per_page, total)
+        regions = [
+            {"id": str(i), "name": "x" * (region_bytes - 20)}
+            for i in range(first, last)
+        ]
+        return {
+            "data": {
+                "allRegions": {
+                    "regions": regions,
+                    "page": page,
+                    "itemsPerPage": items_per_page,
+                    "total": total,
+                }
+            }
+        }
+
+    return send_request, requested_pages
+
+
+def region_ids(results):
+    pages = results[0].query_results
+    return [r["id"] for p in pages for r in p["data"]["allRegions"]["regions"]]
+
+
+@pytest.mark.parametrize(
+    "offset,total,page_size,plan",
+    [
+        (1024, 3000, 1024, [(1, 1024), (2, 1024)]),
+        (256, 3000, 1024, [(1, 256), (1, 512), (1, 1024), (2, 1024)]),
+        (256, 400, 64, [(4, 64), (5, 64), (6, 64)]),
+        (256, 100, 64, []),
+    ],
+)
+def test_page_plan(offset, total, page_size, plan):
+    assert Paginator._page_plan(offset, total, page_size) == plan
+
+
+def test_configurable_page_size(all_regions_query):
+    send_request, requested_pages = region_pages(1200)
+    qe = QueryExecutioner(page_size=500)
+    qe._send_request = send_request
+    results = qe.run_query(all_regions_query)
+    assert requested_pages == [(0, 500), (1, 500), (2, 500)]
+    assert region_ids(results) == [str(i) for i in range(1200)]
+
+
+def test_adaptive_page_size(all_regions_query, paginator_observations):
+    paging = AdaptivePaging(
+        target_bytes=20000, target_seconds=None, initial_page_size=64
+    )
+    send_request, requested_pages = region_pages(1000)
+    qe = QueryExecutioner(adaptive_paging=paging, max_workers=4)
+    qe._send_request = send_request
+    results = qe.run_query(all_regions_query)
+    # the probe page shows about 100 bytes per region, so the following
+    # pages have the largest power of two below 200 regions
+    assert sorted(requested_pages) == [(0, 64), (1, 64), (1, 128)] + [
+        (page, 128) for page in range(2, 8)
+    ]
+    assert region_ids(results) == [str(i) for i in range(1000)]
+
+    # repeated queries start with the page size learned before
+    requested_pages.clear()
+    qe.run_query(all_regions_query)
+    assert requested_pages[0] == (0, 128)
+
+
+def test_adaptive_page_size_respects_latency_and_bounds():
+    paging = AdaptivePaging(
+        target_bytes=10**9, target_seconds=1.0, min_page_size=16, max_page_size=512
+    )
+    paginator = Paginator(adaptive_paging=paging)
+    assert paginator._ideal_page_size(100, 0.01) == 64
+    assert paginator._ideal_page_size(100, 0.0) == 512
+    assert paginator._ideal_page_size(100, 10.0) == 16
+
+
+def test_adaptive_page_size_observations_are_bounded(
+    paginator_observations, monkeypatch
+):
+    monkeypatch.setattr(Paginator, "MAX_OBSERVATIONS", 2)
+    paginator = Paginator(adaptive_paging=AdaptivePaging(initial_page_size=64))
+    first_page = {
+        "data": {"allRegions": {"itemsPerPage": 64, "total": 64, "regions": [{}]}}
+    }
+    for query in ["a", "b"]:
+        paginator.remaining_pages({"query": query}, first_page, 0.01, 64, 6400)
+    # looking up "a" keeps it, so "b" is the least recently used one
+    assert paginator.first_page_size({"query": "a"}) != 64
+    paginator.remaining_pages({"query": "c"}, first_page, 0.01, 64, 6400)
+    assert list(paginator_observations) == ["a", "c"]
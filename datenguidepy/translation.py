@@ -1,9 +1,10 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from abc import abstractmethod, ABC
 from pandas import DataFrame
 import json
 import os
+import threading
 
 
 class TranslationProvider(ABC):
@@ -28,7 +29,21 @@ class TranslationProvider(ABC):
 
 class SchemaTranslationProvider(TranslationProvider):
     def __init__(self):
-        self.translated_schema: Dict = self.get_translated_schema_from_file()
+        self._translated_schema: Optional[Dict] = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def translated_schema(self) -> Dict:
+        """The translations, read from the package data on first access."""
+        if self._translated_schema is None:
+            with self._load_lock:
+                if self._translated_schema is None:
+                    self._translated_schema = self.get_translated_schema_from_file()
+        return self._translated_schema
+
+    @translated_schema.setter
+    def translated_schema(self, translated_schema: Dict) -> None:
+        self._translated_schema = translated_schema
 
     @staticmethod
     def get_translated_schema_from_file():
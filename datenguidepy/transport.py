@@ -0,0 +1,601 @@
+from typing import (
+    Dict,
+    Any,
+    Optional,
+    NamedTuple,
+    FrozenSet,
+    Iterator,
+    Sequence,
+    Tuple,
+)
+from email.utils import parsedate_to_datetime
+import gzip
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from typing_extensions import Protocol
+
+from datenguidepy.cache import DiskResponseCache
+from datenguidepy.json_stream import JsonArrayStream
+from datenguidepy.rate_limit import TokenBucket, AdaptiveConcurrencyLimiter
+from datenguidepy.single_flight import SingleFlight
+
+Json_Dict = Dict[str, Any]
+
+try:
+    import brotli  # noqa: F401
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli  # noqa: F401
+    except ImportError:
+        brotli = None
+
+# urllib3 decodes brotli responses only if one of the brotli packages is present
+DEFAULT_ACCEPT_ENCODING = "gzip, deflate" if brotli is None else "gzip, deflate, br"
+
+
+class TransportConfig(NamedTuple):
+    """Connection settings of an HttpTransport.
+
+    :param pool_connections: Number of per host connection pools that are
+        kept, i.e. how many different hosts can be served from the pool.
+    :param pool_maxsize: Maximum number of connections that are kept alive
+        for a single host.
+    :param pool_block: If True the pool_maxsize is a hard per host limit and
+        additional requests wait for a free connection. Otherwise additional
+        connections are opened but not kept afterwards.
+    :param keep_alive: Toggles reusing connections across requests. Turning
+        it off closes the connection after every request.
+    :param timeout: Timeout in seconds for a single request, defaults to None,
+        meaning no timeout.
+    :param accept_encoding: Compression schemes offered to the server for
+        responses. Defaults to gzip and deflate, plus brotli if the brotli
+        package is installed (pip install datenguidepy[compression]).
+    :param compress_requests_above: Request bodies larger than this number
+        of bytes are sent gzip compressed, defaults to None, meaning request
+        bodies are never compressed. Only enable it for servers that accept
+        compressed request bodies.
+    """
+
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    pool_block: bool = False
+    keep_alive: bool = True
+    timeout: Optional[float] = None
+    accept_encoding: str = DEFAULT_ACCEPT_ENCODING
+    compress_requests_above: Optional[int] = None
+
+
+class TransferStats(object):
+    """Number of bytes transferred for a query.
+
+    The counts are updated by the transport for every request, also
+    from several threads at the same time.
+
+    :ivar requests: Number of responses received from the server.
+    :ivar cached_responses: Number of responses served from a cache.
+    :ivar shared_responses: Number of responses shared with an identical
+        request that was in flight at the same time.
+    :ivar sent_bytes: Size of the request bodies as sent.
+    :ivar received_bytes: Size of the response bodies as transferred,
+        i.e. compressed if the server compressed them.
+    :ivar decoded_bytes: Size of the response bodies after decompression.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cached_responses = 0
+        self.shared_responses = 0
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.decoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, sent_bytes: int, received_bytes: int, decoded_bytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.sent_bytes += sent_bytes
+            self.received_bytes += received_bytes
+            self.decoded_bytes += decoded_bytes
+
+    def add_cached_response(self) -> None:
+        with self._lock:
+            self.cached_responses += 1
+
+    def add_shared_response(self) -> None:
+        with self._lock:
+            self.shared_responses += 1
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        """Decoded bytes per transferred byte of the responses."""
+        if self.received_bytes == 0:
+            return None
+        return self.decoded_bytes / self.received_bytes
+
+    def __repr__(self) -> str:
+        return (
+            f"TransferStats(requests={self.requests}, "
+            f"cached_responses={self.cached_responses}, "
+            f"shared_responses={self.shared_responses}, "
+            f"sent_bytes={self.sent_bytes}, received_bytes={self.received_bytes}, "
+            f"decoded_bytes={self.decoded_bytes})"
+        )
+
+
+class RetryPolicy(NamedTuple):
+    """Determines which failed requests are retried and how long to wait
+    in between.
+
+    The waiting time doubles with every attempt (exponential backoff). With
+    jitter a random time between zero and the backoff is used instead, so
+    that concurrent workers hitting the same failure do not retry in
+    lockstep. If the endpoint sends a Retry-After header, its value is used.
+
+    :param max_attempts: Maximum number of attempts per request including
+        the first one. 1 disables retries.
+    :param status_codes: Status codes that are considered to be transient.
+    :param backoff_factor: Waiting time in seconds before the first retry.
+    :param max_backoff: Upper limit in seconds for a single waiting time,
+        also applied to Retry-After.
+    :param jitter: Toggles randomizing the waiting times.
+    :param retry_connection_errors: Toggles retrying requests that failed
+        due to connection errors or timeouts.
+    """
+
+    max_attempts: int = 4
+    status_codes: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+    backoff_factor: float = 0.5
+    max_backoff: float = 30.0
+    jitter: bool = True
+    retry_connection_errors: bool = True
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Waiting time in seconds before the next attempt.
+
+        :param attempt: Number of the failed attempt starting at 0.
+        :param retry_after: Value of the Retry-After header of the failed
+            response, defaults to None
+        :return: Seconds to wait.
+        """
+        retry_after_seconds = parse_retry_after(retry_after)
+        if retry_after_seconds is not None:
+            return min(retry_after_seconds, self.max_backoff)
+        backoff = min(self.backoff_factor * 2**attempt, self.max_backoff)
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+    """Converts a Retry-After header value into seconds.
+
+    :param retry_after: Either a number of seconds or a HTTP date.
+    :return: Seconds to wait or None if the value can not be parsed.
+    """
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_date = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_date is None:
+        return None
+    return max(retry_date.timestamp() - time.time(), 0.0)
+
+
+def encode_request(
+    query_json: Json_Dict,
+    headers: Optional[Dict[str, str]],
+    compress_above: Optional[int] = None,
+) -> Tuple[bytes, Dict[str, str]]:
+    """Serializes a request body and gzip compresses it if it is large.
+
+    :param query_json: Request body containing the query and variables.
+    :param headers: Additional request headers.
+    :param compress_above: Bodies larger than this number of bytes are
+        compressed, defaults to None, meaning no compression.
+    :return: The request body and the headers to send it with.
+    """
+    body = json.dumps(query_json).encode("utf-8")
+    headers = dict(headers or {})
+    headers.setdefault("Content-Type", "application/json")
+    if compress_above is not None and len(body) > compress_above:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class _Circuit(object):
+    """State of the circuit of a single endpoint, see CircuitBreaker."""
+
+    def __init__(self) -> None:
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+
+class CircuitBreaker(object):
+    """Stops sending requests to an endpoint that keeps failing.
+
+    After failure_threshold consecutive failed attempts the circuit of an
+    endpoint opens and every request to it fails immediately with a
+    CircuitOpenError. Once reset_timeout seconds have passed a single
+    trial request is let through. If it succeeds the circuit closes
+    again, otherwise it stays open for another reset_timeout. Every
+    endpoint has a circuit of its own, so a failing endpoint does not
+    block requests to other endpoints. The breaker is thread safe and
+    meant to be shared by all workers using the same transport.
+
+    :param failure_threshold: Number of consecutive failures that open
+        the circuit, defaults to 5
+    :type failure_threshold: int, optional
+    :param reset_timeout: Seconds until a trial request is sent,
+        defaults to 30
+    :type reset_timeout: float, optional
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def state(self, endpoint: str) -> str:
+        """State of the circuit of an endpoint: CLOSED, OPEN or HALF_OPEN."""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            return self.CLOSED if circuit is None else circuit.state
+
+    def before_request(self, endpoint: str) -> None:
+        """Checks whether a request may be sent.
+
+        :param endpoint: Url of the endpoint.
+        :raises CircuitOpenError: If the circuit of the endpoint is open.
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None or circuit.state == self.CLOSED:
+                return
+            if (
+                circuit.state == self.OPEN
+                and time.time() - circuit.opened_at >= self.reset_timeout
+            ):
+                circuit.state = self.HALF_OPEN
+                return
+            failures = circuit.failures
+        raise CircuitOpenError(
+            endpoint
+            + "\n"
+            + f"Circuit breaker is open after {failures} consecutive failures"
+        )
+
+    def record_success(self, endpoint: str) -> None:
+        with self._lock:
+            # closed circuits without failures are not kept
+            self._circuits.pop(endpoint, None)
+
+    def record_failure(self, endpoint: str) -> None:
+        with self._lock:
+            circuit = self._circuits.setdefault(endpoint, _Circuit())
+            circuit.failures += 1
+            if (
+                circuit.state == self.HALF_OPEN
+                or circuit.failures >= self.failure_threshold
+            ):
+                circuit.state = self.OPEN
+                circuit.opened_at = time.time()
+
+
+class Transport(Protocol):
+    """Interface of the objects sending GraphQL requests, e.g. HttpTransport.
+
+    QueryExecutioner and GraphQlSchemaMetaDataProvider accept any object
+    implementing it, which allows to record responses or to replay them
+    without network access, see datenguidepy.replay.
+    """
+
+    def post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> Json_Dict:
+        ...
+
+    def post_stream(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        path: Sequence[str],
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> JsonArrayStream:
+        ...
+
+
+class HttpTransport(object):
+    """Sends GraphQL requests over a pooled keep-alive session.
+
+    The underlying requests session is created lazily and shared by
+    everything that uses the transport, i.e. several QueryExecutioner and
+    GraphQlSchemaMetaDataProvider instances as well as several threads.
+    This way consecutive requests (e.g. the pages of an allRegions query)
+    reuse established connections instead of paying for a new TCP and
+    TLS handshake every time.
+
+    :param config: Connection settings, defaults to TransportConfig()
+    :type config: TransportConfig, optional
+    :param response_cache: Optional persistent cache. Responses found in
+        the cache are returned without sending a request and successful
+        responses are added to it, defaults to None
+    :type response_cache: DiskResponseCache, optional
+    :param retry_policy: Policy for retrying failed requests. As every
+        request is retried on its own, a failure only repeats the affected
+        page or region. Defaults to RetryPolicy(), NO_RETRY disables retries.
+    :type retry_policy: RetryPolicy, optional
+    :param circuit_breaker: Circuit breaker shared by all requests of the
+        transport, it keeps a circuit per endpoint. Defaults to None,
+        meaning requests are always sent.
+    :type circuit_breaker: CircuitBreaker, optional
+    :param rate_limiter: Token bucket limiting the request rate, it may be
+        shared with other transports, defaults to None
+    :type rate_limiter: TokenBucket, optional
+    :param concurrency_limiter: Controller adapting the number of requests
+        in flight, defaults to None
+    :type concurrency_limiter: AdaptiveConcurrencyLimiter, optional
+    :param single_flight: Coalesces identical requests (same endpoint, query
+        and variables) that are in flight at the same time into a single
+        request, e.g. when several threads of a server ask for the same
+        data. Defaults to None, meaning every request is sent.
+    :type single_flight: SingleFlight, optional
+    """
+
+    # bytes read at once from streamed responses
+    STREAM_CHUNK_SIZE: int = 64 * 1024
+
+    def __init__(
+        self,
+        config: Optional[TransportConfig] = None,
+        response_cache: Optional[DiskResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        single_flight: Optional[SingleFlight] = None,
+    ) -> None:
+        self.config = TransportConfig() if config is None else config
+        self.response_cache = response_cache
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.single_flight = single_flight
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            pool_block=self.config.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not self.config.keep_alive:
+            session.headers["Connection"] = "close"
+        session.headers["Accept-Encoding"] = self.config.accept_encoding
+        return session
+
+    def post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> Json_Dict:
+        """Posts a GraphQL request and returns the decoded response body.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param query_json: Request body containing the query and variables.
+        :param headers: Additional request headers, defaults to None
+        :param transfer_stats: Records the transferred bytes, defaults to None
+        :raises RuntimeError: If the response status code is not 200.
+        :return: The json response body.
+        """
+        if self.single_flight is None:
+            return self._post(endpoint, query_json, headers, transfer_stats)
+        body_json, shared = self.single_flight.do(
+            DiskResponseCache.request_key(endpoint, query_json),
+            lambda: self._post(endpoint, query_json, headers, transfer_stats),
+        )
+        if shared and transfer_stats is not None:
+            transfer_stats.add_shared_response()
+        return body_json
+
+    def _post(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        headers: Optional[Dict[str, str]],
+        transfer_stats: Optional[TransferStats],
+    ) -> Json_Dict:
+        if self.response_cache is not None:
+            cached_body = self.response_cache.get(endpoint, query_json)
+            if cached_body is not None:
+                if transfer_stats is not None:
+                    transfer_stats.add_cached_response()
+                return cached_body
+        body, headers = encode_request(
+            query_json, headers, self.config.compress_requests_above
+        )
+        resp = self._post_with_retries(endpoint, body, headers)
+        try:
+            if transfer_stats is not None:
+                transfer_stats.add(len(body), resp.raw.tell(), len(resp.content))
+            if resp.status_code != 200:
+                raise RuntimeError(
+                    endpoint
+                    + "\n"
+                    + f"No result, got HTML status code {resp.status_code}"
+                )
+            body_json = resp.json()
+        finally:
+            resp.close()
+        # responses reporting errors are not cached to allow for retries
+        if self.response_cache is not None and "errors" not in body_json:
+            self.response_cache.set(endpoint, query_json, body_json)
+        return body_json
+
+    def post_stream(
+        self,
+        endpoint: str,
+        query_json: Json_Dict,
+        path: Sequence[str],
+        headers: Optional[Dict[str, str]] = None,
+        transfer_stats: Optional[TransferStats] = None,
+    ) -> JsonArrayStream:
+        """Posts a GraphQL request and decodes the response while it is
+        downloaded.
+
+        The elements of the array at path are decoded one at a time when
+        iterating the returned stream, see JsonArrayStream. The connection is
+        released once the stream is exhausted. Streamed responses bypass the
+        response cache.
+
+        :param endpoint: Url of the GraphQL endpoint.
+        :param query_json: Request body containing the query and variables.
+        :param path: Keys leading to the array that is streamed.
+        :param headers: Additional request headers, defaults to None
+        :param transfer_stats: Records the transferred bytes once the stream
+            is exhausted, defaults to None
+        :raises RuntimeError: If the response status code is not 200.
+        :return: Stream of the array elements.
+        """
+        body, headers = encode_request(
+            query_json, headers, self.config.compress_requests_above
+        )
+        resp = self._post_with_retries(endpoint, body, headers, stream=True)
+        if resp.status_code != 200:
+            resp.close()
+            raise RuntimeError(
+                endpoint + "\n" + f"No result, got HTML status code {resp.status_code}"
+            )
+        return JsonArrayStream(
+            self._iter_content(resp, len(body), transfer_stats), path
+        )
+
+    def _iter_content(
+        self,
+        resp: requests.Response,
+        sent_bytes: int,
+        transfer_stats: Optional[TransferStats],
+    ) -> Iterator[bytes]:
+        decoded_bytes = 0
+        try:
+            for chunk in resp.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                decoded_bytes += len(chunk)
+                yield chunk
+            if transfer_stats is not None:
+                transfer_stats.add(sent_bytes, resp.raw.tell(), decoded_bytes)
+        finally:
+            resp.close()
+
+    def _post_with_retries(
+        self,
+        endpoint: str,
+        body: bytes,
+        headers: Dict[str, str],
+        stream: bool = False,
+    ) -> requests.Response:
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            self._before_attempt(endpoint)
+            retry_after = None
+            success = False
+            started = time.monotonic()
+            try:
+                resp = self.session.post(
+                    endpoint,
+                    headers=headers,
+                    data=body,
+                    timeout=self.config.timeout,
+                    stream=stream,
+                )
+                success = resp.status_code not in policy.status_codes
+            except (requests.ConnectionError, requests.Timeout):
+                if (
+                    not policy.retry_connection_errors
+                    or attempt + 1 >= policy.max_attempts
+                ):
+                    raise
+            else:
+                if success or attempt + 1 >= policy.max_attempts:
+                    return resp
+                retry_after = resp.headers.get("Retry-After")
+                # returns the connection of the discarded response to the pool
+                resp.close()
+            finally:
+                self._after_attempt(endpoint, time.monotonic() - started, success)
+            time.sleep(policy.delay(attempt, retry_after))
+            attempt += 1
+
+    def _before_attempt(self, endpoint: str) -> None:
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(endpoint)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.acquire()
+
+    def _after_attempt(self, endpoint: str, latency: float, success: bool) -> None:
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(latency, success)
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success(endpoint)
+        else:
+            self.circuit_breaker.record_failure(endpoint)
+
+    def close(self) -> None:
+        """Closes all pooled connections. The transport stays usable
+        and opens a new session on the next request.
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+DEFAULT_TRANSPORT = HttpTransport(
+    circuit_breaker=CircuitBreaker(), single_flight=SingleFlight()
+)
@@ -16,6 +16,8 @@ with open("datenguidepy/VERSION") as version_file:
 
 requirements = ["pandas>=1.0.0", "requests", "typing_extensions"]
 
+extra_requirements = {"async": ["aiohttp>=3.6"], "compression": ["brotli"]}
+
 setup_requirements = ["pytest-runner"]
 
 test_requirements = ["pytest"]
@@ -45,6 +47,7 @@ setup(
         "Provids easy access to German " + "publically availible regional statistics"
     ),
     install_requires=requirements,
+    extras_require=extra_requirements,
     license="MIT license",
     long_description=readme + "\n\n" + history,
     include_package_data=True,
@@ -0,0 +1,76 @@
+"""Compares the compiled json paths of get_json_path with the previous
+recursive implementation on the bundled schema.json:
+
+    python tasks/benchmark_json_path.py
+"""
+
+from typing import Any, Callable, List
+from datenguidepy.schema_json_meta import (
+    compile_json_path,
+    get_json_path,
+    get_schema_json,
+)
+import timeit
+
+PATHS = [
+    ["..", "measures", "..", "name"],
+    ["..", "measures", "..", "units"],
+    ["..", "measures", "..", "dimensions", "..", "value_names"],
+    ["..", "measures", "..", "dimensions", "GES", "value_names"],
+]
+DESCRIPTION_KEYS = ["name", "title_de", "definition_de"]
+
+
+def recursive_json_path(json, path_list, default="Missing"):
+    """The implementation of get_json_path before paths were compiled."""
+    if json == [] or len(path_list) == 0:
+        return json
+    next_val = path_list[0]
+    if next_val == "..":
+        return [
+            elem
+            for sub_j in json
+            for v in sub_j.values()
+            for elem in recursive_json_path([v], path_list[1:])
+        ]
+    elif len(path_list) == 1:
+        return [sub_j.get(next_val, default) for sub_j in json]
+    else:
+        sub_jsons = [sub_j for sub_j in json if sub_j.get(next_val) is not None]
+        return [
+            elem
+            for sub_j in sub_jsons
+            for elem in recursive_json_path([sub_j.get(next_val)], path_list[1:])
+        ]
+
+
+def best_of(function: Callable[[], Any], number: int = 20) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number
+
+
+def report(name: str, old: float, new: float) -> None:
+    print(f"{name:55} {old * 1e3:8.2f} ms {new * 1e3:8.2f} ms {old / new:6.1f}x")
+
+
+if __name__ == "__main__":
+    schema: List[Any] = [get_schema_json()]
+    print(f"{'path':55} {'recursive':>11} {'compiled':>11}")
+    for path in PATHS:
+        assert recursive_json_path(schema, path) == get_json_path(schema, path)
+        report(
+            "/".join(path),
+            best_of(lambda: recursive_json_path(schema, path)),
+            best_of(lambda: get_json_path(schema, path)),
+        )
+
+    measures = compile_json_path(("..", "measures", ".."))
+    report(
+        "descriptions: " + ", ".join(DESCRIPTION_KEYS),
+        best_of(
+            lambda: [
+                recursive_json_path(schema, ["..", "measures", "..", key])
+                for key in DESCRIPTION_KEYS
+            ]
+        ),
+        best_of(lambda: list(measures.project(schema, DESCRIPTION_KEYS))),
+    )
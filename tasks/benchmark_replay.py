@@ -0,0 +1,102 @@
+"""Measures the throughput of the concurrent and paginated query paths
+against recorded responses instead of the live API.
+
+Record the responses once (needs network access):
+
+    python tasks/benchmark_replay.py record cassette.json.gz
+
+and replay them as often as needed, optionally through a local server:
+
+    python tasks/benchmark_replay.py replay cassette.json.gz --latency 0.2 --server
+"""
+
+from typing import List, Optional
+from datenguidepy.query_builder import Query
+from datenguidepy.query_execution import QueryExecutioner, GraphQlSchemaMetaDataProvider
+from datenguidepy.replay import (
+    Cassette,
+    RecordingTransport,
+    ReplayTransport,
+    ReplayServer,
+)
+from datenguidepy.transport import Transport, HttpTransport, NO_RETRY
+import argparse
+import time
+
+STATISTIC = "BEV001"
+STATE_IDS = [f"{state:02d}" for state in range(1, 17)]
+WORKER_COUNTS = [1, 4, 8]
+
+
+def benchmark_queries(page_size: int) -> List[Query]:
+    return [
+        Query.region(STATE_IDS, fields=[STATISTIC]),
+        Query.all_regions(fields=[STATISTIC], nuts=3, page_size=page_size),
+    ]
+
+
+def use_transport(transport: Transport, endpoint: Optional[str] = None) -> None:
+    QueryExecutioner.transport = transport
+    GraphQlSchemaMetaDataProvider.transport = transport
+    if endpoint is not None:
+        QueryExecutioner.endpoint = endpoint
+        GraphQlSchemaMetaDataProvider.endpoint = endpoint
+
+
+def record(path: str, page_size: int) -> None:
+    cassette = Cassette(path)
+    use_transport(RecordingTransport(cassette))
+    for query in benchmark_queries(page_size):
+        for max_workers in WORKER_COUNTS:
+            query.results(max_workers=max_workers)
+    cassette.save()
+    print(f"Recorded {len(cassette)} responses to {path}")
+
+
+def replay(
+    path: str,
+    page_size: int,
+    latency: Optional[float],
+    bandwidth: Optional[float],
+    server: bool,
+) -> None:
+    cassette = Cassette.load(path)
+    if server:
+        replay_server = ReplayServer(cassette, latency, bandwidth).start()
+        use_transport(HttpTransport(retry_policy=NO_RETRY), replay_server.endpoint)
+    else:
+        use_transport(ReplayTransport(cassette, latency, bandwidth))
+    for query in benchmark_queries(page_size):
+        for max_workers in WORKER_COUNTS:
+            started = time.perf_counter()
+            rows = len(query.results(max_workers=max_workers))
+            duration = time.perf_counter() - started
+            print(
+                f"{query.start_field.name:12} max_workers={max_workers}: "
+                f"{rows} rows in {duration:.3f}s ({rows / duration:.0f} rows/s), "
+                f"{query.transfer_stats}"
+            )
+    if server:
+        replay_server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("cassette", help="path of the cassette file")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=None,
+        help="seconds per request, defaults to the recorded latency",
+    )
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes/s")
+    parser.add_argument(
+        "--server", action="store_true", help="replay through a localhost server"
+    )
+    args = parser.parse_args()
+    if args.mode == "record":
+        record(args.cassette, args.page_size)
+    else:
+        replay(args.cassette, args.page_size, args.latency, args.bandwidth, args.server)
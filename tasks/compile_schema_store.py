@@ -0,0 +1,22 @@
+"""Compiles package_data/schema.json into the SQLite store that the
+StatisticsSchemaJsonMetaDataProvider reads, e.g. before building a
+distribution:
+
+    python tasks/compile_schema_store.py
+
+The store is not part of the repository. Without it, or if it was compiled
+from another schema.json, the provider compiles a store into the cache
+directory on first use.
+"""
+
+from datenguidepy.schema_json_meta import SCHEMA_JSON_PATH
+from datenguidepy.schema_store import DEFAULT_SCHEMA_STORE_PATH, compile_schema_store
+import os
+
+if __name__ == "__main__":
+    compile_schema_store(SCHEMA_JSON_PATH, DEFAULT_SCHEMA_STORE_PATH)
+    print(
+        f"Compiled {SCHEMA_JSON_PATH} ({os.path.getsize(SCHEMA_JSON_PATH)} bytes) "
+        f"into {DEFAULT_SCHEMA_STORE_PATH} "
+        f"({os.path.getsize(DEFAULT_SCHEMA_STORE_PATH)} bytes)"
+    )
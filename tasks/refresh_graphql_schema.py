@@ -0,0 +1,27 @@
+from datenguidepy.query_execution import GraphQlSchemaMetaDataProvider
+from datenguidepy.schema_snapshot import (
+    SchemaSnapshot,
+    load_snapshot,
+    save_snapshot,
+)
+
+import sys
+
+
+def refresh_snapshot(path: str) -> bool:
+    provider = GraphQlSchemaMetaDataProvider()
+    snapshot = SchemaSnapshot.create(provider.endpoint, provider.fetch_schema_types())
+    old_snapshot = load_snapshot(path)
+    if old_snapshot is not None and old_snapshot.schema_hash == snapshot.schema_hash:
+        return False
+    save_snapshot(snapshot, path)
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python tasks/refresh_graphql_schema.py SNAPSHOT_PATH")
+    if refresh_snapshot(sys.argv[1]):
+        print(f"Updated the GraphQL schema snapshot {sys.argv[1]}")
+    else:
+        print("The GraphQL schema snapshot is up to date")